@@ -0,0 +1,307 @@
+import itertools
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from lib import tenants
+from lib.jobs import job_queue
+
+# History resets that do not hold the database while the old rows go.
+#
+# Deleting the history fires the rollup triggers for every review and keeps
+# the write lock for as long as that takes (minutes on millions of reviews).
+# A reset instead renames the tables to archive_<table> and creates empty ones
+# with the same triggers in their place, in one transaction of a few
+# milliseconds whatever their size. A background job then copies the database
+# to ARCHIVE_DIR with the SQLite backup API, puts the old tables back under
+# their own names in the copy (an archive is a database the API can serve as
+# is), and purges them from the live database: their indexes one transaction
+# each (about 0.2 s for 10M reviews), then PURGE_CHUNK_ROWS rows at a time,
+# so writers never wait on the lock for longer than that.
+#
+# Index names are unique per database: non-unique indexes stay with the old
+# tables until the purge drops them. The new tables get them in the reset
+# itself (instantly, being empty), unique ones under their own names, as the
+# triggers' upserts need them, the others under swap_<index> until the purge
+# drops the old index and takes its name over.
+#
+# Progress is kept in the schema: archive_* tables are still to be archived,
+# purge_* tables only to be purged. Another reset is refused until both are
+# gone; a server stopped halfway resumes the job at its next start (a learner
+# database at its next reset).
+
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+PURGE_CHUNK_ROWS = int(os.getenv('PURGE_CHUNK_ROWS', '20000'))
+
+# Everything derived from reviews and sessions
+HISTORY_TABLES = ('word_review_items', 'study_sessions', 'word_reviews', 'word_schedule', 'review_queue',
+                  'daily_stats', 'daily_words', 'daily_groups', 'study_totals')
+# Reset by a full reset as well
+CATALOG_TABLES = ('words', 'words_fts', 'groups', 'word_groups', 'study_activities')
+
+ARCHIVE = 'archive_'
+PURGE = 'purge_'
+SWAP = 'swap_'
+
+_lock = threading.Lock()
+_scheduled = set()  # databases with an archive job queued or running
+
+
+class ResetInProgress(Exception):
+    """Raised while the tables of a previous reset are still being archived"""
+
+
+def leftover_tables(conn, prefix):
+    """Tables of a reset still waiting for the `prefix` stage, by their own names"""
+    names = [row[0] for row in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")]
+    return [name[len(prefix):] for name in names
+            if name.startswith(prefix) and name[len(prefix):] in HISTORY_TABLES + CATALOG_TABLES]
+
+
+def _schema(conn, tables):
+    """CREATE statements of `tables`: (tables, unique indexes, other indexes, triggers)"""
+    rows = conn.execute(f'''
+        SELECT type, name, tbl_name, sql FROM main.sqlite_master
+        WHERE tbl_name IN ({", ".join("?" * len(tables))}) AND sql IS NOT NULL
+    ''', tables).fetchall()
+    creates = {row[1]: row[3] for row in rows if row[0] == 'table'}
+    indexes = [(row[1], row[3]) for row in rows if row[0] == 'index']
+    unique = [(name, sql) for name, sql in indexes if re.match(r'CREATE\s+UNIQUE\b', sql, re.I)]
+    return (
+        [creates[table] for table in tables if table in creates],
+        unique,
+        [index for index in indexes if index not in unique],
+        [(row[1], row[3]) for row in rows if row[0] == 'trigger'],
+    )
+
+
+def _index_as(sql, name, new_name):
+    """CREATE statement of the index `name` creating `new_name` instead"""
+    return re.sub(rf'^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?)["`\[]?{re.escape(name)}["`\]]?(?=\s)',
+                  lambda match: f'{match.group(1)}"{new_name}"', sql, count=1, flags=re.I)
+
+
+def _rename(conn, tables, old_prefix, new_prefix):
+    for table in tables:
+        conn.execute(f'ALTER TABLE main."{old_prefix}{table}" RENAME TO "{new_prefix}{table}"')
+
+
+def swap_tables(conn, tables):
+    """Rename `tables` to archive_<table> and create empty ones in their place,
+    in one transaction. The caller holds the pool's write lock."""
+    # Legacy renames leave trigger bodies and views naming the tables as
+    # they are, so they go on to use the new ones
+    conn.execute('PRAGMA legacy_alter_table = ON')
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if leftover_tables(conn, ARCHIVE) or leftover_tables(conn, PURGE):
+                raise ResetInProgress('The previous reset is still being archived')
+            creates, unique, indexes, triggers = _schema(conn, tables)
+            # Triggers would move along with their tables
+            for name, _ in triggers:
+                conn.execute(f'DROP TRIGGER main."{name}"')
+            for name, _ in unique:
+                conn.execute(f'DROP INDEX main."{name}"')
+            sequences = conn.execute(
+                f'SELECT name, seq FROM main.sqlite_sequence WHERE name IN ({", ".join("?" * len(tables))})', tables
+            ).fetchall()
+            _rename(conn, tables, '', ARCHIVE)
+            for sql in creates + [sql for _, sql in unique + triggers]:
+                conn.execute(sql)
+            for name, sql in indexes:
+                conn.execute(_index_as(sql, name, SWAP + name))
+            # New ids carry on from the old ones
+            conn.executemany('INSERT INTO main.sqlite_sequence (name, seq) VALUES (?, ?)', sequences)
+            if 'study_totals' in tables:
+                conn.execute('INSERT INTO main.study_totals (id, words) SELECT 1, COUNT(*) FROM main.words')
+            conn.execute(f'''
+                UPDATE main.change_generations SET generation = generation + 1
+                WHERE table_name IN ({", ".join("?" * len(tables))})
+            ''', tables)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.execute('PRAGMA legacy_alter_table = OFF')
+
+
+def _write(conn, write_lock, *statements):
+    """Run (sql, params) statements in one write transaction; returns the
+    rows changed by the last one"""
+    with write_lock:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for sql, params in statements:
+                cursor = conn.execute(sql, params)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    return cursor.rowcount
+
+
+def _publish(partial, directory, name):
+    """Move `partial` to `directory`/<name>.db, or <name>-2.db and so on if
+    that is taken: an archive is never replaced. Returns the new path."""
+    for n in itertools.count(1):
+        path = directory / (f'{name}.db' if n == 1 else f'{name}-{n}.db')
+        try:
+            # Unlike a rename, fails if the name exists
+            os.link(partial, path)
+        except FileExistsError:
+            continue
+        partial.unlink()
+        return path
+
+
+def write_archive(conn, tables, directory, stem):
+    """Copy the database into `directory`, with the archive_ `tables` back in
+    place of the new ones; returns the archive's path"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f'{stem}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S.%f}'
+    partial = directory / f'{name}.db.partial'
+    archive = sqlite3.connect(partial, isolation_level=None)
+    try:
+        # In one step: a single read snapshot, which writers do not wait for
+        conn.backup(archive)
+        archive.execute('PRAGMA journal_mode = DELETE')
+        archive.execute('PRAGMA legacy_alter_table = ON')
+        archive.execute('BEGIN')
+        _, unique, _, triggers = _schema(archive, tables)
+        for table in tables:
+            archive.execute(f'DROP TABLE main."{table}"')
+        _rename(archive, tables, ARCHIVE, '')
+        # Unique indexes went with the new tables; the others never left
+        for _, sql in unique + triggers:
+            archive.execute(sql)
+        archive.execute('COMMIT')
+    except BaseException:
+        archive.close()
+        partial.unlink(missing_ok=True)
+        raise
+    archive.close()
+    return _publish(partial, directory, name)
+
+
+def _key(conn, table):
+    """Column(s) the purge deletes by: the rowid, or the primary key of WITHOUT ROWID tables"""
+    sql = conn.execute("SELECT sql FROM main.sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+    if not re.search(r'WITHOUT\s+ROWID\s*$', sql, re.I):
+        return 'rowid'
+    columns = sorted((pk, name) for _, name, _, _, _, pk in conn.execute(f'PRAGMA main.table_info("{table}")') if pk)
+    return ', '.join(name for _, name in columns)
+
+
+def purge(conn, tables, write_lock, job):
+    """Drop the purge_ `tables` a slice at a time; returns the rows deleted"""
+    deleted = 0
+    for table in tables:
+        old = PURGE + table
+        creates, _, indexes, _ = _schema(conn, (old,))
+        if creates[0].upper().startswith('CREATE VIRTUAL'):
+            # Full-text tables can only go in one piece
+            _write(conn, write_lock, (f'DROP TABLE main."{old}"', ()))
+            continue
+        # Deleting through the indexes is what makes DELETE slow: drop them
+        # first, each one's name going over to the new table's copy
+        for name, sql in indexes:
+            _write(conn, write_lock, (f'DROP INDEX main."{name}"', ()),
+                   (sql.replace(f'"{old}"', f'"{table}"'), ()), (f'DROP INDEX IF EXISTS main."{SWAP}{name}"', ()))
+        key = _key(conn, old)
+        while rows := _write(conn, write_lock, (
+            f'DELETE FROM main."{old}" WHERE ({key}) IN (SELECT {key} FROM main."{old}" LIMIT ?)', (PURGE_CHUNK_ROWS,)
+        )):
+            deleted += rows
+            job.progress(deleted)
+        _write(conn, write_lock, (f'DROP TABLE main."{old}"', ()))
+    return deleted
+
+
+def run_archive(job, pool, directory):
+    conn = pool.open_connection(setup=False)
+    conn.isolation_level = None  # transactions are managed explicitly
+    conn.execute('PRAGMA legacy_alter_table = ON')
+    # Where secure_delete is compiled in, every freed page is zeroed and
+    # rewritten through the WAL; the rows are in the archive by then, and
+    # FAST makes dropping a big index 5-10x quicker
+    conn.execute('PRAGMA secure_delete = FAST')
+    try:
+        path = None
+        tables = leftover_tables(conn, ARCHIVE)
+        if tables:
+            path = write_archive(conn, tables, directory, Path(pool.database).stem)
+            _write(conn, pool.write_lock, *[
+                (f'ALTER TABLE main."{ARCHIVE}{table}" RENAME TO "{PURGE}{table}"', ()) for table in tables
+            ])
+        tables = leftover_tables(conn, PURGE)
+        rows = purge(conn, tables, pool.write_lock, job)
+        return {'archive': str(path) if path else None, 'tables': tables, 'rows_purged': rows}
+    finally:
+        conn.close()
+
+
+def schedule(pool, tenant=None):
+    """Queue the archive job of `pool`'s database unless it already is"""
+    with _lock:
+        if pool.database in _scheduled:
+            return None
+        _scheduled.add(pool.database)
+    # A learner database stays open until its job is done
+    if tenant is not None:
+        tenants.registry.checkout(tenant.learner_id)
+
+    def cleanup():
+        with _lock:
+            _scheduled.discard(pool.database)
+        if tenant is not None:
+            tenants.registry.release(tenant)
+
+    try:
+        return job_queue.submit(
+            'archive_history',
+            lambda job: run_archive(job, pool, ARCHIVE_DIR),
+            {'database': Path(pool.database).name},
+            cleanup=cleanup
+        )
+    except Exception:
+        cleanup()
+        raise
+
+
+def reset(pool, tables, tenant=None, seed=None):
+    """Swap in empty `tables`, run seed(conn) if given, and queue the archive
+    job of the old ones; returns the job. Raises ResetInProgress."""
+    # Schema changes run on a plain connection: the catalog views of learner
+    # databases would shadow the tables their triggers are on
+    conn = pool.open_connection(setup=False)
+    try:
+        with pool.write_lock:
+            with _lock:
+                if pool.database in _scheduled:
+                    raise ResetInProgress('The previous reset is still being archived')
+            try:
+                swap_tables(conn, tables)
+            except ResetInProgress:
+                # Left over by a server stopped halfway
+                schedule(pool, tenant)
+                raise
+        if seed is not None:
+            seed(conn)
+    finally:
+        conn.close()
+    return schedule(pool, tenant)
+
+
+def resume(pool):
+    """Queue the archive job of a reset that a previous run did not finish"""
+    conn = pool.acquire()
+    try:
+        pending = leftover_tables(conn, ARCHIVE) or leftover_tables(conn, PURGE)
+    finally:
+        pool.release(conn)
+    return schedule(pool) if pending else None
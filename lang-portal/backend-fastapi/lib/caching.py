@@ -0,0 +1,85 @@
+import hashlib
+import threading
+from datetime import datetime, timezone
+from fastapi import HTTPException, Request, Response
+from lib.db import pool, current_tenant
+
+
+class ChangeTracker:
+    """Per-table change generations, bumped by triggers (migration 0005).
+
+    Generations are cached in memory and only re-read when PRAGMA data_version
+    of one of `schemas` shows that some other connection has committed since
+    the last look, so an unchanged database costs one PRAGMA per schema and
+    check. `scope` sets apart the ETags of trackers of different databases.
+    """
+
+    def __init__(self, pool, schemas=('main',), scope=None):
+        self.pool = pool
+        self.schemas = schemas
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._generations = {}
+
+    def generations(self):
+        with self._lock:
+            if self._conn is None:
+                self._conn = self.pool.open_connection()
+            version = tuple(
+                self._conn.execute(f'PRAGMA {schema}.data_version').fetchone()[0] for schema in self.schemas
+            )
+            if version != self._data_version:
+                self._generations = dict(
+                    self._conn.execute('SELECT table_name, generation FROM change_generations').fetchall()
+                )
+                self._data_version = version
+            return self._generations
+
+    def etag(self, tables, extra=()):
+        generations = self.generations()
+        if self.scope is not None:
+            extra = (*extra, self.scope)
+        key = repr([(table, generations.get(table, 0)) for table in tables] + list(extra))
+        return '"%s"' % hashlib.blake2s(key.encode(), digest_size=8).hexdigest()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._data_version = None
+
+
+tracker = ChangeTracker(pool)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return etag in (tag[2:] if tag.startswith('W/') else tag for tag in candidates)
+
+
+def conditional(*tables, cache_control='no-cache', daily=False):
+    """Route dependency answering If-None-Match with 304 before any query runs.
+
+    The ETag is derived from the change generations of `tables`; `daily`
+    also folds in today's date for responses that depend on date('now').
+    Add it with `dependencies=[Depends(conditional(...))]` so it runs before
+    the route's database dependency.
+    """
+    def check(request: Request, response: Response):
+        # The UTC date, as SQLite's date('now') is
+        extra = (datetime.now(timezone.utc).date().isoformat(),) if daily else ()
+        tenant = current_tenant.get()
+        etag = (tenant.tracker if tenant else tracker).etag(tables, extra)
+        headers = {'ETag': etag, 'Cache-Control': cache_control}
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return check
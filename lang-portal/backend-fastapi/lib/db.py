@@ -1,23 +1,221 @@
 import sqlite3
 import json
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from lib import importer, metrics, scheduler
 
-class Database:
-    def __init__(self, database='words.db'):
+SQL_DIR = Path(__file__).parent.parent / 'sql'
+
+# Base schema, in creation order
+SETUP_FILES = [
+    'create_table_words.sql',
+    'create_table_word_reviews.sql',
+    'create_table_word_review_items.sql',
+    'create_table_groups.sql',
+    'create_table_word_groups.sql',
+    'create_table_study_activities.sql',
+    'create_table_study_sessions.sql'
+]
+
+# Applied once to every connection when it is opened
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,  # 256MB
+    'cache_size': -65536,    # 64MB (negative values are KiB)
+    'busy_timeout': 5000,    # milliseconds
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available in time"""
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by all requests"""
+
+    def __init__(self, database='words.db', max_size=8, timeout=30.0, health_check_interval=30.0, setup=None):
         self.database = database
+        self.max_size = max_size
+        self.setup = setup  # called with every new connection after the PRAGMAs
+        # Held by in-process writers (review writer, import jobs) around their
+        # write transactions: they queue here and are woken as soon as the
+        # lock is free, instead of polling SQLite's busy handler, which a
+        # writer committing back to back can starve for seconds
+        self.write_lock = threading.Lock()
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = deque()  # (connection, last_used)
+        self._size = 0
+        self._checked_out = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        # Wait time statistics
+        self._acquired = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def open_connection(self, setup=True):
+        """Open a new, unpooled connection with the pool PRAGMAs applied, and
+        the pool's connection setup unless `setup` is False"""
+        conn = sqlite3.connect(self.database, check_same_thread=False, cached_statements=256,
+                               factory=metrics.connection_factory, uri=True)
+        conn.row_factory = sqlite3.Row
+        for name, value in PRAGMAS.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        if setup and self.setup:
+            self.setup(conn)
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        # Only ping connections that have been idle for a while
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Check out a connection, waiting up to `timeout` seconds"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout('Connection pool is closed')
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f'No connection available after {self.timeout}s')
+                self._cond.wait(remaining)
+            self._checked_out += 1
+            waited = time.monotonic() - start
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        try:
+            if conn is None:
+                conn = self.open_connection()
+            elif not self._is_healthy(conn, last_used):
+                conn.close()
+                conn = self.open_connection()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._checked_out -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection, drop it
+            with self._cond:
+                self._size -= 1
+                self._checked_out -= 1
+                self._cond.notify()
+            conn.close()
+            return
+
+        with self._cond:
+            self._checked_out -= 1
+            if self._closed:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        """Close idle connections; checked out ones are closed on release"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                conn.close()
+                self._size -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'checked_out': self._checked_out,
+                'acquired_total': self._acquired,
+                'wait_time_total': self._wait_total,
+                'wait_time_avg': self._wait_total / self._acquired if self._acquired else 0.0,
+                'wait_time_max': self._wait_max,
+            }
+
+
+class Database:
+    def __init__(self, database='words.db', pool=None):
+        self.database = pool.database if pool else database
+        self.pool = pool
         self.connection = None
 
     def connect(self):
         if not self.connection:
-            self.connection = sqlite3.connect(self.database)
-            self.connection.row_factory = sqlite3.Row
+            if self.pool:
+                self.connection = self.pool.acquire()
+            else:
+                self.connection = sqlite3.connect(self.database)
+                self.connection.row_factory = sqlite3.Row
         return self.connection
 
     def close(self):
         if self.connection:
-            self.connection.close()
+            if self.pool:
+                self.pool.release(self.connection)
+            else:
+                self.connection.close()
             self.connection = None
 
+    # Async access for `async def` routes. Each call runs on the bounded
+    # sqlite executor so a slow query never blocks the event loop.
+    async def run(self, fn, *args):
+        """Run fn(*args) on the sqlite executor"""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(ctx.run, fn, *args))
+
+    async def fetchone(self, sql, params=()):
+        return await self.run(lambda: self.connection.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql, params=()):
+        return await self.run(lambda: self.connection.execute(sql, params).fetchall())
+
+    async def execute(self, sql, params=()):
+        """Execute a statement and return its cursor"""
+        return await self.run(self.connection.execute, sql, params)
+
+    async def commit(self):
+        await self.run(self.connection.commit)
+
+    async def rollback(self):
+        await self.run(self.connection.rollback)
+
     def execute_sql_file(self, filepath):
         """Execute SQL from a file"""
         with open(filepath, 'r') as f:
@@ -33,17 +231,52 @@ class Database:
 
     def setup_tables(self):
         """Create all tables from SQL files"""
-        sql_dir = Path(__file__).parent.parent / 'sql' / 'setup'
-        for sql_file in [
-            'create_table_words.sql',
-            'create_table_word_reviews.sql',
-            'create_table_word_review_items.sql',
-            'create_table_groups.sql',
-            'create_table_word_groups.sql',
-            'create_table_study_activities.sql',
-            'create_table_study_sessions.sql'
-        ]:
-            self.execute_sql_file(sql_dir / sql_file)
+        for sql_file in SETUP_FILES:
+            self.execute_sql_file(SQL_DIR / 'setup' / sql_file)
+
+    def rebuild_word_reviews(self):
+        """Recompute word_reviews counters from raw review history"""
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM word_reviews')
+            conn.execute('''
+                INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+                SELECT word_id, SUM(correct != 0), SUM(correct = 0), MAX(created_at)
+                FROM word_review_items
+                GROUP BY word_id
+            ''')
+        return conn.execute('SELECT COUNT(*) FROM word_reviews').fetchone()[0]
+
+    def rebuild_session_counters(self):
+        """Recompute study_sessions review_count and ended_at from raw history"""
+        conn = self.connect()
+        with conn:
+            conn.execute('''
+                UPDATE study_sessions
+                SET review_count = (
+                      SELECT COUNT(*) FROM word_review_items WHERE study_session_id = study_sessions.id
+                    ),
+                    ended_at = MAX(created_at, COALESCE((
+                      SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = study_sessions.id
+                    ), created_at))
+            ''')
+        return conn.execute('SELECT COUNT(*) FROM study_sessions').fetchone()[0]
+
+    def rebuild_schedule(self):
+        """Replay review history into the spaced repetition schedule"""
+        return scheduler.rebuild_schedule(self.connect())
+
+    def rebuild_rollups(self):
+        """Recompute daily rollups and study totals from raw history"""
+        sql = (SQL_DIR / 'rebuild' / 'daily_rollups.sql').read_text()
+        conn = self.connect()
+        try:
+            conn.executescript(f'BEGIN;\n{sql}\nCOMMIT;')
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        return conn.execute('SELECT COUNT(*) FROM daily_stats').fetchone()[0]
 
     def import_study_activities(self, data_path):
         """Seed study activities from JSON"""
@@ -57,41 +290,61 @@ class Database:
             ''', (activity['name'], activity['url'], activity['preview_url']))
         conn.commit()
 
-    def import_words(self, group_name, data_path):
-        """Seed words and groups from JSON"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        # Create group
-        cursor.execute('INSERT INTO groups (name) VALUES (?)', (group_name,))
-        group_id = cursor.lastrowid
-        
-        # Insert words
-        words = self.load_json(data_path)
-        for word in words:
-            cursor.execute('''
-                INSERT INTO words (spanish, english, parts)
-                VALUES (?, ?, ?)
-            ''', (word['spanish'], word['english'], json.dumps(word['parts'])))
-            
-            word_id = cursor.lastrowid
-            cursor.execute('''
-                INSERT INTO word_groups (word_id, group_id)
-                VALUES (?, ?)
-            ''', (word_id, group_id))
-        
-        # Update word count
-        cursor.execute('''
-            UPDATE groups 
-            SET words_count = (
-                SELECT COUNT(*) FROM word_groups 
-                WHERE group_id = ?
-            ) 
-            WHERE id = ?
-        ''', (group_id, group_id))
-        
-        conn.commit()
-        print(f"Added {len(words)} words to '{group_name}' group")
+    def import_words(self, group_name, data_path, schema=None):
+        """Seed words and groups from a JSON, NDJSON or CSV file"""
+        result = importer.import_words(self.connect(), data_path, group_name, schema=schema)
+        print(f"Added {result['rows']} words to '{group_name}' group")
+        return result
 
 # Singleton instance
-db = Database()
\ No newline at end of file
+db = Database()
+
+# Shared connection pool used by the API
+pool = ConnectionPool()
+
+# One worker per pooled connection, so queries queue here instead of the event loop
+executor = ThreadPoolExecutor(max_workers=pool.max_size, thread_name_prefix='sqlite')
+
+
+# Learner database serving the current request in multi-tenant mode
+# (lib/tenants.py); None means the shared database
+current_tenant = contextvars.ContextVar('current_tenant', default=None)
+
+
+def current_pool():
+    """Pool of the database serving the current request"""
+    tenant = current_tenant.get()
+    return tenant.pool if tenant else pool
+
+
+# Database shared by the reads of one POST /api/batch (routes/batch.py)
+shared_db = contextvars.ContextVar('shared_db', default=None)
+
+
+# Database Dependency
+def get_db():
+    shared = shared_db.get()
+    if shared is not None and shared.pool is current_pool():
+        # Released by the batch
+        yield shared
+        return
+    db = Database(pool=current_pool())
+    db.connect()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Shared database, for routes that only read the vocabulary catalog
+def get_catalog_db():
+    shared = shared_db.get()
+    if shared is not None and shared.pool is pool:
+        yield shared
+        return
+    db = Database(pool=pool)
+    db.connect()
+    try:
+        yield db
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+import csv
+import functools
+import io
+import os
+import sqlite3
+import threading
+from lib.db import executor
+from lib.fastjson import dumps
+
+# Streaming exports (CSV / NDJSON) of whole tables.
+#
+# An export runs a single SELECT on a connection of its own, outside the
+# pool, and fetches it CHUNK_ROWS rows at a time on the sqlite executor,
+# where each chunk is encoded too. One statement reads one snapshot, so the
+# export is consistent however long it streams, and memory stays at about a
+# chunk: the next one is only fetched once the server has sent the previous
+# one, which waits while the client is slow to read. Export queries are
+# written to follow indexes in their ORDER BY, so no sort has to finish
+# before the first row comes out.
+#
+# At most MAX_CONCURRENT exports read at a time; further ones wait for a
+# slot. A running export holds its read snapshot open, which keeps the WAL
+# from being checkpointed past it until the export ends.
+
+CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '2000'))
+MAX_CONCURRENT = int(os.getenv('EXPORT_MAX_CONCURRENT', '2'))
+
+# format -> media type
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+_slots = asyncio.Semaphore(MAX_CONCURRENT)
+
+
+def csv_encoder(columns, booleans=()):
+    """Chunk encoder writing CSV rows, after a header row (booleans stay 0/1)"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+
+    def encode(rows):
+        writer.writerows(rows)
+        data = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return data.encode('utf-8')
+    return encode
+
+
+def ndjson_encoder(columns, booleans=()):
+    """Chunk encoder writing one JSON object per row and line"""
+    flags = [i for i, name in enumerate(columns) if name in booleans]
+
+    def encode(rows):
+        lines = []
+        for row in rows:
+            if flags:
+                row = list(row)
+                for i in flags:
+                    row[i] = row[i] if row[i] is None else bool(row[i])
+            lines.append(dumps(dict(zip(columns, row))))
+        lines.append(b'')
+        return b'\n'.join(lines)
+    return encode
+
+
+ENCODERS = {'csv': csv_encoder, 'ndjson': ndjson_encoder}
+
+
+class Export:
+    """One streaming query: its connection, cursor and chunk encoder"""
+
+    def __init__(self, pool, sql, params, columns, fmt, booleans=(), chunk_rows=None):
+        self.pool = pool
+        self.sql = sql
+        self.params = params
+        self.encode = ENCODERS[fmt](columns, booleans)
+        self.chunk_rows = chunk_rows or CHUNK_ROWS
+        self.rows = 0
+        self._conn = None
+        self._cursor = None
+        # A cancelled stream closes the connection while a chunk may still be
+        # fetched on the executor
+        self._lock = threading.Lock()
+
+    def _open(self):
+        with self._lock:
+            conn = self.pool.open_connection()
+            conn.row_factory = None
+            self._conn = conn
+            # Plain cursor: a long export is not a slow query
+            self._cursor = conn.cursor(sqlite3.Cursor)
+            self._cursor.execute(self.sql, self.params)
+            # The header row, if the format has one
+            return self.encode([])
+
+    def _chunk(self):
+        with self._lock:
+            if self._cursor is None:
+                return b''
+            rows = self._cursor.fetchmany(self.chunk_rows)
+            self.rows += len(rows)
+            return self.encode(rows) if rows else b''
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = self._cursor = None
+
+    async def _run(self, fn):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(ctx.run, fn))
+
+    async def stream(self):
+        """Encoded chunks, for a StreamingResponse"""
+        async with _slots:
+            try:
+                header = await self._run(self._open)
+                if header:
+                    yield header
+                while chunk := await self._run(self._chunk):
+                    yield chunk
+            finally:
+                # Not awaited: the stream may be closing because it was cancelled
+                executor.submit(self._close)
@@ -0,0 +1,143 @@
+import json
+import typing
+from datetime import datetime
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same JSON for our payloads
+    orjson = None
+
+# Fast response path for list endpoints.
+#
+# Returning a dict from a route makes FastAPI validate it into response_model
+# instances, item by item, and serialize those again. List routes instead map
+# rows straight into JSON-ready dicts with a Record compiled from the response
+# model, and return a FastJSONResponse, which FastAPI sends as is. The Record
+# applies the same conversions pydantic would (field order, defaults, int to
+# float, 0/1 to bool, SQL timestamps to ISO datetimes), so the JSON is
+# unchanged. Models are checked once when their Record is built, at import
+# time: a field type the Record cannot reproduce raises TypeError at startup.
+# A Record can also cover a subset of the model's fields (lib/fields.py).
+
+
+def dumps(content):
+    """Compact UTF-8 JSON, as FastAPI's own responses"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(Response):
+    media_type = 'application/json'
+
+    def render(self, content):
+        return dumps(content)
+
+
+def _to_float(value):
+    return value if value is None else float(value)
+
+
+def _to_bool(value):
+    return value if value is None else bool(value)
+
+
+def _to_iso_datetime(value):
+    # CURRENT_TIMESTAMP text ('YYYY-MM-DD HH:MM:SS'); anything else is parsed
+    if isinstance(value, str):
+        if len(value) == 19 and value[10] == ' ':
+            return f'{value[:10]}T{value[11:]}'
+        return datetime.fromisoformat(value).isoformat()
+    return value
+
+
+# Field type -> conversion of SQLite values to what pydantic would emit
+# (None: SQLite already returns the right type)
+CONVERTERS = {
+    int: None,
+    str: None,
+    float: _to_float,
+    bool: _to_bool,
+    datetime: _to_iso_datetime,
+}
+
+
+def _converter(model, name, annotation):
+    args = typing.get_args(annotation)
+    if typing.get_origin(annotation) is typing.Union and type(None) in args:
+        # Optional[X]: every converter passes None through
+        (annotation,) = [arg for arg in args if arg is not type(None)]
+    if annotation in CONVERTERS:
+        return CONVERTERS[annotation]
+    # Nested models and lists of them are built with their own Record
+    origin = typing.get_origin(annotation)
+    inner = typing.get_args(annotation)[0] if origin in (list, typing.List) else annotation
+    if isinstance(inner, type) and issubclass(inner, BaseModel):
+        return None
+    raise TypeError(f'{model.__name__}.{name}: unsupported field type {annotation!r}')
+
+
+class Record:
+    """JSON objects of `model` built from query rows or keyword values"""
+
+    def __init__(self, model, names=None):
+        fields = model.model_fields
+        self.model = model
+        self.names = tuple(fields) if names is None else tuple(names)
+        self.defaults = {
+            name: fields[name].default for name in self.names if not fields[name].is_required()
+        }
+        self.converters = [
+            (i, converter) for i, name in enumerate(self.names)
+            if (converter := _converter(model, name, fields[name].annotation)) is not None
+        ]
+        self._checked = set()
+        self._partial = {}
+
+    def only(self, names):
+        """Record of just the fields `names` (a sparse fieldset), in model field order"""
+        names = tuple(names)
+        if names == self.names:
+            return self
+        record = self._partial.get(names)
+        if record is None:
+            record = self._partial[names] = Record(self.model, names)
+        return record
+
+    def _check(self, columns):
+        columns = tuple(columns[:len(self.names)])
+        if columns not in self._checked:
+            if columns != self.names:
+                raise ValueError(f'{self.model.__name__} expects columns {self.names}, query returned {columns}')
+            self._checked.add(columns)
+
+    def rows(self, rows):
+        """Objects for rows selecting the model's fields first, in field order
+        (trailing columns, e.g. sort keys, are ignored)"""
+        if not rows:
+            return []
+        self._check(rows[0].keys())
+        names = self.names
+        if not self.converters:
+            return [dict(zip(names, row)) for row in rows]
+        objects = []
+        for row in rows:
+            values = list(row)
+            for i, convert in self.converters:
+                values[i] = convert(values[i])
+            objects.append(dict(zip(names, values)))
+        return objects
+
+    def row(self, row):
+        """Object for a single row"""
+        return self.rows([row])[0]
+
+    def __call__(self, **values):
+        """One object from keyword values, in field order with defaults filled in"""
+        obj = {name: values[name] if name in values else self.defaults[name] for name in self.names}
+        for i, convert in self.converters:
+            name = self.names[i]
+            obj[name] = convert(obj[name])
+        return obj
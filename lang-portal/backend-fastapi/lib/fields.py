@@ -0,0 +1,54 @@
+from fastapi import HTTPException
+
+# Sparse fieldsets for list endpoints.
+#
+# `fields=id,spanish,english` asks for a subset of an item's fields. Routes
+# build their SELECT list from the requested fields only and leave out the
+# joins that nothing requested depends on (review counters come from a LEFT
+# JOIN on word_reviews); items are built with a Record of those fields, so
+# the JSON has only those keys. `id` is always returned, and so are the ids
+# a requested name is looked up by (`group_id` for `group_name`).
+# `include=groups` adds related rows to each item.
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return (default: all; id is always returned)"
+
+
+def parse_fields(fields, model, requires=None):
+    """Names of the `model` fields requested by a `fields=` value, in model
+    field order; all of them when `fields` is None. Raises a 400 for unknown
+    names."""
+    names = tuple(model.model_fields)
+    if fields is None:
+        return names
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = requested - set(names)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))} (available: {', '.join(names)})"
+        )
+    requested.add('id')
+    for name, required in (requires or {}).items():
+        if name in requested:
+            requested.add(required)
+    return tuple(name for name in names if name in requested)
+
+
+def parse_include(include, available):
+    """Set of the related rows requested by an `include=` value; raises a 400
+    for unknown names"""
+    if include is None:
+        return set()
+    requested = {name.strip() for name in include.split(',') if name.strip()}
+    unknown = requested - set(available)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include: {', '.join(sorted(unknown))} (available: {', '.join(available)})"
+        )
+    return requested
+
+
+def select_list(columns, names):
+    """SELECT list of the fields `names`, from {field: SQL expression}"""
+    return ",\n".join(f"{columns[name]} AS {name}" for name in names)
@@ -0,0 +1,219 @@
+import csv
+import itertools
+import json
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+# Streaming bulk import of vocabulary files.
+#
+# Records are read incrementally from a JSON array, NDJSON or CSV file,
+# mapped onto the words columns through a schema and inserted with
+# executemany, one transaction per chunk. Once an import turns out to be
+# bigger than one chunk, secondary indexes on words and word_groups and the
+# full-text index trigger are dropped for the rest of it; the indexes are
+# rebuilt and the search index caught up once at the end. What was dropped is
+# recorded in import_deferred (migration 0009) in the same transaction, so
+# the API restores it at start if an import died halfway.
+
+# words column -> source field. Without an explicit schema the first one
+# whose fields are all present in the first record is used.
+SCHEMAS = {
+    'spanish': {'spanish': 'spanish', 'english': 'english', 'parts': 'parts'},
+    'kanji': {'spanish': 'kanji', 'english': 'english', 'parts': 'parts'},
+}
+
+FORMATS = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+READ_SIZE = 1 << 16
+
+# Per-row triggers a large import drops, with the statement that catches up
+# all imported rows (id > ?) at the end
+DEFERRED_TRIGGERS = {
+    'trg_words_fts_insert': '''
+        INSERT INTO words_fts (rowid, spanish, romaji, english)
+        SELECT id, spanish, romaji, english FROM words_search_text WHERE id > ?
+    ''',
+}
+
+# Same output as json.dumps, without building an encoder per call
+_encoder = json.JSONEncoder()
+
+
+def iter_json_array(f, read_size=READ_SIZE):
+    """Yield the items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = '', 0, False, False
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError('Unexpected end of JSON array')
+            data = f.read(read_size)
+            buf, pos, eof = buf[pos:] + data, 0, not data
+            continue
+        if not started:
+            if buf[pos] != '[':
+                raise ValueError('Expected a JSON array')
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            item, end = None, None
+        # An item touching the end of the buffer may be cut short
+        if end is None or (end == len(buf) and not eof):
+            if eof:
+                raise ValueError('Invalid JSON item at offset %d' % pos)
+            data = f.read(read_size)
+            buf, pos, eof = buf[pos:] + data, 0, not data
+            continue
+        yield item
+        pos = end
+
+
+def iter_records(path, fmt=None):
+    """Yield dict records from a JSON array, NDJSON or CSV file"""
+    fmt = fmt or FORMATS.get(Path(path).suffix.lower(), 'json')
+    with open(path, 'r', encoding='utf-8', newline='' if fmt == 'csv' else None) as f:
+        if fmt == 'json':
+            yield from iter_json_array(f)
+        elif fmt == 'ndjson':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            raise ValueError(f'Unknown format: {fmt}')
+
+
+def detect_schema(record):
+    for schema in SCHEMAS.values():
+        if schema['spanish'] in record and schema['english'] in record:
+            return schema
+    raise ValueError(f'No schema matches fields: {", ".join(record)}')
+
+
+def word_row(record, schema):
+    parts = record.get(schema['parts'], [])
+    # CSV cells already hold the JSON text
+    if not isinstance(parts, str):
+        parts = _encoder.encode(parts)
+    return (record[schema['spanish']], record[schema['english']], parts or '[]')
+
+
+def checked_rows(records, schema, on_error=None):
+    """words rows of `records`; with `on_error`, records that do not map onto
+    a word are reported as (record number, problem) and skipped"""
+    for number, record in enumerate(records, 1):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError('not an object')
+            row = word_row(record, schema)
+            if row[0] is None or row[1] is None:
+                raise ValueError(f'empty {schema["spanish"] if row[0] is None else schema["english"]}')
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            if on_error is None:
+                raise
+            problem = f'missing field {e}' if isinstance(e, KeyError) else str(e)
+            on_error(number, problem)
+            continue
+        yield row
+
+
+def deferred_schema(conn, tables=('words', 'word_groups')):
+    """(type, name, sql) of the secondary indexes on `tables` and of the
+    deferred triggers"""
+    return conn.execute(f'''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE (type = 'index' AND sql IS NOT NULL AND tbl_name IN ({', '.join('?' * len(tables))}))
+           OR (type = 'trigger' AND name IN ({', '.join('?' * len(DEFERRED_TRIGGERS))}))
+    ''', (*tables, *DEFERRED_TRIGGERS)).fetchall()
+
+
+def _restore(conn):
+    deferred = conn.execute('SELECT type, name, sql, first_id FROM import_deferred').fetchall()
+    for kind, name, sql, first_id in deferred:
+        if kind == 'trigger':
+            conn.execute(DEFERRED_TRIGGERS[name], (first_id,))
+        conn.execute(sql)
+    conn.execute('DELETE FROM import_deferred')
+    return [name for _, name, _, _ in deferred]
+
+
+def restore_deferred(conn, write_lock=None):
+    """Recreate the schema recorded in import_deferred, catching up the
+    deferred triggers first; returns the names restored"""
+    with write_lock or nullcontext(), conn:
+        conn.execute('BEGIN IMMEDIATE')
+        return _restore(conn)
+
+
+def import_words(conn, path, group_name, schema=None, fmt=None, chunk_size=50000,
+                 defer_indexes=True, progress=None, on_error=None, write_lock=None):
+    """Import words from `path` into the group `group_name`.
+
+    `schema` maps words columns to source fields (see SCHEMAS) and `progress`
+    is called with the running row count after every chunk. Records that do
+    not map onto a word abort the import, unless `on_error` is given: it is
+    then called with the record number and the problem, and the record is
+    skipped. `write_lock` is held around each write transaction. Returns
+    the number of rows imported, the elapsed seconds, rows per second and the
+    group id.
+    """
+    start = time.perf_counter()
+    records = iter_records(path, fmt)
+    first = next(records, None)
+    if first is None:
+        return {'rows': 0, 'seconds': 0.0, 'rows_per_s': 0.0, 'group_id': None}
+    schema = schema or detect_schema(first)
+    rows = checked_rows(itertools.chain([first], records), schema, on_error)
+    chunks = iter(lambda: list(itertools.islice(rows, chunk_size)), [])
+
+    with write_lock or nullcontext(), conn:
+        conn.execute('BEGIN IMMEDIATE')
+        group = conn.execute('SELECT id FROM groups WHERE name = ?', (group_name,)).fetchone()
+        if group:
+            group_id = group[0]
+        else:
+            group_id = conn.execute('INSERT INTO groups (name) VALUES (?)', (group_name,)).lastrowid
+
+    total = 0
+    try:
+        for chunk in chunks:
+            with write_lock or nullcontext(), conn:
+                # Ids are assigned in order inside the write transaction
+                conn.execute('BEGIN IMMEDIATE')
+                if defer_indexes and total == 0 and len(chunk) == chunk_size:
+                    first_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM words').fetchone()[0]
+                    for kind, name, sql in deferred_schema(conn):
+                        conn.execute('INSERT INTO import_deferred (name, type, sql, first_id) VALUES (?, ?, ?, ?)',
+                                     (name, kind, sql, first_id))
+                        conn.execute(f'DROP {kind.upper()} IF EXISTS {name}')
+                last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM words').fetchone()[0]
+                conn.executemany('INSERT INTO words (spanish, english, parts) VALUES (?, ?, ?)', chunk)
+                conn.execute('''
+                    INSERT INTO word_groups (word_id, group_id)
+                    SELECT id, ? FROM words WHERE id > ?
+                ''', (group_id, last_id))
+            total += len(chunk)
+            if progress:
+                progress(total)
+    finally:
+        with write_lock or nullcontext(), conn:
+            conn.execute('BEGIN IMMEDIATE')
+            _restore(conn)
+            conn.execute('''
+                UPDATE groups
+                SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = ?)
+                WHERE id = ?
+            ''', (group_id, group_id))
+
+    seconds = time.perf_counter() - start
+    return {'rows': total, 'seconds': round(seconds, 3), 'rows_per_s': round(total / seconds, 1) if seconds else 0.0,
+            'group_id': group_id}
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Background jobs (vocabulary uploads, archiving reset history).
+#
+# Work that takes longer than a request runs on a single worker thread, one
+# job at a time, and the API answers with a job id right away. Jobs report
+# progress on themselves, which GET /api/jobs/{id} reads. Job state lives in
+# memory only: the last MAX_FINISHED_JOBS finished jobs are kept, and jobs
+# still queued or running at shutdown are cancelled at their next progress
+# report.
+
+MAX_FINISHED_JOBS = int(os.getenv('MAX_FINISHED_JOBS', '100'))
+
+# Record-level errors kept per job; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress report once the queue is shutting down"""
+
+
+class Job:
+    """A queued piece of work and its progress"""
+
+    def __init__(self, kind, params, stopping):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = 'queued'  # queued, running, done, failed, cancelled
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+        self.rows = 0
+        self.errors = []  # [{'record': n, 'message': ...}], first MAX_REPORTED_ERRORS
+        self.error_count = 0
+        self.error = None  # why a failed job stopped
+        self.result = None
+        self._start = None
+        self._seconds = None
+        self._stopping = stopping
+
+    def progress(self, rows):
+        """Called by the job as it goes; raises JobCancelled on shutdown"""
+        self.rows = rows
+        if self._stopping.is_set():
+            raise JobCancelled('Server shutting down')
+
+    def record_error(self, record, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'record': record, 'message': message})
+
+    def to_dict(self):
+        if self._seconds is not None:
+            seconds = self._seconds
+        elif self._start is not None:
+            seconds = time.perf_counter() - self._start
+        else:
+            seconds = 0.0
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': self.params,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'rows': self.rows,
+            'seconds': round(seconds, 3),
+            'rows_per_s': round(self.rows / seconds, 1) if seconds else 0.0,
+            'error_count': self.error_count,
+            'errors': list(self.errors),
+            'error': self.error,
+            'result': self.result,
+        }
+
+
+class JobQueue:
+    """Runs jobs one at a time on a worker thread and keeps their state"""
+
+    def __init__(self, max_finished=100):
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()  # id -> Job, oldest first
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._executor = None
+
+    def start(self):
+        if self._executor is None:
+            self._stopping.clear()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jobs')
+
+    def stop(self):
+        """Cancel queued jobs, stop the running one at its next progress report"""
+        if self._executor is not None:
+            self._stopping.set()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def submit(self, kind, fn, params, cleanup=None):
+        """Queue fn(job); `cleanup` runs after it, whatever happened"""
+        if self._executor is None:
+            raise RuntimeError('Job queue is not running')
+        job = Job(kind, params, self._stopping)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, cleanup)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        """Jobs, newest first"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ('queued', 'running', 'done', 'failed', 'cancelled')}
+
+    def _run(self, job, fn, cleanup):
+        try:
+            if self._stopping.is_set():
+                raise JobCancelled('Server shutting down')
+            job.status = 'running'
+            job.started_at = datetime.now(timezone.utc)
+            job._start = time.perf_counter()
+            job.result = fn(job)
+            job.status = 'done'
+        except JobCancelled as e:
+            job.status, job.error = 'cancelled', str(e)
+        except Exception as e:
+            job.status, job.error = 'failed', str(e)
+        finally:
+            if job._start is not None:
+                job._seconds = time.perf_counter() - job._start
+            job.finished_at = datetime.now(timezone.utc)
+            if cleanup:
+                cleanup()
+
+    def _prune(self):
+        # Forget the oldest finished jobs beyond max_finished
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+# Shared queue for background jobs
+job_queue = JobQueue(MAX_FINISHED_JOBS)
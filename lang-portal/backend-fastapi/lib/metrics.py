@@ -0,0 +1,281 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Request and SQL instrumentation, exported in Prometheus text format.
+#
+# Pooled connections are opened as InstrumentedConnection, whose cursors time
+# every statement and count the rows it returns into the RequestStats of the
+# current request. The stats live in a context variable, which Database.run
+# carries onto the sqlite executor. MetricsMiddleware opens them per request,
+# reports them in a Server-Timing header and folds them into per-route
+# histograms. METRICS=off opens plain connections and skips the middleware.
+
+ENABLED = os.getenv('METRICS', 'on').lower() not in ('off', '0', 'false', 'no')
+
+# Statements running longer than this are logged with their query plan (0 disables)
+SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_MS', '100')) / 1000
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger('lang_portal.sql')
+
+
+class RequestStats:
+    __slots__ = ('path', 'queries', 'sql_time', 'rows')
+
+    def __init__(self, path):
+        self.path = path
+        self.queries = 0
+        self.sql_time = 0.0
+        self.rows = 0
+
+
+_current = ContextVar('request_stats', default=None)
+
+
+def query_plan(conn, sql, params):
+    """EXPLAIN QUERY PLAN of `sql` as an indented tree"""
+    rows = conn.cursor(sqlite3.Cursor).execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return '\n'.join(lines)
+
+
+def _one_line(sql):
+    return ' '.join(sql.split())
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times its statements and counts the rows it returns"""
+    _sql = None
+    _params = ()
+    _elapsed = 0.0
+    _logged = False
+
+    def execute(self, sql, params=()):
+        self._sql, self._params, self._elapsed, self._logged = sql, params, 0.0, False
+        start = time.perf_counter()
+        try:
+            super().execute(sql, params)
+        except sqlite3.Error as e:
+            logger.warning('Query failed (%s): %s', e, _one_line(sql))
+            raise
+        finally:
+            self._record(time.perf_counter() - start, 0, 1)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._sql, self._params, self._elapsed, self._logged = sql, None, 0.0, False
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_params)
+        finally:
+            self._record(time.perf_counter() - start, 0, 1)
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._record(time.perf_counter() - start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._record(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._record(time.perf_counter() - start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._record(time.perf_counter() - start, 0)
+            raise
+        self._record(time.perf_counter() - start, 1)
+        return row
+
+    def _record(self, elapsed, rows, queries=0):
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += queries
+            stats.sql_time += elapsed
+            stats.rows += rows
+        self._elapsed += elapsed
+        if SLOW_QUERY_SECONDS and self._elapsed >= SLOW_QUERY_SECONDS and not self._logged:
+            self._logged = True
+            registry.slow_query()
+            self._log_slow(stats)
+
+    def _log_slow(self, stats):
+        try:
+            plan = query_plan(self.connection, self._sql, self._params) if self._params is not None else ''
+        except sqlite3.Error as e:
+            plan = f'(no plan: {e})'
+        logger.warning(
+            'Slow query (%.1f ms%s): %s%s',
+            self._elapsed * 1000, f', {stats.path}' if stats else '', _one_line(self._sql),
+            f'\n{plan}' if plan else ''
+        )
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors are InstrumentedCursors"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+# Passed to sqlite3.connect(factory=...) for pooled connections
+connection_factory = InstrumentedConnection if ENABLED else sqlite3.Connection
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+class MetricsRegistry:
+    """Per-route request and SQL metrics, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}      # (method, route, status) -> count
+        self._latency = {}       # (method, route) -> Histogram of seconds
+        self._queries = {}       # (method, route) -> Histogram of queries per request
+        self._sql_seconds = {}   # (method, route) -> total SQL seconds
+        self._sql_rows = {}      # (method, route) -> total rows fetched
+        self._slow_queries = 0
+
+    def observe_request(self, method, route, status, seconds, stats):
+        key = (method, route)
+        with self._lock:
+            self._requests[(method, route, status)] = self._requests.get((method, route, status), 0) + 1
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+            self._latency[key].observe(seconds)
+            self._queries[key].observe(stats.queries)
+            self._sql_seconds[key] = self._sql_seconds.get(key, 0.0) + stats.sql_time
+            self._sql_rows[key] = self._sql_rows.get(key, 0) + stats.rows
+
+    def slow_query(self):
+        with self._lock:
+            self._slow_queries += 1
+
+    def render(self, gauges=()):
+        """Prometheus exposition text; `gauges` adds (name, help, value) samples"""
+        out = []
+
+        def header(name, kind, help_text):
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, help_text, series):
+            header(name, 'histogram', help_text)
+            for (method, route), hist in sorted(series.items()):
+                labels = _labels(method=method, route=route)
+                cumulative = 0
+                for bound, count in zip((*hist.buckets, '+Inf'), hist.counts):
+                    cumulative += count
+                    out.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                out.append(f'{name}_sum{{{labels}}} {hist.sum}')
+                out.append(f'{name}_count{{{labels}}} {cumulative}')
+
+        def counter(name, help_text, series):
+            header(name, 'counter', help_text)
+            for (method, route), value in sorted(series.items()):
+                out.append(f'{name}{{{_labels(method=method, route=route)}}} {value}')
+
+        with self._lock:
+            header('lang_portal_http_requests_total', 'counter', 'HTTP requests by route and status')
+            for (method, route, status), count in sorted(self._requests.items()):
+                out.append(f'lang_portal_http_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}')
+            histogram('lang_portal_http_request_duration_seconds', 'Request latency by route', self._latency)
+            histogram('lang_portal_sql_queries_per_request', 'SQL statements run per request', self._queries)
+            counter('lang_portal_sql_seconds_total', 'Time spent in SQL statements and fetches', self._sql_seconds)
+            counter('lang_portal_sql_rows_fetched_total', 'Rows fetched from SQL statements', self._sql_rows)
+            header('lang_portal_sql_slow_queries_total', 'counter',
+                   f'Statements slower than {SLOW_QUERY_SECONDS * 1000:g} ms')
+            out.append(f'lang_portal_sql_slow_queries_total {self._slow_queries}')
+
+        for name, help_text, value in gauges:
+            header(name, 'gauge', help_text)
+            out.append(f'{name} {value}')
+        return '\n'.join(out) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware collecting per-request SQL stats and route latency"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope['path'])
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                timing = (
+                    f'db;dur={stats.sql_time * 1000:.2f};desc="{stats.queries} queries, {stats.rows} rows", '
+                    f'app;dur={(time.perf_counter() - start) * 1000:.2f}'
+                )
+                message = {**message, 'headers': [*message.get('headers', ()), (b'server-timing', timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            # Route templates keep label cardinality bounded
+            route = scope.get('route')
+            registry.observe_request(
+                scope['method'], getattr(route, 'path', 'unmatched'), status,
+                time.perf_counter() - start, stats
+            )
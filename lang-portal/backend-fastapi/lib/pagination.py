@@ -0,0 +1,85 @@
+import base64
+import json
+import math
+import sqlite3
+from fastapi import HTTPException
+
+# Keyset (cursor) pagination helpers.
+#
+# A cursor encodes the sort_by/order it was issued for plus the sort value
+# and id of the last row on the page. The next page continues strictly after
+# that (value, id) pair, so it costs the same no matter how deep it is.
+
+COUNT_MODES = {"exact", "estimate", "none"}
+
+
+def encode_cursor(sort_by, order, value, row_id):
+    payload = json.dumps([sort_by, order, value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort_by, order):
+    """Return (value, id) from a cursor token, or raise a 400"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, cursor_order, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort_by, order):
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by/order")
+    return value, row_id
+
+
+def keyset_condition(sort_expr, id_expr, order, value, row_id):
+    """SQL condition selecting rows after (value, id) in the given order"""
+    op = '<' if order == 'desc' else '>'
+    return (
+        f'({sort_expr} {op} ? OR ({sort_expr} = ? AND {id_expr} {op} ?))',
+        (value, value, row_id)
+    )
+
+
+def page_window(after, sort_expr, id_expr, order, page, per_page):
+    """(condition, params, offset) for a cursor page, or a page-number page
+    when no cursor was given"""
+    if after:
+        condition, params = keyset_condition(sort_expr, id_expr, order, *after)
+        return condition, params, 0
+    return '1 = 1', (), (page - 1) * per_page
+
+
+def next_cursor(rows, per_page, sort_by, order, sort_key, id_key='id'):
+    """Cursor for the page after `rows` (fetched with LIMIT per_page + 1)"""
+    if len(rows) <= per_page:
+        return None
+    last = rows[per_page - 1]
+    return encode_cursor(sort_by, order, last[sort_key], last[id_key])
+
+
+def page_count(total, per_page):
+    if total is None:
+        return None
+    return math.ceil(total / per_page) if total else 0
+
+
+async def count_rows(db, count, sql, params=(), table=None, index=None):
+    """Total row count according to the requested count mode.
+
+    'exact' runs `sql`, 'none' skips counting and 'estimate' reads ANALYZE
+    statistics: the table size, or the average rows per key of `index`.
+    Falls back to the exact count when no statistics are available.
+    """
+    if count == "none":
+        return None
+    if count == "estimate" and table:
+        try:
+            if index:
+                row = await db.fetchone('SELECT stat FROM sqlite_stat1 WHERE tbl = ? AND idx = ?', (table, index))
+            else:
+                row = await db.fetchone('SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1', (table,))
+        except sqlite3.OperationalError:
+            row = None
+        if row:
+            stats = [int(n) for n in row["stat"].split()[:2]]
+            return stats[-1] if index else stats[0]
+    return (await db.fetchone(sql, params))[0]
@@ -0,0 +1,106 @@
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+from lib.db import pool
+from lib.caching import tracker
+
+# In-memory snapshot of the reference tables (study activities and the group
+# catalog). They are read on nearly every page but only change on import or
+# admin actions, so routes look them up here instead of querying or joining.
+#
+# A snapshot is immutable and tagged with the change generations (migration
+# 0005) of the tables it was read from. It is loaded at startup; when a write
+# bumps one of those generations the next request reads a new snapshot and
+# swaps it in, while requests already holding the old one keep using it.
+
+TABLES = ('study_activities', 'groups')
+
+Activity = namedtuple('Activity', ['id', 'name', 'url', 'preview_url'])
+Group = namedtuple('Group', ['id', 'name', 'words_count'])
+
+
+class Snapshot:
+    """Reference rows at one set of generations, by id in id order"""
+    __slots__ = ('generation', 'activities', 'groups', 'groups_by_name')
+
+    def __init__(self, generation, activities, groups):
+        self.generation = generation
+        self.activities = MappingProxyType({activity.id: activity for activity in activities})
+        self.groups = MappingProxyType({group.id: group for group in groups})
+        # Same order as the name index (BINARY collation, then id)
+        self.groups_by_name = tuple(sorted(groups, key=lambda group: (group.name, group.id)))
+
+    def group_name(self, group_id):
+        group = self.groups.get(group_id)
+        return group.name if group else None
+
+    def activity_name(self, activity_id):
+        activity = self.activities.get(activity_id)
+        return activity.name if activity else None
+
+    def name_sessions(self, sessions, activity_key='activity_id'):
+        """Fill in group_name and activity_name of session objects from their ids
+        (those of the two the objects have)"""
+        for session in sessions:
+            if 'group_name' in session:
+                session['group_name'] = self.group_name(session['group_id'])
+            if 'activity_name' in session:
+                session['activity_name'] = self.activity_name(session[activity_key])
+        return sessions
+
+
+class ReferenceData:
+    def __init__(self, pool, tracker):
+        self.pool = pool
+        self.tracker = tracker
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.loads = 0
+
+    def load(self, conn):
+        """Read a new snapshot on `conn` and make it current"""
+        # One read transaction, so the generations match the rows
+        conn.execute('BEGIN')
+        try:
+            generations = dict(conn.execute(
+                f'SELECT table_name, generation FROM change_generations '
+                f'WHERE table_name IN ({", ".join("?" * len(TABLES))})', TABLES
+            ).fetchall())
+            activities = [Activity(*row) for row in conn.execute(
+                'SELECT id, name, url, preview_url FROM study_activities ORDER BY id'
+            )]
+            groups = [Group(*row) for row in conn.execute(
+                'SELECT id, name, words_count FROM groups ORDER BY id'
+            )]
+        finally:
+            conn.rollback()
+        snapshot = Snapshot(tuple(generations.get(table, 0) for table in TABLES), activities, groups)
+        self._snapshot = snapshot
+        self.loads += 1
+        return snapshot
+
+    def current(self):
+        """The snapshot for the current generations, reloading it if they moved"""
+        generations = self.tracker.generations()
+        generation = tuple(generations.get(table, 0) for table in TABLES)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+        with self._lock:
+            # Another request may have reloaded it while we waited
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.generation == generation:
+                return snapshot
+            conn = self.pool.acquire()
+            try:
+                return self.load(conn)
+            finally:
+                self.pool.release(conn)
+
+
+reference = ReferenceData(pool, tracker)
+
+
+# Reference Data Dependency
+def get_reference():
+    return reference.current()
@@ -0,0 +1,107 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# SM-2 spaced repetition.
+#
+# Reviews are pass/fail, so a correct answer is graded 4 ("correct after a
+# hesitation") and a wrong one 1. Each word keeps its repetitions, interval
+# and ease in word_schedule; review_queue holds its due date once per group
+# so the next words of a group are an index range scan.
+
+Schedule = namedtuple('Schedule', 'repetitions interval ease')
+
+NEW_WORD = Schedule(0, 0.0, 2.5)
+MIN_EASE = 1.3
+MAX_INTERVAL = 36500.0  # days; unbounded growth would overflow dates
+CORRECT_GRADE = 4
+WRONG_GRADE = 1
+
+# Same format as CURRENT_TIMESTAMP, so due dates compare with created_at
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def next_schedule(schedule, correct):
+    """SM-2 step: the schedule after one review"""
+    grade = CORRECT_GRADE if correct else WRONG_GRADE
+    if grade >= 3:
+        if schedule.repetitions == 0:
+            interval = 1.0
+        elif schedule.repetitions == 1:
+            interval = 6.0
+        else:
+            interval = min(MAX_INTERVAL, round(schedule.interval * schedule.ease))
+        repetitions = schedule.repetitions + 1
+    else:
+        repetitions, interval = 0, 1.0
+    ease = schedule.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)
+    return Schedule(repetitions, interval, max(MIN_EASE, ease))
+
+
+def due_date(reviewed_at, interval):
+    reviewed = datetime.strptime(str(reviewed_at)[:19], TIMESTAMP_FORMAT)
+    return (reviewed + timedelta(days=interval)).strftime(TIMESTAMP_FORMAT)
+
+
+def record_review(conn, word_id, correct, reviewed_at):
+    """Advance a word's schedule; runs inside the review's transaction"""
+    row = conn.execute(
+        'SELECT repetitions, interval, ease FROM word_schedule WHERE word_id = ?', (word_id,)
+    ).fetchone()
+    schedule = next_schedule(Schedule(*row) if row else NEW_WORD, correct)
+    due_at = due_date(reviewed_at, schedule.interval)
+
+    conn.execute('''
+        INSERT INTO word_schedule (word_id, repetitions, interval, ease, due_at, last_reviewed)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (word_id) DO UPDATE SET
+            repetitions = excluded.repetitions,
+            interval = excluded.interval,
+            ease = excluded.ease,
+            due_at = excluded.due_at,
+            last_reviewed = excluded.last_reviewed
+    ''', (word_id, *schedule, due_at, reviewed_at))
+    conn.execute('DELETE FROM review_queue WHERE word_id = ?', (word_id,))
+    conn.execute('''
+        INSERT INTO review_queue (group_id, due_at, word_id)
+        SELECT group_id, ?, word_id FROM word_groups WHERE word_id = ?
+    ''', (due_at, word_id))
+    return schedule, due_at
+
+
+def rebuild_schedule(conn):
+    """Replay all review history into word_schedule and review_queue.
+    Returns the number of scheduled words."""
+    schedules, last_reviewed = {}, {}
+    for word_id, correct, created_at in conn.execute(
+        'SELECT word_id, correct, created_at FROM word_review_items ORDER BY created_at, id'
+    ):
+        schedules[word_id] = next_schedule(schedules.get(word_id, NEW_WORD), correct)
+        last_reviewed[word_id] = created_at
+
+    with conn:
+        conn.execute('DELETE FROM review_queue')
+        conn.execute('DELETE FROM word_schedule')
+        conn.executemany('''
+            INSERT INTO word_schedule (word_id, repetitions, interval, ease, due_at, last_reviewed)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            (word_id, *schedule, due_date(last_reviewed[word_id], schedule.interval), last_reviewed[word_id])
+            for word_id, schedule in schedules.items()
+        ))
+        conn.execute('''
+            INSERT INTO review_queue (group_id, due_at, word_id)
+            SELECT wg.group_id, s.due_at, s.word_id
+            FROM word_schedule s
+            JOIN word_groups wg ON wg.word_id = s.word_id
+        ''')
+    return len(schedules)
+
+
+def backfill_schedule(conn):
+    """Replay history once when reviews exist but nothing is scheduled yet
+    (first start after the schedule tables were added)"""
+    reviewed = conn.execute('SELECT EXISTS (SELECT 1 FROM word_review_items)').fetchone()[0]
+    scheduled = conn.execute('SELECT EXISTS (SELECT 1 FROM word_schedule)').fetchone()[0]
+    if reviewed and not scheduled:
+        return rebuild_schedule(conn)
+    return 0
@@ -0,0 +1,236 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from lib.db import ConnectionPool, PRAGMAS, current_tenant, pool
+from lib.caching import ChangeTracker
+from lib.writer import ReviewWriter, writer
+from scripts.migrate import apply_migrations
+
+# Multi-tenant mode: one SQLite database per learner.
+#
+# With TENANTS_DIR set, a request carrying an X-Learner-Id header is served
+# from TENANTS_DIR/<learner id>.db, created and migrated on first use. Each
+# learner database has its own connection pool, change tracker and review
+# writer, so learners never wait on each other's write lock. Only the
+# vocabulary catalog (words, groups, word_groups, study_activities) is
+# shared: it stays in the main database, which every learner connection
+# ATTACHes read-only, and TEMP views named after the catalog tables shadow
+# the learner database's own (empty) copies. Being read-only also keeps the
+# catalog out of the writers' BEGIN IMMEDIATE, which would otherwise take its
+# write lock too and serialize all learners on it again.
+# Requests without the header use the main database as before.
+#
+# At most MAX_OPEN_TENANTS learner databases are open at a time; the least
+# recently used one is closed when another has to be opened, and any that
+# has been idle for TENANT_IDLE_SECONDS is closed in the background.
+
+TENANTS_DIR = os.getenv('TENANTS_DIR')
+ENABLED = bool(TENANTS_DIR)
+MAX_OPEN_TENANTS = int(os.getenv('MAX_OPEN_TENANTS', '64'))
+TENANT_IDLE_SECONDS = float(os.getenv('TENANT_IDLE_SECONDS', '300'))
+
+LEARNER_HEADER = 'x-learner-id'
+LEARNER_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+# Shared tables, read from the main database
+CATALOG_TABLES = ('words', 'groups', 'word_groups', 'study_activities')
+
+# Change generations and study totals mix both databases: catalog tables
+# from the main database, everything else from the learner's
+CATALOG_VIEWS = [
+    f'CREATE TEMP VIEW {table} AS SELECT * FROM catalog.{table}' for table in CATALOG_TABLES
+] + [
+    f'''CREATE TEMP VIEW change_generations AS
+        SELECT table_name, generation FROM main.change_generations
+        WHERE table_name NOT IN ({", ".join(f"'{table}'" for table in CATALOG_TABLES)})
+        UNION ALL
+        SELECT table_name, generation FROM catalog.change_generations
+        WHERE table_name IN ({", ".join(f"'{table}'" for table in CATALOG_TABLES)})''',
+    '''CREATE TEMP VIEW study_totals AS
+       SELECT t.id, c.words, t.words_studied, t.mastered_words, t.reviews, t.corrects, t.sessions
+       FROM main.study_totals t, catalog.study_totals c''',
+]
+
+
+def attach_catalog(conn):
+    """Connection setup of learner databases: attach the catalog and shadow its tables"""
+    conn.execute('ATTACH DATABASE ? AS catalog', (Path(pool.database).resolve().as_uri() + '?mode=ro',))
+    conn.execute(f'PRAGMA catalog.mmap_size = {PRAGMAS["mmap_size"]}')
+    for sql in CATALOG_VIEWS:
+        conn.execute(sql)
+
+
+class Tenant:
+    """A learner database with its own pool, change tracker and review writer"""
+
+    def __init__(self, learner_id, path):
+        self.learner_id = learner_id
+        self.path = path
+        self.pool = ConnectionPool(str(path), max_size=pool.max_size, setup=attach_catalog)
+        self.tracker = ChangeTracker(self.pool, schemas=('main', 'catalog'), scope=learner_id)
+        self.writer = ReviewWriter(self.pool, durability=writer.durability, max_batch=writer.max_batch)
+        self.active = 0  # requests in flight; only idle tenants are closed
+        self.last_used = time.monotonic()
+
+    def open(self):
+        """Create or migrate the database, then start the writer"""
+        # Migrations run on a plain connection, where the catalog tables are
+        # the learner database's own (and stay empty)
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute('PRAGMA journal_mode = WAL')
+            apply_migrations(conn)
+        finally:
+            conn.close()
+        self.writer.start()
+
+    def close(self):
+        # Flushes queued reviews first
+        self.writer.stop()
+        self.tracker.close()
+        self.pool.close()
+
+
+class TenantRegistry:
+    """LRU of open learner databases"""
+
+    def __init__(self, directory, max_open=64, idle_seconds=300.0):
+        self.directory = Path(directory)
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._open = OrderedDict()  # learner id -> Tenant, least recently used first
+        self._lock = threading.Lock()
+        self._opening = threading.Lock()  # one tenant is opened at a time
+        self._stop = threading.Event()
+        self._reaper = None
+        # Statistics
+        self._opened = 0
+        self._created = 0
+        self._evicted = 0
+
+    def start(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._reaper is None:
+            self._stop.clear()
+            self._reaper = threading.Thread(target=self._reap, name='tenant-reaper', daemon=True)
+            self._reaper.start()
+
+    def close(self):
+        if self._reaper is not None:
+            self._stop.set()
+            self._reaper.join()
+            self._reaper = None
+        with self._lock:
+            tenants = list(self._open.values())
+            self._open.clear()
+        for tenant in tenants:
+            tenant.close()
+
+    def path(self, learner_id):
+        return self.directory / f'{learner_id}.db'
+
+    def checkout(self, learner_id):
+        """The learner's tenant if it is open, marked in use; None otherwise"""
+        with self._lock:
+            tenant = self._open.get(learner_id)
+            if tenant is not None:
+                self._open.move_to_end(learner_id)
+                tenant.active += 1
+            return tenant
+
+    def acquire(self, learner_id):
+        """The learner's tenant marked in use, opening (and creating) it if needed"""
+        tenant = self.checkout(learner_id)
+        if tenant is not None:
+            return tenant
+        with self._opening:
+            # Someone else may have opened it while we waited
+            tenant = self.checkout(learner_id)
+            if tenant is not None:
+                return tenant
+            path = self.path(learner_id)
+            created = not path.exists()
+            tenant = Tenant(learner_id, path)
+            tenant.open()
+            with self._lock:
+                tenant.active += 1
+                self._open[learner_id] = tenant
+                self._opened += 1
+                self._created += created
+                evicted = self._evict(lambda other: len(self._open) > self.max_open)
+        for other in evicted:
+            other.close()
+        return tenant
+
+    def release(self, tenant):
+        with self._lock:
+            tenant.active -= 1
+            tenant.last_used = time.monotonic()
+
+    def _evict(self, should_evict):
+        """Remove idle tenants, least recently used first, while should_evict(tenant)"""
+        evicted = []
+        for learner_id, tenant in list(self._open.items()):
+            if not should_evict(tenant):
+                break
+            if tenant.active == 0:
+                del self._open[learner_id]
+                evicted.append(tenant)
+        self._evicted += len(evicted)
+        return evicted
+
+    def _reap(self):
+        interval = max(1.0, self.idle_seconds / 4)
+        while not self._stop.wait(interval):
+            with self._lock:
+                deadline = time.monotonic() - self.idle_seconds
+                evicted = self._evict(lambda tenant: tenant.last_used < deadline)
+            for tenant in evicted:
+                tenant.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_open': self.max_open,
+                'open': len(self._open),
+                'active': sum(tenant.active for tenant in self._open.values()),
+                'opened_total': self._opened,
+                'created_total': self._created,
+                'evicted_total': self._evicted,
+            }
+
+
+registry = TenantRegistry(TENANTS_DIR, MAX_OPEN_TENANTS, TENANT_IDLE_SECONDS) if ENABLED else None
+
+
+class TenantMiddleware:
+    """ASGI middleware serving requests with X-Learner-Id from that learner's database"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        learner_id = next((value.decode('latin-1') for name, value in scope['headers']
+                           if name == LEARNER_HEADER.encode()), None)
+        if learner_id is None:
+            return await self.app(scope, receive, send)
+        if not LEARNER_ID.fullmatch(learner_id):
+            response = JSONResponse({'detail': 'Invalid X-Learner-Id'}, status_code=400)
+            return await response(scope, receive, send)
+
+        # Opening a database is blocking work; an open one is a dict lookup
+        tenant = registry.checkout(learner_id) or await run_in_threadpool(registry.acquire, learner_id)
+        token = current_tenant.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+            registry.release(tenant)
@@ -0,0 +1,166 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from lib.db import pool, current_tenant
+from lib.scheduler import record_review
+
+# Durability of acknowledged reviews (PRAGMA synchronous on the writer):
+#   full   - fsync on every group commit, survives power loss
+#   normal - WAL default, survives an app crash, may lose the last commits on power loss
+#   off    - no fsync at all, fastest
+DURABILITY_MODES = {'full': 'FULL', 'normal': 'NORMAL', 'off': 'OFF'}
+
+
+class ReviewRejected(Exception):
+    """A review referenced a session or word that does not exist"""
+
+
+class _Request:
+    __slots__ = ('session_id', 'reviews', 'future')
+
+    def __init__(self, session_id, reviews):
+        self.session_id = session_id
+        self.reviews = reviews  # [(word_id, correct)]
+        self.future = Future()
+
+
+class ReviewWriter:
+    """Single writer thread that batches review inserts into group commits.
+
+    Callers enqueue reviews and wait on a future that resolves once the
+    transaction containing them (and the words' new schedules) has committed.
+    While one commit is in flight, new requests queue up and go out together
+    in the next one, so a burst of single-word reviews costs a handful of
+    fsyncs instead of one each. Every request runs in its own savepoint, so
+    a bad request fails alone without aborting the rest of its batch.
+    """
+
+    def __init__(self, pool, durability='normal', max_batch=1000, max_delay=0.0, max_queue=10000):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f'Unknown durability mode: {durability}')
+        self.pool = pool
+        self.durability = durability
+        self.max_batch = max_batch
+        self.max_delay = max_delay  # extra time to wait for a fuller batch
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        # Statistics
+        self._batches = 0
+        self._reviews = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='review-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, session_id, reviews):
+        """Queue [(word_id, correct)] for a session; returns a Future of [(id, created_at)]"""
+        if self._thread is None:
+            raise RuntimeError('Review writer is not running')
+        request = _Request(session_id, reviews)
+        self._queue.put_nowait(request)  # raises queue.Full when overloaded
+        return request.future
+
+    def stats(self):
+        return {
+            'durability': self.durability,
+            'queued': self._queue.qsize(),
+            'batches': self._batches,
+            'reviews': self._reviews,
+            'avg_batch_reviews': self._reviews / self._batches if self._batches else 0.0,
+        }
+
+    def _run(self):
+        conn = self.pool.open_connection()
+        conn.isolation_level = None  # transactions are managed explicitly
+        conn.execute(f'PRAGMA synchronous = {DURABILITY_MODES[self.durability]}')
+        try:
+            running = True
+            while running:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch, size = [item], len(item.reviews)
+                deadline = time.monotonic() + self.max_delay
+                while size < self.max_batch:
+                    try:
+                        timeout = deadline - time.monotonic()
+                        item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        running = False
+                        break
+                    batch.append(item)
+                    size += len(item.reviews)
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch):
+        with self.pool.write_lock:
+            self._commit_batch(conn, batch)
+
+    def _commit_batch(self, conn, batch):
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for request in batch:
+                conn.execute('SAVEPOINT review')
+                try:
+                    rows = self._insert(conn, request)
+                    conn.execute('RELEASE review')
+                    results.append((request, rows, None))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO review')
+                    conn.execute('RELEASE review')
+                    results.append((request, None, e))
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        self._batches += 1
+        for request, rows, error in results:
+            if error is None:
+                self._reviews += len(rows)
+                request.future.set_result(rows)
+            else:
+                request.future.set_exception(error)
+
+    def _insert(self, conn, request):
+        if not conn.execute('SELECT 1 FROM study_sessions WHERE id = ?', (request.session_id,)).fetchone():
+            raise ReviewRejected('Study session not found')
+        rows = []
+        for word_id, correct in request.reviews:
+            if not conn.execute('SELECT 1 FROM words WHERE id = ?', (word_id,)).fetchone():
+                raise ReviewRejected(f'Word {word_id} not found')
+            review_id, created_at = conn.execute('''
+                INSERT INTO word_review_items (word_id, study_session_id, correct)
+                VALUES (?, ?, ?)
+                RETURNING id, created_at
+            ''', (word_id, request.session_id, bool(correct))).fetchone()
+            record_review(conn, word_id, correct, created_at)
+            rows.append((review_id, created_at))
+        return rows
+
+
+# Shared writer used by the review endpoints
+writer = ReviewWriter(pool, durability=os.getenv('REVIEW_DURABILITY', 'normal').lower())
+
+
+def current_writer():
+    """Writer of the current request's learner database, or the shared one"""
+    tenant = current_tenant.get()
+    return tenant.writer if tenant else writer
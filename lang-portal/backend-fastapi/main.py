@@ -1,22 +1,59 @@
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routes import dashboard, study_activities, words, groups, study_sessions#, review
-from lib.db import db
+from routes import dashboard, study_activities, words, groups, study_sessions, review, export, jobs, admin, batch
+from lib import archive, metrics, tenants
+from lib.db import pool
+from lib.caching import tracker
+from lib.reference import reference
+from lib.writer import writer
+from lib.jobs import job_queue
+from lib.scheduler import backfill_schedule
+from lib.importer import restore_deferred
+from scripts.migrate import apply_migrations
 
 
 app = FastAPI()
 
 @app.on_event("startup")
 async def startup():
-    # Initialize database connection
-    db.connect()
-    
+    # Open the first pooled connection (applies PRAGMAs, enables WAL)
+    # and bring the schema up to date
+    conn = pool.acquire()
+    try:
+        apply_migrations(conn)
+        # Indexes and triggers an import stopped halfway left dropped
+        restore_deferred(conn, pool.write_lock)
+        backfill_schedule(conn)
+        # Activities and the group catalog, served from memory
+        reference.load(conn)
+    finally:
+        pool.release(conn)
+    # Single writer thread for review submissions
+    writer.start()
+    # Background jobs (vocabulary uploads, archiving reset history)
+    job_queue.start()
+    # Finish archiving the history of a reset the last run was stopped in
+    archive.resume(pool)
+    # Per-learner databases (TENANTS_DIR) are opened on first use
+    if tenants.ENABLED:
+        tenants.registry.start()
+
 @app.on_event("shutdown")
 async def shutdown():
-    # Cleanup database connection
-    db.close()
+    # Stop imports at their next chunk, flush queued reviews,
+    # then close pooled connections
+    job_queue.stop()
+    if tenants.ENABLED:
+        tenants.registry.close()
+    writer.stop()
+    tracker.close()
+    pool.close()
+
 
+# Requests with X-Learner-Id use that learner's database (TENANTS_DIR)
+if tenants.ENABLED:
+    app.add_middleware(tenants.TenantMiddleware)
 
 origins = [
     "http://localhost:8080",
@@ -27,13 +64,64 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", "If-None-Match", "X-Learner-Id"],
+    expose_headers=["ETag", "Server-Timing"],
 )
 
+# Per-request SQL stats and route latency histograms (METRICS=off disables)
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.get("/api/pool")
+async def get_pool_stats():
+    # Connection pool wait time and checked out connections
+    return pool.stats()
+
+
+@app.get("/api/writer")
+async def get_writer_stats():
+    # Review write queue depth and group commit batch sizes
+    return writer.stats()
+
+
+@app.get("/api/tenants")
+async def get_tenant_stats():
+    # Open learner databases and LRU evictions (multi-tenant mode only)
+    if not tenants.ENABLED:
+        raise HTTPException(status_code=404, detail="Multi-tenant mode is off (set TENANTS_DIR)")
+    return tenants.registry.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # Prometheus text format: request/SQL metrics plus pool and writer gauges
+    pool_stats = pool.stats()
+    writer_stats = writer.stats()
+    gauges = [
+        ('lang_portal_pool_connections', 'Open pooled connections', pool_stats['size']),
+        ('lang_portal_pool_checked_out', 'Pooled connections in use', pool_stats['checked_out']),
+        ('lang_portal_pool_wait_seconds_max', 'Longest wait for a pooled connection', pool_stats['wait_time_max']),
+        ('lang_portal_writer_queued', 'Review submissions waiting for the writer', writer_stats['queued']),
+        ('lang_portal_writer_avg_batch_reviews', 'Average reviews per group commit', writer_stats['avg_batch_reviews']),
+        ('lang_portal_jobs_queued', 'Background jobs waiting to run', job_queue.stats()['queued']),
+    ]
+    if tenants.ENABLED:
+        tenant_stats = tenants.registry.stats()
+        gauges += [
+            ('lang_portal_tenants_open', 'Open learner databases', tenant_stats['open']),
+            ('lang_portal_tenants_evicted', 'Learner databases closed by the LRU or for idleness', tenant_stats['evicted_total']),
+        ]
+    return Response(metrics.registry.render(gauges), media_type="text/plain; version=0.0.4")
+
 
 app.include_router(dashboard.router)
 app.include_router(study_activities.router)
-# app.include_router(words.router)
+app.include_router(words.router)
 app.include_router(groups.router)
 app.include_router(study_sessions.router)
-# app.include_router(review.router)
+app.include_router(review.router)
+app.include_router(export.router)
+app.include_router(jobs.router)
+app.include_router(admin.router)
+app.include_router(batch.router)
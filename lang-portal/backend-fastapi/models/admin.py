@@ -0,0 +1,6 @@
+from typing import Optional
+from models.common import SuccessResponse
+
+# History resets
+class ResetResponse(SuccessResponse):
+    job_id: Optional[str]  # background job archiving the old tables (GET /api/jobs/{id})
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List
+
+# Batched reads
+class BatchItem(BaseModel):
+    path: str  # an API GET route, optionally with a query string
+    params: Dict[str, Any] = {}  # more query parameters
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+class BatchItemResponse(BaseModel):
+    status: int
+    body: Any  # the route's JSON response
+
+class BatchResponse(BaseModel):
+    responses: List[BatchItemResponse]
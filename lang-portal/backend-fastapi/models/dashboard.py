@@ -8,15 +8,19 @@ class LastStudySessionResponse(BaseModel):
     created_at: datetime
     study_activity_id: int
     group_name: str
+    activity_name: str
+    correct_count: int
+    wrong_count: int
 
-# class StudyProgressResponse(BaseModel):
-#     total_words_studied: int
-#     total_available_words: int
+class StudyProgressResponse(BaseModel):
+    total_words_studied: int
+    total_available_words: int
 
 class QuickStatsResponse(BaseModel):
-    success_rate: float
-    total_study_sessions: int
-    total_active_groups: int
-    study_streak_days: int
+    total_vocabulary: int
     total_words_studied: int
-    total_available_words: int
+    mastered_words: int
+    success_rate: float
+    total_sessions: int
+    active_groups: int
+    current_streak: int
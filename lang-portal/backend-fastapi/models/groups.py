@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class GroupResponse(BaseModel):
     id: int
@@ -8,8 +8,9 @@ class GroupResponse(BaseModel):
 
 class PaginatedGroupResponse(BaseModel):
     groups: List[GroupResponse]
-    total_pages: int
+    total_pages: Optional[int]
     current_page: int
+    next_cursor: Optional[str] = None
 
 class GroupWordResponse(BaseModel):
     id: int
@@ -20,8 +21,9 @@ class GroupWordResponse(BaseModel):
 
 class PaginatedWordResponse(BaseModel):
     words: List[GroupWordResponse]
-    total_pages: int
+    total_pages: Optional[int]
     current_page: int
+    next_cursor: Optional[str] = None
 
 class StudySessionResponse(BaseModel):
     id: int
@@ -35,5 +37,18 @@ class StudySessionResponse(BaseModel):
 
 class PaginatedSessionResponse(BaseModel):
     study_sessions: List[StudySessionResponse]
-    total_pages: int
-    current_page: int
\ No newline at end of file
+    total_pages: Optional[int]
+    current_page: int
+    next_cursor: Optional[str] = None
+
+class NextWordResponse(BaseModel):
+    id: int
+    spanish: str
+    english: str
+    due_at: Optional[str]  # None for words never reviewed
+    interval: float        # days
+    repetitions: int
+
+class NextWordsResponse(BaseModel):
+    group_id: int
+    words: List[NextWordResponse]
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Background jobs
+class JobError(BaseModel):
+    record: Optional[int]
+    message: str
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    params: Dict[str, Any]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    rows: int
+    seconds: float
+    rows_per_s: float
+    error_count: int
+    errors: List[JobError]
+    error: Optional[str]
+    result: Optional[Dict[str, Any]]
+
+class JobListResponse(BaseModel):
+    jobs: List[JobResponse]
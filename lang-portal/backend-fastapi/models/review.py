@@ -1,11 +1,27 @@
-from common.models import PaginatedResponse
-from pydantic import BaseModel
+from models.common import PaginatedResponse
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List
 
 # Review
+class ReviewRequest(BaseModel):
+    correct: bool
+
+class WordReview(BaseModel):
+    word_id: int
+    is_correct: bool
+
+class BatchReviewRequest(BaseModel):
+    reviews: List[WordReview] = Field(min_length=1, max_length=1000)
+
 class ReviewResponse(BaseModel):
     success: bool
     word_id: int
     study_session_id: int
     correct: bool
     created_at: datetime
+
+class BatchReviewResponse(BaseModel):
+    success: bool
+    study_session_id: int
+    reviews: List[ReviewResponse]
@@ -1,7 +1,7 @@
 # from common.models import PaginatedResponse
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 
 # Pydantic Models
@@ -23,10 +23,11 @@ class StudySessionListItem(BaseModel):
 
 class PaginatedSessionResponse(BaseModel):
     items: List[StudySessionListItem]
-    total: int
+    total: Optional[int]
     page: int
     per_page: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 class GroupResponse(BaseModel):
     id: int
@@ -1,8 +1,7 @@
 # from common.models import PaginatedResponse
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
-from study_activites import StudySessionItem
 
 # Pydantic Models
 class StudySessionListItem(BaseModel):
@@ -17,10 +16,11 @@ class StudySessionListItem(BaseModel):
 
 class StudySessionListResponse(BaseModel):
     items: List[StudySessionListItem]
-    total: int
+    total: Optional[int]
     page: int
     per_page: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 class SessionWordStats(BaseModel):
     id: int
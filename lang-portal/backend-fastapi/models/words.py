@@ -10,9 +10,10 @@ class WordResponse(BaseModel):
 
 class PaginatedWordsResponse(BaseModel):
     words: List[WordResponse]
-    total_pages: int
+    total_pages: Optional[int]
     current_page: int
-    total_words: int
+    total_words: Optional[int]
+    next_cursor: Optional[str] = None
 
 class WordGroupResponse(BaseModel):
     id: int
@@ -24,4 +25,16 @@ class WordDetailResponse(BaseModel):
     english: str
     correct_count: int
     wrong_count: int
-    groups: List[WordGroupResponse]
\ No newline at end of file
+    groups: List[WordGroupResponse]
+
+class WordSearchResult(BaseModel):
+    id: int
+    spanish: str
+    english: str
+    romaji: Optional[str]
+    snippet: str  # best matching field with matches wrapped in <mark>
+    score: float
+
+class WordSearchResponse(BaseModel):
+    query: str
+    results: List[WordSearchResult]
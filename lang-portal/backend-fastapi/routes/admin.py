@@ -0,0 +1,40 @@
+# endpoints/admin.py
+from fastapi import APIRouter, HTTPException
+from starlette.concurrency import run_in_threadpool
+from models.admin import ResetResponse
+from lib import archive
+from lib.db import current_pool, current_tenant
+from scripts.seed import seed_catalog
+
+router = APIRouter(prefix="/api", tags=["admin"])
+
+
+async def reset_tables(tables, seed=None):
+    # Empty tables are swapped in right away; a background job archives the
+    # old ones and purges them. Returns the job's id.
+    try:
+        job = await run_in_threadpool(archive.reset, current_pool(), tables, current_tenant.get(), seed)
+        return job.id if job else None
+    except archive.ResetInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Endpoints
+@router.post("/reset_history", response_model=ResetResponse)
+async def reset_history():
+    # Sessions, reviews and everything counted from them; the vocabulary stays
+    job_id = await reset_tables(archive.HISTORY_TABLES)
+    return {"success": True, "message": "Study history has been reset", "job_id": job_id}
+
+
+@router.post("/full_reset", response_model=ResetResponse)
+async def full_reset():
+    # History and vocabulary, then the seed data again
+    if current_tenant.get() is not None:
+        raise HTTPException(status_code=403, detail="The vocabulary is shared by all learners; reset the history instead")
+    pool = current_pool()
+    job_id = await reset_tables(archive.HISTORY_TABLES + archive.CATALOG_TABLES,
+                                seed=lambda conn: seed_catalog(conn, pool.write_lock))
+    return {"success": True, "message": "System has been fully reset", "job_id": job_id}
@@ -0,0 +1,130 @@
+# endpoints/batch.py
+import asyncio
+import os
+from urllib.parse import urlencode, urlsplit
+from fastapi import APIRouter, HTTPException, Request, Response
+from starlette.routing import Match
+from models.batch import BatchRequest, BatchResponse
+from lib.db import Database, current_pool, shared_db
+from lib.fastjson import dumps
+
+router = APIRouter(prefix="/api/batch", tags=["batch"])
+
+MAX_BATCH_REQUESTS = int(os.getenv('MAX_BATCH_REQUESTS', '20'))
+
+# Streamed on connections of their own, or batches themselves
+EXCLUDED_PREFIXES = ("/api/batch", "/api/export")
+
+# Request headers that belong to the batch, not to the reads in it
+BATCH_HEADERS = {b"content-length", b"content-type", b"accept-encoding", b"if-none-match", b"if-modified-since"}
+
+
+class SnapshotDatabase(Database):
+    """A pooled connection in one read transaction, shared by the reads of a batch"""
+
+    def begin(self):
+        self.connect().execute('BEGIN')
+
+    # Reads only: the transaction lasts until the batch releases the connection
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def check_path(path: str):
+    url = urlsplit(path)
+    if url.scheme or url.netloc or not url.path.startswith("/api/") or url.path.startswith(EXCLUDED_PREFIXES):
+        raise HTTPException(status_code=400, detail=f"Not a batchable API route: {path}")
+    return url
+
+
+def route_path(app, scope):
+    """The path of `scope` as the app's routes spell it. Without or with a
+    trailing slash where only the other form is a route, as the app would
+    redirect to: a batch answers the read, not the redirect."""
+    path = scope["path"]
+    if path == "/":
+        return path
+    for candidate in (path, path[:-1] if path.endswith("/") else path + "/"):
+        matched = dict(scope, path=candidate, raw_path=candidate.encode())
+        if any(route.matches(matched)[0] == Match.FULL for route in app.router.routes):
+            return candidate
+    return path
+
+
+async def dispatch(request: Request, path: str, query: str):
+    # One GET through the whole app (middlewares included), answered in memory
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": [(name, value) for name, value in request.scope["headers"] if name not in BATCH_HEADERS],
+    }
+    if "state" in request.scope:
+        scope["state"] = request.scope["state"]
+    scope["path"] = route_path(request.app, scope)
+    scope["raw_path"] = scope["path"].encode()
+    status, content_type, body = 500, b"", []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            content_type = dict(message.get("headers", ())).get(b"content-type", b"")
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        # The app's error middleware has answered with a 500 already
+        status = 500
+    body = b"".join(body)
+    if not body:
+        body = b"null"
+    elif not content_type.startswith(b"application/json"):
+        body = dumps(body.decode("utf-8", "replace"))
+    return b'{"status":%d,"body":%s}' % (status, body)
+
+
+# Endpoints
+@router.post("", response_model=BatchResponse)
+async def batch(payload: BatchRequest, request: Request):
+    # Several GETs in one round trip. They run concurrently on one pooled
+    # connection in a single read transaction, so every response comes from
+    # the same snapshot of the database; statements on that connection take
+    # turns. Response bodies are embedded as the routes wrote them.
+    if not payload.requests:
+        raise HTTPException(status_code=400, detail="No requests")
+    if len(payload.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_REQUESTS} requests per batch")
+    reads = []
+    for item in payload.requests:
+        url = check_path(item.path)
+        query = "&".join(part for part in (url.query, urlencode(item.params, doseq=True)) if part)
+        reads.append((url.path, query))
+
+    db = SnapshotDatabase(pool=current_pool())
+    try:
+        await db.run(db.begin)
+        token = shared_db.set(db)
+        try:
+            responses = await asyncio.gather(*(dispatch(request, path, query) for path, query in reads))
+        finally:
+            shared_db.reset(token)
+    finally:
+        db.close()
+    return Response(b'{"responses":[' + b",".join(responses) + b"]}", media_type="application/json")
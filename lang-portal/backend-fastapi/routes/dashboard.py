@@ -1,51 +1,41 @@
 from fastapi import APIRouter, HTTPException, Depends
-from models.dashboard import LastStudySessionResponse, QuickStatsResponse#,StudyProgressResponse
-import sqlite3
-from lib.db import Database
-
-
-# Database connection dependency
-# def get_db():
-#     db = sqlite3.connect("words.db")
-#     db.row_factory = sqlite3.Row  # Enable dictionary-like access
-#     try:
-#         yield db
-#     finally:
-#         db.close()
-
-# Database Dependency
-def get_db():
-    db = Database()
-    db.connect()
-    try:
-        yield db
-    finally:
-        db.close()
+from models.dashboard import LastStudySessionResponse, QuickStatsResponse, StudyProgressResponse
+from lib.db import Database, get_db
+from lib.caching import conditional
 
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 # Endpoint: /recent-session
-@router.get("/recent-session", response_model=LastStudySessionResponse)
-def get_recent_session(db: sqlite3.Connection = Depends(get_db)):
+@router.get("/recent-session", response_model=LastStudySessionResponse,
+            dependencies=[Depends(conditional(
+                "study_sessions", "word_review_items", "groups", "study_activities",
+                cache_control="private, no-cache"
+            ))])
+def get_recent_session(db: Database = Depends(get_db)):
     try:
-        cursor = db.cursor()
+        cursor = db.connection.cursor()
         
         # Get the most recent study session with activity name and results
         cursor.execute('''
             SELECT 
                 ss.id,
                 ss.group_id,
+                g.name as group_name,
+                ss.study_activity_id,
                 sa.name as activity_name,
                 ss.created_at,
                 COUNT(CASE WHEN wri.correct = 1 THEN 1 END) as correct_count,
                 COUNT(CASE WHEN wri.correct = 0 THEN 1 END) as wrong_count
-            FROM study_sessions ss
+            FROM (
+                SELECT * FROM study_sessions
+                ORDER BY created_at DESC
+                LIMIT 1
+            ) ss
             JOIN study_activities sa ON ss.study_activity_id = sa.id
+            JOIN groups g ON ss.group_id = g.id
             LEFT JOIN word_review_items wri ON ss.id = wri.study_session_id
             GROUP BY ss.id
-            ORDER BY ss.created_at DESC
-            LIMIT 1
         ''')
         
         session = cursor.fetchone()
@@ -53,103 +43,85 @@ def get_recent_session(db: sqlite3.Connection = Depends(get_db)):
         if not session:
             raise HTTPException(status_code=404, detail="No recent session found")
         
-        return session  # FastAPI automatically converts sqlite3.Row to JSON
+        return dict(session)
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Endpoint: /dashboard/study_progress
+@router.get("/study_progress", response_model=StudyProgressResponse,
+            dependencies=[Depends(conditional(
+                "words", "word_review_items", cache_control="private, no-cache"
+            ))])
+def get_study_progress(db: Database = Depends(get_db)):
+    try:
+        totals = db.connection.execute(
+            'SELECT words, words_studied FROM study_totals WHERE id = 1'
+        ).fetchone()
+
+        return {
+            "total_words_studied": totals["words_studied"] if totals else 0,
+            "total_available_words": totals["words"] if totals else 0
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # Endpoint: /dashboard/quick_stats
-@router.get("/quick_stats", response_model=QuickStatsResponse)
-def get_study_stats(db: sqlite3.Connection = Depends(get_db)):
+# Everything here is read from the rollup tables kept current by triggers
+# (migration 0004), so the cost does not grow with review history.
+@router.get("/quick_stats", response_model=QuickStatsResponse,
+            dependencies=[Depends(conditional(
+                "words", "study_sessions", "word_review_items",
+                cache_control="private, no-cache", daily=True
+            ))])
+def get_study_stats(db: Database = Depends(get_db)):
     try:
-        cursor = db.cursor()
-        
-        # Get total vocabulary count
-        cursor.execute('SELECT COUNT(*) as total_vocabulary FROM words')
-        total_vocabulary = cursor.fetchone()["total_vocabulary"]
+        cursor = db.connection.cursor()
+
+        # All-time totals
+        cursor.execute('SELECT * FROM study_totals WHERE id = 1')
+        totals = cursor.fetchone()
+        reviews = totals["reviews"] if totals else 0
+        success_rate = totals["corrects"] * 1.0 / reviews if reviews else 0
 
-        # Get total unique words studied
-        cursor.execute('''
-            SELECT COUNT(DISTINCT word_id) as total_words
-            FROM word_review_items wri
-            JOIN study_sessions ss ON wri.study_session_id = ss.id
-        ''')
-        total_words = cursor.fetchone()["total_words"]
-        
-        # Get mastered words (words with >80% success rate and at least 5 attempts)
-        cursor.execute('''
-            WITH word_stats AS (
-                SELECT 
-                    word_id,
-                    COUNT(*) as total_attempts,
-                    SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) * 1.0 / COUNT(*) as success_rate
-                FROM word_review_items wri
-                JOIN study_sessions ss ON wri.study_session_id = ss.id
-                GROUP BY word_id
-                HAVING total_attempts >= 5
-            )
-            SELECT COUNT(*) as mastered_words
-            FROM word_stats
-            WHERE success_rate >= 0.8
-        ''')
-        mastered_words = cursor.fetchone()["mastered_words"]
-        
-        # Get overall success rate
-        cursor.execute('''
-            SELECT 
-                SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) * 1.0 / COUNT(*) as success_rate
-            FROM word_review_items wri
-            JOIN study_sessions ss ON wri.study_session_id = ss.id
-        ''')
-        success_rate = cursor.fetchone()["success_rate"] or 0
-        
-        # Get total number of study sessions
-        cursor.execute('SELECT COUNT(*) as total_sessions FROM study_sessions')
-        total_sessions = cursor.fetchone()["total_sessions"]
-        
         # Get number of groups with activity in the last 30 days
         cursor.execute('''
             SELECT COUNT(DISTINCT group_id) as active_groups
-            FROM study_sessions
-            WHERE created_at >= date('now', '-30 days')
+            FROM daily_groups
+            WHERE day >= date('now', '-30 days')
         ''')
         active_groups = cursor.fetchone()["active_groups"]
-        
-        # Calculate current streak (consecutive days with at least one study session)
+
+        # Current streak: consecutive study days ending today (or yesterday,
+        # if nothing has been studied yet today)
         cursor.execute('''
-            WITH daily_sessions AS (
-                SELECT 
-                    date(created_at) as study_date,
-                    COUNT(*) as session_count
-                FROM study_sessions
-                GROUP BY date(created_at)
-            ),
-            streak_calc AS (
-                SELECT 
-                    study_date,
-                    julianday(study_date) - julianday(lag(study_date, 1) over (order by study_date)) as days_diff
-                FROM daily_sessions
-            )
-            SELECT COUNT(*) as streak
-            FROM (
-                SELECT study_date
-                FROM streak_calc
-                WHERE days_diff = 1 OR days_diff IS NULL
-                ORDER BY study_date DESC
-            )
+            SELECT streak
+            FROM daily_stats
+            WHERE day IN (date('now'), date('now', '-1 day')) AND sessions > 0
+            ORDER BY day DESC
+            LIMIT 1
         ''')
-        current_streak = cursor.fetchone()["streak"]
-        
+        streak = cursor.fetchone()
+        current_streak = streak["streak"] if streak else 0
+
         return {
-            "total_vocabulary": total_vocabulary,
-            "total_words_studied": total_words,
-            # "mastered_words": mastered_words,
+            "total_vocabulary": totals["words"] if totals else 0,
+            "total_words_studied": totals["words_studied"] if totals else 0,
+            "mastered_words": totals["mastered_words"] if totals else 0,
             "success_rate": success_rate,
-            "total_sessions": total_sessions,
+            "total_sessions": totals["sessions"] if totals else 0,
             "active_groups": active_groups,
             "current_streak": current_streak
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,122 @@
+# endpoints/export.py
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from lib.db import current_pool
+from lib.export import FORMATS, Export
+from lib.reference import Snapshot, get_reference
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+REVIEW_COLUMNS = ("id", "created_at", "study_session_id", "group_id", "activity_id",
+                  "word_id", "spanish", "english", "correct")
+WORD_COLUMNS = ("id", "spanish", "english", "parts", "correct_count", "wrong_count")
+
+
+def check_format(format: str):
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(FORMATS)}")
+    return format
+
+
+def check_group(group_id: Optional[int], ref: Snapshot):
+    if group_id is not None and group_id not in ref.groups:
+        raise HTTPException(status_code=404, detail="Group not found")
+
+
+def sql_time(value: datetime):
+    # Timestamps are stored as UTC 'YYYY-MM-DD HH:MM:SS' text
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=" ")
+
+
+def export_response(export: Export, name: str, format: str):
+    return StreamingResponse(
+        export.stream(),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    )
+
+
+# Endpoints
+@router.get("/reviews")
+async def export_reviews(
+    format: str = Query("csv", description="csv or ndjson"),
+    since: Optional[datetime] = Query(None, description="Only reviews at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only reviews before this time"),
+    group_id: Optional[int] = Query(None, description="Only reviews in sessions of this group"),
+    ref: Snapshot = Depends(get_reference)
+):
+    # Review history by session start, then review time. Sessions come off
+    # idx_study_sessions_created (or _group_created) and their reviews off
+    # idx_word_review_items_session_created, already in that order.
+    format = check_format(format)
+    check_group(group_id, ref)
+
+    conditions, params = [], []
+    if group_id is not None:
+        conditions.append("ss.group_id = ?")
+        params.append(group_id)
+    if since is not None:
+        # A session's reviews fall between its start and its end
+        conditions += ["ss.ended_at >= ?", "wri.created_at >= ?"]
+        params += [sql_time(since)] * 2
+    if until is not None:
+        conditions += ["ss.created_at < ?", "wri.created_at < ?"]
+        params += [sql_time(until)] * 2
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    export = Export(current_pool(), f'''
+        SELECT
+            wri.id,
+            replace(wri.created_at, ' ', 'T') as created_at,
+            ss.id as study_session_id,
+            ss.group_id,
+            ss.study_activity_id as activity_id,
+            wri.word_id,
+            w.spanish,
+            w.english,
+            wri.correct
+        FROM study_sessions ss
+        JOIN word_review_items wri ON wri.study_session_id = ss.id
+        LEFT JOIN words w ON w.id = wri.word_id
+        {where}
+        ORDER BY ss.created_at, ss.id, wri.created_at, wri.id
+    ''', params, REVIEW_COLUMNS, format, booleans=("correct",))
+    return export_response(export, "reviews", format)
+
+
+@router.get("/words")
+async def export_words(
+    format: str = Query("csv", description="csv or ndjson"),
+    group_id: Optional[int] = Query(None, description="Only words in this group"),
+    ref: Snapshot = Depends(get_reference)
+):
+    # Words by id with their review counters
+    format = check_format(format)
+    check_group(group_id, ref)
+
+    # Group words come off idx_word_groups_group_word in word id order
+    joins, where, order, params = "", "", "w.id", []
+    if group_id is not None:
+        joins, where, order, params = (
+            "JOIN word_groups wg ON wg.word_id = w.id", "WHERE wg.group_id = ?", "wg.word_id", [group_id]
+        )
+
+    export = Export(current_pool(), f'''
+        SELECT
+            w.id,
+            w.spanish,
+            w.english,
+            w.parts,
+            COALESCE(wr.correct_count, 0) as correct_count,
+            COALESCE(wr.wrong_count, 0) as wrong_count
+        FROM words w
+        {joins}
+        LEFT JOIN word_reviews wr ON wr.word_id = w.id
+        {where}
+        ORDER BY {order}
+    ''', params, WORD_COLUMNS, format)
+    return export_response(export, "words", format)
@@ -1,84 +1,126 @@
 # endpoints/groups.py
-from fastapi import APIRouter, HTTPException, Depends, Query
-from models.groups import GroupResponse, PaginatedGroupResponse, PaginatedWordResponse, PaginatedSessionResponse
-import math
-from lib.db import Database
+import os
+import tempfile
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from models.groups import (GroupResponse, PaginatedGroupResponse, PaginatedWordResponse, PaginatedSessionResponse,
+                           GroupWordResponse, StudySessionResponse, NextWordsResponse)
+from models.jobs import JobResponse
+from typing import Optional
+from lib.db import Database, get_db, pool
+from lib.importer import SCHEMAS, import_words
+from lib.jobs import job_queue
+from lib.caching import conditional
+from lib.reference import Snapshot, get_reference
+from lib.fastjson import FastJSONResponse, Record
+from lib.pagination import COUNT_MODES, decode_cursor, page_window, next_cursor, page_count, count_rows
+from lib.fields import FIELDS_DESCRIPTION, parse_fields, parse_include, select_list
+from routes.words import WORD_COLUMNS, REVIEW_FIELDS, REVIEW_JOIN, WORD_INCLUDES, INCLUDE_DESCRIPTION, attach_groups
 
 router = APIRouter(prefix="/api/groups", tags=["groups"])
 
-# Database Dependency
-def get_db():
-    db = Database()
-    db.connect()
-    try:
-        yield db
-    finally:
-        db.close()
+# Uploaded word lists are spooled to UPLOAD_DIR and imported in the background
+UPLOAD_DIR = os.getenv('UPLOAD_DIR') or None  # None: the system temp directory
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_MB', '512')) * 1024 * 1024
+# Words per import transaction; small enough that review writes are not held up
+IMPORT_CHUNK_ROWS = int(os.getenv('IMPORT_CHUNK_ROWS', '100'))
+
+UPLOAD_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+GROUPS_PAGE = Record(PaginatedGroupResponse)
+GROUP_ROW = Record(GroupResponse)
+WORDS_PAGE = Record(PaginatedWordResponse)
+WORD_ROW = Record(GroupWordResponse)
+SESSIONS_PAGE = Record(PaginatedSessionResponse)
+SESSION_ROW = Record(StudySessionResponse)
 
-@router.get("/", response_model=PaginatedGroupResponse)
+GROUP_COLUMNS = {
+    "id": "id",
+    "group_name": "name",
+    "word_count": "words_count"
+}
+# Names are filled in from the reference snapshot, by their ids
+SESSION_COLUMNS = {
+    "id": "s.id",
+    "group_id": "s.group_id",
+    "group_name": "NULL",
+    "study_activity_id": "s.study_activity_id",
+    "activity_name": "NULL",
+    "start_time": "s.created_at",
+    "end_time": "s.ended_at",
+    "review_items_count": "s.review_count"
+}
+SESSION_NAME_IDS = {"group_name": "group_id", "activity_name": "study_activity_id"}
+
+@router.get("/", response_model=PaginatedGroupResponse,
+            dependencies=[Depends(conditional("groups"))])
 async def get_groups(
+    response: Response,
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     sort_by: str = Query("name", description="Sort by 'name' or 'words_count'"),
     order: str = Query("asc", description="Sort order: 'asc' or 'desc'"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    count: str = Query("exact", description="Total count: exact, estimate or none"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Database = Depends(get_db)
 ):
-    try:
-        cursor = db.connection.cursor()
-        offset = (page - 1) * per_page
+    # Validate sorting parameters
+    valid_columns = {"name", "words_count"}
+    sort_by = sort_by if sort_by in valid_columns else "name"
+    order = order.lower() if order.lower() in {"asc", "desc"} else "asc"
+    count = count if count in COUNT_MODES else "exact"
+    after = decode_cursor(cursor, sort_by, order) if cursor else None
+    names = parse_fields(fields, GroupResponse)
 
-        # Validate sorting parameters
-        valid_columns = {"name", "words_count"}
-        sort_by = sort_by if sort_by in valid_columns else "name"
-        order = order.lower() if order.lower() in {"asc", "desc"} else "asc"
+    try:
+        condition, params, offset = page_window(after, sort_by, "id", order, page, per_page)
 
         # Get total groups count
-        cursor.execute("SELECT COUNT(*) FROM groups")
-        total_groups = cursor.fetchone()[0]
-        total_pages = math.ceil(total_groups / per_page) if total_groups else 0
+        total_groups = await count_rows(db, count, "SELECT COUNT(*) FROM groups", table="groups")
 
-        # Get paginated groups
-        cursor.execute(f'''
-            SELECT id, name, words_count
+        # Get paginated groups (one extra row tells whether there is a next page)
+        rows = await db.fetchall(f'''
+            SELECT {select_list(GROUP_COLUMNS, names)}, {sort_by} AS sort_key
             FROM groups
-            ORDER BY {sort_by} {order}
+            WHERE {condition}
+            ORDER BY {sort_by} {order}, id {order}
             LIMIT ? OFFSET ?
-        ''', (per_page, offset))
+        ''', (*params, per_page + 1, offset))
 
-        groups = [{
-            "id": group["id"],
-            "group_name": group["name"],
-            "word_count": group["words_count"]
-        } for group in cursor.fetchall()]
-
-        return {
-            "groups": groups,
-            "total_pages": total_pages,
-            "current_page": page
-        }
+        # Returned directly, so the ETag headers are copied over
+        return FastJSONResponse(GROUPS_PAGE(
+            groups=GROUP_ROW.only(names).rows(rows[:per_page]),
+            total_pages=page_count(total_groups, per_page),
+            current_page=page,
+            next_cursor=next_cursor(rows, per_page, sort_by, order, "sort_key")
+        ), headers=response.headers)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{group_id}", response_model=GroupResponse)
-async def get_group(group_id: int, db: Database = Depends(get_db)):
+@router.get("/{group_id}", response_model=GroupResponse,
+            dependencies=[Depends(conditional("groups"))])
+async def get_group(group_id: int, response: Response, ref: Snapshot = Depends(get_reference)):
     try:
-        cursor = db.connection.cursor()
-        cursor.execute('''
-            SELECT id, name, words_count
-            FROM groups
-            WHERE id = ?
-        ''', (group_id,))
-        
-        group = cursor.fetchone()
+        group = ref.groups.get(group_id)
+
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
 
-        return {
-            "id": group["id"],
-            "group_name": group["name"],
-            "word_count": group["words_count"]
-        }
+        return FastJSONResponse(GROUP_ROW(
+            id=group.id,
+            group_name=group.name,
+            word_count=group.words_count
+        ), headers=response.headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -89,54 +131,63 @@ async def get_group_words(
     per_page: int = Query(10, ge=1, le=100),
     sort_by: str = Query("spanish", description="Sort by: spanish, english, correct_count, wrong_count"),
     order: str = Query("asc", description="Sort order: asc/desc"),
-    db: Database = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    count: str = Query("exact", description="Total count: exact, estimate or none"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION),
+    db: Database = Depends(get_db),
+    ref: Snapshot = Depends(get_reference)
 ):
+    # Validate sorting parameters
+    sort_by = sort_by if sort_by in WORD_COLUMNS and sort_by != "id" else "spanish"
+    sort_column = WORD_COLUMNS[sort_by]
+    order = order.lower() if order.lower() in {"asc", "desc"} else "asc"
+    count = count if count in COUNT_MODES else "exact"
+    after = decode_cursor(cursor, sort_by, order) if cursor else None
+    names = parse_fields(fields, GroupWordResponse)
+    includes = parse_include(include, WORD_INCLUDES)
+    joins = REVIEW_JOIN if REVIEW_FIELDS & {*names, sort_by} else ""
+
     try:
-        cursor = db.connection.cursor()
-        offset = (page - 1) * per_page
+        condition, params, offset = page_window(after, sort_column, "w.id", order, page, per_page)
 
-        # Validate group exists
-        cursor.execute("SELECT name FROM groups WHERE id = ?", (group_id,))
-        if not cursor.fetchone():
+        # Validate group exists (words_count doubles as the estimated total)
+        group = ref.groups.get(group_id)
+        if not group:
             raise HTTPException(status_code=404, detail="Group not found")
 
-        # Validate sorting parameters
-        valid_columns = {"spanish", "english", "correct_count", "wrong_count"}
-        sort_by = sort_by if sort_by in valid_columns else "spanish"
-        order = order.lower() if order.lower() in {"asc", "desc"} else "asc"
-
         # Get total words count
-        cursor.execute("SELECT COUNT(*) FROM word_groups WHERE group_id = ?", (group_id,))
-        total_words = cursor.fetchone()[0]
-        total_pages = math.ceil(total_words / per_page) if total_words else 0
+        if count == "estimate":
+            total_words = group.words_count
+        else:
+            total_words = await count_rows(
+                db, count, "SELECT COUNT(*) FROM word_groups WHERE group_id = ?", (group_id,)
+            )
 
         # Get paginated words
-        cursor.execute(f'''
-            SELECT w.id, w.spanish, w.english,
-                   COALESCE(SUM(wri.correct), 0) as correct_count,
-                   COALESCE(SUM(NOT wri.correct), 0) as wrong_count
+        rows = await db.fetchall(f'''
+            SELECT {select_list(WORD_COLUMNS, names)},
+                   {sort_column} AS sort_key
             FROM words w
             JOIN word_groups wg ON w.id = wg.word_id
-            LEFT JOIN word_review_items wri ON w.id = wri.word_id
-            WHERE wg.group_id = ?
-            GROUP BY w.id
-            ORDER BY {sort_by} {order}
+            {joins}
+            WHERE wg.group_id = ? AND {condition}
+            ORDER BY sort_key {order}, w.id {order}
             LIMIT ? OFFSET ?
-        ''', (group_id, per_page, offset))
+        ''', (group_id, *params, per_page + 1, offset))
 
-        words = [{
-            "id": word["id"],
-            "spanish": word["spanish"],
-            "english": word["english"],
-            "correct_count": word["correct_count"],
-            "wrong_count": word["wrong_count"]
-        } for word in cursor.fetchall()]
+        words = WORD_ROW.only(names).rows(rows[:per_page])
+        if "groups" in includes:
+            await attach_groups(db, ref, words)
 
-        return {
-            "words": words,
-            "total_pages": total_pages,
-            "current_page": page
-        }
+        return FastJSONResponse(WORDS_PAGE(
+            words=words,
+            total_pages=page_count(total_words, per_page),
+            current_page=page,
+            next_cursor=next_cursor(rows, per_page, sort_by, order, "sort_key")
+        ))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -147,76 +198,175 @@ async def get_group_study_sessions(
     per_page: int = Query(10, ge=1, le=100),
     sort_by: str = Query("created_at", description="Sort by: created_at, last_activity_time, activity_name, group_name, review_count"),
     order: str = Query("desc", description="Sort order: asc/desc"),
-    db: Database = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    count: str = Query("exact", description="Total count: exact, estimate or none"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Database = Depends(get_db),
+    ref: Snapshot = Depends(get_reference)
 ):
+    # Map sort parameters
+    sort_mapping = {
+        "created_at": "s.created_at",
+        "last_activity_time": "s.ended_at",
+        "activity_name": "a.name",
+        "group_name": "g.name",
+        "review_count": "s.review_count"
+    }
+    name_joins = {
+        "activity_name": "JOIN study_activities a ON s.study_activity_id = a.id",
+        "group_name": "JOIN groups g ON s.group_id = g.id"
+    }
+    sort_by = sort_by if sort_by in sort_mapping else "created_at"
+    sort_column = sort_mapping[sort_by]
+    order = order.lower() if order.lower() in {"asc", "desc"} else "desc"
+    count = count if count in COUNT_MODES else "exact"
+    after = decode_cursor(cursor, sort_by, order) if cursor else None
+    names = parse_fields(fields, StudySessionResponse, requires=SESSION_NAME_IDS)
+
     try:
-        cursor = db.connection.cursor()
-        offset = (page - 1) * per_page
+        condition, params, offset = page_window(after, sort_column, "s.id", order, page, per_page)
 
         # Validate group exists
-        cursor.execute("SELECT name FROM groups WHERE id = ?", (group_id,))
-        if not cursor.fetchone():
+        if group_id not in ref.groups:
             raise HTTPException(status_code=404, detail="Group not found")
 
-        # Map sort parameters
-        sort_mapping = {
-            "created_at": "s.created_at",
-            "last_activity_time": "last_activity_time",
-            "activity_name": "a.name",
-            "group_name": "g.name",
-            "review_count": "review_count"
-        }
-        sort_column = sort_mapping.get(sort_by, "s.created_at")
-        order = order.lower() if order.lower() in {"asc", "desc"} else "desc"
-
         # Get total sessions count
-        cursor.execute("SELECT COUNT(*) FROM study_sessions WHERE group_id = ?", (group_id,))
-        total_sessions = cursor.fetchone()[0]
-        total_pages = math.ceil(total_sessions / per_page) if total_sessions else 0
+        total_sessions = await count_rows(
+            db, count, "SELECT COUNT(*) FROM study_sessions WHERE group_id = ?", (group_id,),
+            table="study_sessions", index="idx_study_sessions_group_created"
+        )
 
-        # Get paginated sessions
-        cursor.execute(f'''
+        # Get paginated sessions (names come from the reference snapshot; only
+        # sorting by a name still joins its table)
+        rows = await db.fetchall(f'''
             SELECT 
-                s.id,
-                s.group_id,
-                g.name as group_name,
-                s.study_activity_id,
-                a.name as activity_name,
-                s.created_at as start_time,
-                MAX(wri.created_at) as last_activity_time,
-                COUNT(wri.id) as review_count
+                {select_list(SESSION_COLUMNS, names)},
+                {sort_column} as sort_key
             FROM study_sessions s
-            JOIN study_activities a ON s.study_activity_id = a.id
-            JOIN groups g ON s.group_id = g.id
-            LEFT JOIN word_review_items wri ON s.id = wri.study_session_id
-            WHERE s.group_id = ?
-            GROUP BY s.id
-            ORDER BY {sort_column} {order}
+            {name_joins.get(sort_by, "")}
+            WHERE s.group_id = ? AND {condition}
+            ORDER BY sort_key {order}, s.id {order}
             LIMIT ? OFFSET ?
-        ''', (group_id, per_page, offset))
-
-        sessions = []
-        for session in cursor.fetchall():
-            end_time = session["last_activity_time"] or db.connection.execute(
-                "SELECT datetime(?, '+30 minutes')", 
-                (session["start_time"],)
-            ).fetchone()[0]
-
-            sessions.append({
-                "id": session["id"],
-                "group_id": session["group_id"],
-                "group_name": session["group_name"],
-                "study_activity_id": session["study_activity_id"],
-                "activity_name": session["activity_name"],
-                "start_time": session["start_time"],
-                "end_time": end_time,
-                "review_items_count": session["review_count"]
-            })
+        ''', (group_id, *params, per_page + 1, offset))
+
+        return FastJSONResponse(SESSIONS_PAGE(
+            study_sessions=ref.name_sessions(SESSION_ROW.only(names).rows(rows[:per_page]), "study_activity_id"),
+            total_pages=page_count(total_sessions, per_page),
+            current_page=page,
+            next_cursor=next_cursor(rows, per_page, sort_by, order, "sort_key")
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{group_id}/next-words", response_model=NextWordsResponse)
+async def get_group_next_words(
+    group_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    db: Database = Depends(get_db),
+    ref: Snapshot = Depends(get_reference)
+):
+    # Words due for review first (earliest due date first), then words that
+    # were never reviewed, in id order
+    try:
+        if group_id not in ref.groups:
+            raise HTTPException(status_code=404, detail="Group not found")
+
+        due = await db.fetchall('''
+            SELECT w.id, w.spanish, w.english, q.due_at, s.interval, s.repetitions
+            FROM review_queue q
+            JOIN words w ON w.id = q.word_id
+            JOIN word_schedule s ON s.word_id = q.word_id
+            WHERE q.group_id = ? AND q.due_at <= datetime('now')
+            ORDER BY q.due_at, q.word_id
+            LIMIT ?
+        ''', (group_id, limit))
+
+        unseen = []
+        if len(due) < limit:
+            unseen = await db.fetchall('''
+                SELECT w.id, w.spanish, w.english, NULL AS due_at, 0 AS interval, 0 AS repetitions
+                FROM word_groups wg
+                JOIN words w ON w.id = wg.word_id
+                WHERE wg.group_id = ?
+                  AND NOT EXISTS (SELECT 1 FROM word_schedule s WHERE s.word_id = wg.word_id)
+                ORDER BY wg.word_id
+                LIMIT ?
+            ''', (group_id, limit - len(due)))
 
         return {
-            "study_sessions": sessions,
-            "total_pages": total_pages,
-            "current_page": page
+            "group_id": group_id,
+            "words": [dict(word) for word in [*due, *unseen]]
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def spool_upload(request: Request, suffix: str):
+    """Write the request body to a temporary file, chunk by chunk; returns its path"""
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=UPLOAD_DIR)
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Upload larger than {MAX_UPLOAD_BYTES >> 20} MB")
+                f.write(chunk)
+        return path, size
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def run_import(job, path, group_name, schema, fmt):
+    # The vocabulary lives in the shared database, also in multi-tenant mode
+    conn = pool.open_connection()
+    try:
+        return import_words(
+            conn, path, group_name, schema=schema, fmt=fmt,
+            chunk_size=IMPORT_CHUNK_ROWS,
+            # Indexes stay in place: the API keeps serving during the import
+            defer_indexes=False,
+            progress=job.progress,
+            on_error=job.record_error,
+            # Review writes get in between chunks
+            write_lock=pool.write_lock
+        )
+    finally:
+        conn.close()
+
+
+@router.post("/import", response_model=JobResponse, status_code=202)
+async def import_group_words(
+    request: Request,
+    group: str = Query(..., min_length=1, max_length=100, description="Group to add the words to (created if missing)"),
+    format: Optional[str] = Query(None, description="json, ndjson or csv (default: from Content-Type)"),
+    schema: Optional[str] = Query(None, description="Field names preset: " + ", ".join(SCHEMAS)),
+):
+    # The body is the word list itself; it is saved, then imported by a
+    # background job whose progress GET /api/jobs/{id} reports
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = format or UPLOAD_FORMATS.get(content_type)
+    if fmt not in UPLOAD_FORMATS.values():
+        raise HTTPException(status_code=415, detail="Send JSON, NDJSON or CSV (Content-Type or format=json|ndjson|csv)")
+    if schema is not None and schema not in SCHEMAS:
+        raise HTTPException(status_code=400, detail=f"schema must be one of: {', '.join(SCHEMAS)}")
+    if int(request.headers.get("content-length") or 0) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload larger than {MAX_UPLOAD_BYTES >> 20} MB")
+
+    path, size = await spool_upload(request, f".{fmt}")
+    try:
+        job = job_queue.submit(
+            "import_words",
+            lambda job: run_import(job, path, group, SCHEMAS.get(schema), fmt),
+            {"group": group, "format": fmt, "schema": schema, "bytes": size},
+            cleanup=lambda: os.remove(path)
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        os.remove(path)
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.to_dict()
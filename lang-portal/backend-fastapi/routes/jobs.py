@@ -0,0 +1,19 @@
+# endpoints/jobs.py
+from fastapi import APIRouter, HTTPException
+from models.jobs import JobResponse, JobListResponse
+from lib.jobs import job_queue
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# Endpoints
+@router.get("/", response_model=JobListResponse)
+async def get_jobs():
+    # Queued, running and recently finished jobs, newest first
+    return {"jobs": [job.to_dict() for job in job_queue.list()]}
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -0,0 +1,47 @@
+# endpoints/review.py
+import asyncio
+import queue
+from fastapi import APIRouter, HTTPException
+from models.review import ReviewRequest, ReviewResponse, BatchReviewRequest, BatchReviewResponse
+from lib.writer import current_writer, ReviewRejected
+
+router = APIRouter(prefix="/api/study-sessions", tags=["review"])
+
+
+async def submit_reviews(session_id: int, reviews):
+    # Resolves once the group commit holding these reviews is durable
+    try:
+        rows = await asyncio.wrap_future(current_writer().submit(session_id, reviews))
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="Review queue is full, retry later")
+    except ReviewRejected as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return [
+        {
+            "success": True,
+            "word_id": word_id,
+            "study_session_id": session_id,
+            "correct": correct,
+            "created_at": created_at
+        }
+        for (word_id, correct), (_, created_at) in zip(reviews, rows)
+    ]
+
+
+@router.post("/{session_id}/words/{word_id}/review", response_model=ReviewResponse)
+async def review_word(session_id: int, word_id: int, review: ReviewRequest):
+    return (await submit_reviews(session_id, [(word_id, review.correct)]))[0]
+
+
+@router.post("/{session_id}/review", response_model=BatchReviewResponse)
+async def review_words(session_id: int, batch: BatchReviewRequest):
+    # All reviews in one call are committed together, or not at all
+    reviews = await submit_reviews(session_id, [(r.word_id, r.is_correct) for r in batch.reviews])
+    return {
+        "success": True,
+        "study_session_id": session_id,
+        "reviews": reviews
+    }
@@ -1,57 +1,57 @@
 # endpoints/study_activities.py
-from fastapi import APIRouter, HTTPException, Depends, Query
-from models.study_activites import StudyActivityResponse, PaginatedSessionResponse, StudyActivityLaunchResponse
-import math
-from lib.db import Database
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from models.study_activites import (StudyActivityResponse, PaginatedSessionResponse, StudySessionListItem,
+                                    StudyActivityLaunchResponse, GroupResponse)
+from typing import List, Optional
+from lib.db import Database, get_db
+from lib.fastjson import FastJSONResponse, Record
+from lib.caching import conditional
+from lib.reference import Snapshot, get_reference
+from lib.pagination import COUNT_MODES, decode_cursor, page_window, next_cursor, page_count, count_rows
 
 router = APIRouter(prefix="/api/study-activities", tags=["study_activities"])
 
-# Database Dependency
-def get_db():
-    db = Database()
-    db.connect()
-    try:
-        yield db
-    finally:
-        db.close()
+SESSIONS_PAGE = Record(PaginatedSessionResponse)
+SESSION_ROW = Record(StudySessionListItem)
+ACTIVITY = Record(StudyActivityResponse)
+LAUNCH = Record(StudyActivityLaunchResponse)
+LAUNCH_GROUP = Record(GroupResponse)
 
-@router.get("/", response_model=List[StudyActivityResponse])
-async def get_all_study_activities(db: Database = Depends(get_db)):
+@router.get("/", response_model=List[StudyActivityResponse],
+            dependencies=[Depends(conditional("study_activities", cache_control="public, max-age=60"))])
+async def get_all_study_activities(response: Response, ref: Snapshot = Depends(get_reference)):
     try:
-        cursor = db.connection.cursor()
-        cursor.execute('SELECT id, name, url, preview_url FROM study_activities')
-        activities = cursor.fetchall()
-        
-        return [{
-            "id": activity["id"],
-            "title": activity["name"],
-            "launch_url": activity["url"],
-            "preview_url": activity["preview_url"]
-        } for activity in activities]
+        # Returned directly, so the ETag headers are copied over
+        return FastJSONResponse([ACTIVITY(
+            id=activity.id,
+            title=activity.name,
+            launch_url=activity.url,
+            preview_url=activity.preview_url
+        ) for activity in ref.activities.values()], headers=response.headers)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{activity_id}", response_model=StudyActivityResponse)
-async def get_study_activity(activity_id: int, db: Database = Depends(get_db)):
+@router.get("/{activity_id}", response_model=StudyActivityResponse,
+            dependencies=[Depends(conditional("study_activities", cache_control="public, max-age=60"))])
+async def get_study_activity(activity_id: int, response: Response, ref: Snapshot = Depends(get_reference)):
     try:
-        cursor = db.connection.cursor()
-        cursor.execute(
-            'SELECT id, name, url, preview_url FROM study_activities WHERE id = ?',
-            (activity_id,)
-        )
-        activity = cursor.fetchone()
+        activity = ref.activities.get(activity_id)
         
         if not activity:
             raise HTTPException(status_code=404, detail="Activity not found")
             
-        return {
-            "id": activity["id"],
-            "title": activity["name"],
-            "launch_url": activity["url"],
-            "preview_url": activity["preview_url"]
-        }
+        return FastJSONResponse(ACTIVITY(
+            id=activity.id,
+            title=activity.name,
+            launch_url=activity.url,
+            preview_url=activity.preview_url
+        ), headers=response.headers)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -60,99 +60,82 @@ async def get_activity_sessions(
     activity_id: int,
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
-    db: Database = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    count: str = Query("exact", description="Total count: exact, estimate or none"),
+    db: Database = Depends(get_db),
+    ref: Snapshot = Depends(get_reference)
 ):
+    # Sessions are always listed newest first
+    count = count if count in COUNT_MODES else "exact"
+    after = decode_cursor(cursor, "created_at", "desc") if cursor else None
+
     try:
-        cursor = db.connection.cursor()
-        offset = (page - 1) * per_page
+        condition, params, offset = page_window(after, "ss.created_at", "ss.id", "desc", page, per_page)
 
         # Verify activity exists
-        cursor.execute('SELECT id FROM study_activities WHERE id = ?', (activity_id,))
-        if not cursor.fetchone():
+        if activity_id not in ref.activities:
             raise HTTPException(status_code=404, detail="Activity not found")
 
         # Get total count
-        cursor.execute('''
+        total_count = await count_rows(db, count, '''
             SELECT COUNT(*) as count 
             FROM study_sessions ss
-            JOIN groups g ON g.id = ss.group_id
             WHERE ss.study_activity_id = ?
-        ''', (activity_id,))
-        total_count = cursor.fetchone()['count']
+        ''', (activity_id,), table="study_sessions", index="idx_study_sessions_activity_created")
 
-        # Get paginated sessions
-        cursor.execute('''
+        # Get paginated sessions (names come from the reference snapshot)
+        sessions = await db.fetchall(f'''
             SELECT 
                 ss.id,
                 ss.group_id,
-                g.name as group_name,
-                sa.name as activity_name,
-                ss.created_at,
+                NULL as group_name,
                 ss.study_activity_id as activity_id,
-                COUNT(wri.id) as review_items_count
+                NULL as activity_name,
+                ss.created_at as start_time,
+                ss.ended_at as end_time,
+                ss.review_count as review_items_count
             FROM study_sessions ss
-            JOIN groups g ON g.id = ss.group_id
-            JOIN study_activities sa ON sa.id = ss.study_activity_id
-            LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-            WHERE ss.study_activity_id = ?
-            GROUP BY ss.id, ss.group_id, g.name, sa.name, ss.created_at, ss.study_activity_id
-            ORDER BY ss.created_at DESC
+            WHERE ss.study_activity_id = ? AND {condition}
+            ORDER BY ss.created_at DESC, ss.id DESC
             LIMIT ? OFFSET ?
-        ''', (activity_id, per_page, offset))
-        
-        sessions = cursor.fetchall()
+        ''', (activity_id, *params, per_page + 1, offset))
 
-        return {
-            "items": [{
-                "id": session["id"],
-                "group_id": session["group_id"],
-                "group_name": session["group_name"],
-                "activity_id": session["activity_id"],
-                "activity_name": session["activity_name"],
-                "start_time": str(session["created_at"]),
-                "end_time": str(session["created_at"]),
-                "review_items_count": session["review_items_count"]
-            } for session in sessions],
-            "total": total_count,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": math.ceil(total_count / per_page) if total_count else 0
-        }
+        return FastJSONResponse(SESSIONS_PAGE(
+            items=ref.name_sessions(SESSION_ROW.rows(sessions[:per_page])),
+            total=total_count,
+            page=page,
+            per_page=per_page,
+            total_pages=page_count(total_count, per_page),
+            next_cursor=next_cursor(sessions, per_page, "created_at", "desc", "start_time")
+        ))
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{activity_id}/launch", response_model=StudyActivityLaunchResponse)
-async def get_activity_launch_data(activity_id: int, db: Database = Depends(get_db)):
+@router.get("/{activity_id}/launch", response_model=StudyActivityLaunchResponse,
+            dependencies=[Depends(conditional("study_activities", "groups"))])
+async def get_activity_launch_data(activity_id: int, response: Response, ref: Snapshot = Depends(get_reference)):
     try:
-        cursor = db.connection.cursor()
-
         # Get activity details
-        cursor.execute(
-            'SELECT id, name, url, preview_url FROM study_activities WHERE id = ?',
-            (activity_id,)
-        )
-        activity = cursor.fetchone()
+        activity = ref.activities.get(activity_id)
         
         if not activity:
             raise HTTPException(status_code=404, detail="Activity not found")
 
-        # Get available groups
-        cursor.execute('SELECT id, name FROM groups')
-        groups = cursor.fetchall()
-
-        return {
-            "activity": {
-                "id": activity["id"],
-                "title": activity["name"],
-                "launch_url": activity["url"],
-                "preview_url": activity["preview_url"]
-            },
-            "groups": [{
-                "id": group["id"],
-                "name": group["name"]
-            } for group in groups]
-        }
+        # Get available groups, by name
+        return FastJSONResponse(LAUNCH(
+            activity=ACTIVITY(
+                id=activity.id,
+                title=activity.name,
+                launch_url=activity.url,
+                preview_url=activity.preview_url
+            ),
+            groups=[LAUNCH_GROUP(id=group.id, name=group.name) for group in ref.groups_by_name]
+        ), headers=response.headers)
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
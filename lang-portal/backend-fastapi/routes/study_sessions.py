@@ -1,80 +1,93 @@
 # endpoints/study_sessions.py
 from fastapi import APIRouter, Depends, HTTPException, Query
 from datetime import datetime
-from models.study_sessions import StudySessionListResponse, StudySessionDetailResponse  
+from models.study_sessions import StudySessionListItem, StudySessionListResponse, StudySessionDetailResponse, SessionWordStats
 from pydantic import BaseModel
+from typing import Optional
 import math
-from lib.db import Database
+from lib.db import Database, get_db
+from lib.fastjson import FastJSONResponse, Record
+from lib.reference import Snapshot, get_reference
+from lib.pagination import COUNT_MODES, decode_cursor, page_window, next_cursor, page_count, count_rows
+from lib.fields import FIELDS_DESCRIPTION, parse_fields, select_list
+from lib.archive import HISTORY_TABLES
+from routes.admin import reset_tables
 
 router = APIRouter(prefix="/api/study-sessions", tags=["study_sessions"])
 
-# Database Dependency
-def get_db():
-    db = Database()
-    db.connect()
-    try:
-        yield db
-    finally:
-        db.close()
+# Idle time after which a session is over
+SESSION_TIMEOUT = "30 minutes"
+
+SESSIONS_PAGE = Record(StudySessionListResponse)
+SESSION_ROW = Record(StudySessionListItem)
+SESSION_DETAIL = Record(StudySessionDetailResponse)
+SESSION_WORD_ROW = Record(SessionWordStats)
+
+# Names are filled in from the reference snapshot, by their ids
+SESSION_COLUMNS = {
+    "id": "ss.id",
+    "group_id": "ss.group_id",
+    "group_name": "NULL",
+    "activity_id": "ss.study_activity_id",
+    "activity_name": "NULL",
+    "start_time": "ss.created_at",
+    "end_time": "ss.ended_at",
+    "review_items_count": "ss.review_count"
+}
+SESSION_NAME_IDS = {"group_name": "group_id", "activity_name": "activity_id"}
+SESSION_BY_ID = f'''
+    SELECT {select_list(SESSION_COLUMNS, SESSION_COLUMNS)}
+    FROM study_sessions ss
+    WHERE ss.id = ?
+'''
 
 # Endpoints
 @router.get("/", response_model=StudySessionListResponse)
 async def get_study_sessions(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
-    db: Database = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    count: str = Query("exact", description="Total count: exact, estimate or none"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Database = Depends(get_db),
+    ref: Snapshot = Depends(get_reference)
 ):
+    # Sessions are always listed newest first
+    count = count if count in COUNT_MODES else "exact"
+    after = decode_cursor(cursor, "created_at", "desc") if cursor else None
+    names = parse_fields(fields, StudySessionListItem, requires=SESSION_NAME_IDS)
+
     try:
-        cursor = db.connection.cursor()
-        offset = (page - 1) * per_page
+        condition, params, offset = page_window(after, "ss.created_at", "ss.id", "desc", page, per_page)
 
         # Get total count
-        cursor.execute('''
+        total_count = await count_rows(db, count, '''
             SELECT COUNT(*) as count 
             FROM study_sessions ss
-            JOIN groups g ON g.id = ss.group_id
-            JOIN study_activities sa ON sa.id = ss.study_activity_id
-        ''')
-        total_count = cursor.fetchone()['count']
+        ''', table="study_sessions")
 
-        # Get paginated sessions
-        cursor.execute('''
+        # Get paginated sessions (names come from the reference snapshot)
+        sessions = await db.fetchall(f'''
             SELECT 
-                ss.id,
-                ss.group_id,
-                g.name as group_name,
-                sa.id as activity_id,
-                sa.name as activity_name,
-                ss.created_at,
-                COUNT(wri.id) as review_items_count
+                {select_list(SESSION_COLUMNS, names)},
+                ss.created_at as sort_key
             FROM study_sessions ss
-            JOIN groups g ON g.id = ss.group_id
-            JOIN study_activities sa ON sa.id = ss.study_activity_id
-            LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-            GROUP BY ss.id
-            ORDER BY ss.created_at DESC
+            WHERE {condition}
+            ORDER BY ss.created_at DESC, ss.id DESC
             LIMIT ? OFFSET ?
-        ''', (per_page, offset))
-        
-        sessions = cursor.fetchall()
-
-        return {
-            "items": [{
-                "id": session["id"],
-                "group_id": session["group_id"],
-                "group_name": session["group_name"],
-                "activity_id": session["activity_id"],
-                "activity_name": session["activity_name"],
-                "start_time": session["created_at"],
-                "end_time": session["created_at"],
-                "review_items_count": session["review_items_count"]
-            } for session in sessions],
-            "total": total_count,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": math.ceil(total_count / per_page) if total_count else 0
-        }
+        ''', (*params, per_page + 1, offset))
 
+        return FastJSONResponse(SESSIONS_PAGE(
+            items=ref.name_sessions(SESSION_ROW.only(names).rows(sessions[:per_page])),
+            total=total_count,
+            page=page,
+            per_page=per_page,
+            total_pages=page_count(total_count, per_page),
+            next_cursor=next_cursor(sessions, per_page, "created_at", "desc", "sort_key")
+        ))
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -83,36 +96,19 @@ async def get_study_session(
     session_id: int,
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
-    db: Database = Depends(get_db)
+    db: Database = Depends(get_db),
+    ref: Snapshot = Depends(get_reference)
 ):
     try:
-        cursor = db.connection.cursor()
         offset = (page - 1) * per_page
 
         # Get session details
-        cursor.execute('''
-            SELECT 
-                ss.id,
-                ss.group_id,
-                g.name as group_name,
-                sa.id as activity_id,
-                sa.name as activity_name,
-                ss.created_at,
-                COUNT(wri.id) as review_items_count
-            FROM study_sessions ss
-            JOIN groups g ON g.id = ss.group_id
-            JOIN study_activities sa ON sa.id = ss.study_activity_id
-            LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-            WHERE ss.id = ?
-            GROUP BY ss.id
-        ''', (session_id,))
-        
-        session = cursor.fetchone()
+        session = await db.fetchone(SESSION_BY_ID, (session_id,))
         if not session:
             raise HTTPException(status_code=404, detail="Study session not found")
 
         # Get words with stats
-        cursor.execute('''
+        words = await db.fetchall('''
             SELECT 
                 w.id,
                 w.spanish,
@@ -126,53 +122,63 @@ async def get_study_session(
             ORDER BY w.spanish
             LIMIT ? OFFSET ?
         ''', (session_id, per_page, offset))
-        
-        words = cursor.fetchall()
 
         # Get total words count
-        cursor.execute('''
+        total_count = (await db.fetchone('''
             SELECT COUNT(DISTINCT w.id) as count
             FROM words w
             JOIN word_review_items wri ON wri.word_id = w.id
             WHERE wri.study_session_id = ?
-        ''', (session_id,))
-        total_count = cursor.fetchone()['count']
-
-        return {
-            "session": {
-                "id": session["id"],
-                "group_id": session["group_id"],
-                "group_name": session["group_name"],
-                "activity_id": session["activity_id"],
-                "activity_name": session["activity_name"],
-                "start_time": session["created_at"],
-                "end_time": session["created_at"],
-                "review_items_count": session["review_items_count"]
-            },
-            "words": [{
-                "id": word["id"],
-                "spanish": word["spanish"],
-                "english": word["english"],
-                "correct_count": word["correct_count"],
-                "wrong_count": word["wrong_count"]
-            } for word in words],
-            "total": total_count,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": math.ceil(total_count / per_page) if total_count else 0
-        }
+        ''', (session_id,)))['count']
 
+        return FastJSONResponse(SESSION_DETAIL(
+            session=ref.name_sessions([SESSION_ROW.row(session)])[0],
+            words=SESSION_WORD_ROW.rows(words),
+            total=total_count,
+            page=page,
+            per_page=per_page,
+            total_pages=math.ceil(total_count / per_page) if total_count else 0
+        ))
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/reset")
-async def reset_study_sessions(db: Database = Depends(get_db)):
+@router.post("/{session_id}/close", response_model=StudySessionListItem)
+async def close_study_session(
+    session_id: int,
+    db: Database = Depends(get_db),
+    ref: Snapshot = Depends(get_reference)
+):
+    # A session ends at its last activity once it has been idle for
+    # SESSION_TIMEOUT; closing an active one ends it now
+    def end_session(conn):
+        # Under the pool's write lock, like the review writer's commits
+        with db.pool.write_lock, conn:
+            return conn.execute(f'''
+                UPDATE study_sessions
+                SET ended_at = CASE
+                    WHEN ended_at >= datetime('now', '-{SESSION_TIMEOUT}') THEN MAX(ended_at, CURRENT_TIMESTAMP)
+                    ELSE ended_at
+                END
+                WHERE id = ?
+            ''', (session_id,)).rowcount
+
     try:
-        cursor = db.connection.cursor()
-        cursor.execute('DELETE FROM word_review_items')
-        cursor.execute('DELETE FROM study_sessions')
-        db.connection.commit()
-        return {"message": "Study history cleared successfully"}
+        if not await db.run(end_session, db.connection):
+            raise HTTPException(status_code=404, detail="Study session not found")
+
+        session = await db.fetchone(SESSION_BY_ID, (session_id,))
+        return FastJSONResponse(ref.name_sessions([SESSION_ROW.row(session)])[0])
+
+    except HTTPException:
+        raise
     except Exception as e:
-        db.connection.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/reset")
+async def reset_study_sessions():
+    # Same as POST /api/reset_history
+    job_id = await reset_tables(HISTORY_TABLES)
+    return {"message": "Study history cleared successfully", "job_id": job_id}
\ No newline at end of file
@@ -1,19 +1,50 @@
 # endpoints/words.py
+import re
 from fastapi import APIRouter, HTTPException, Depends, Query
-from models.words import PaginatedWordsResponse, WordDetailResponse
-import math
-from lib.db import Database
+from models.words import PaginatedWordsResponse, WordResponse, WordDetailResponse, WordSearchResponse
+from typing import Optional
+from lib.db import Database, get_db, get_catalog_db
+from lib.fastjson import FastJSONResponse, Record
+from lib.pagination import COUNT_MODES, decode_cursor, page_window, next_cursor, page_count, count_rows
+from lib.fields import FIELDS_DESCRIPTION, parse_fields, parse_include, select_list
+from lib.reference import Snapshot, get_reference
 
 router = APIRouter(prefix="/api/words", tags=["words"])
 
-# Database Dependency
-def get_db():
-    db = Database()
-    db.connect()
-    try:
-        yield db
-    finally:
-        db.close()
+WORDS_PAGE = Record(PaginatedWordsResponse)
+WORD_ROW = Record(WordResponse)
+
+# Word list fields (also sort keys, except id); the review counters need
+# REVIEW_JOIN, which is left out when neither selects nor sorts by them
+WORD_COLUMNS = {
+    "id": "w.id",
+    "spanish": "w.spanish",
+    "english": "w.english",
+    "correct_count": "COALESCE(wr.correct_count, 0)",
+    "wrong_count": "COALESCE(wr.wrong_count, 0)"
+}
+REVIEW_FIELDS = {"correct_count", "wrong_count"}
+REVIEW_JOIN = "LEFT JOIN word_reviews wr ON w.id = wr.word_id"
+WORD_INCLUDES = ("groups",)
+
+INCLUDE_DESCRIPTION = "groups: add each word's groups"
+
+async def attach_groups(db: Database, ref: Snapshot, words):
+    """Give each word object a list of its groups ({id, name}), by group id"""
+    by_id = {}
+    for word in words:
+        word["groups"] = []
+        by_id[word["id"]] = word
+    if not by_id:
+        return words
+    rows = await db.fetchall(f'''
+        SELECT word_id, group_id FROM word_groups
+        WHERE word_id IN ({", ".join("?" * len(by_id))})
+        ORDER BY word_id, group_id
+    ''', tuple(by_id))
+    for row in rows:
+        by_id[row["word_id"]]["groups"].append({"id": row["group_id"], "name": ref.group_name(row["group_id"])})
+    return words
 
 @router.get("/", response_model=PaginatedWordsResponse)
 async def get_words(
@@ -21,72 +52,132 @@ async def get_words(
     per_page: int = Query(50, ge=1, le=100),
     sort_by: str = Query("spanish", description="Sort by: spanish, english, correct_count, wrong_count"),
     order: str = Query("asc", description="Sort order: asc/desc"),
-    db: Database = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    count: str = Query("exact", description="Total count: exact, estimate or none"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION),
+    db: Database = Depends(get_db),
+    ref: Snapshot = Depends(get_reference)
 ):
-    try:
-        cursor = db.connection.cursor()
-        offset = (page - 1) * per_page
+    # Validate sorting parameters
+    sort_by = sort_by if sort_by in WORD_COLUMNS and sort_by != "id" else "spanish"
+    sort_column = WORD_COLUMNS[sort_by]
+    order = order.lower() if order.lower() in {"asc", "desc"} else "asc"
+    count = count if count in COUNT_MODES else "exact"
+    after = decode_cursor(cursor, sort_by, order) if cursor else None
+    names = parse_fields(fields, WordResponse)
+    includes = parse_include(include, WORD_INCLUDES)
+    joins = REVIEW_JOIN if REVIEW_FIELDS & {*names, sort_by} else ""
 
-        # Validate sorting parameters
-        valid_columns = {"spanish", "english", "correct_count", "wrong_count"}
-        sort_by = sort_by if sort_by in valid_columns else "spanish"
-        order = order.lower() if order.lower() in {"asc", "desc"} else "asc"
+    try:
+        condition, params, offset = page_window(after, sort_column, "w.id", order, page, per_page)
 
         # Get total words count
-        cursor.execute("SELECT COUNT(*) FROM words")
-        total_words = cursor.fetchone()[0]
-        total_pages = math.ceil(total_words / per_page) if total_words else 0
+        total_words = await count_rows(db, count, "SELECT COUNT(*) FROM words", table="words")
 
-        # Get paginated words
-        cursor.execute(f'''
-            SELECT w.id, w.spanish, w.english,
-                   COALESCE(SUM(wri.correct), 0) AS correct_count,
-                   COALESCE(SUM(NOT wri.correct), 0) AS wrong_count
+        # Get paginated words (one extra row tells whether there is a next page)
+        rows = await db.fetchall(f'''
+            SELECT {select_list(WORD_COLUMNS, names)},
+                   {sort_column} AS sort_key
             FROM words w
-            LEFT JOIN word_review_items wri ON w.id = wri.word_id
-            GROUP BY w.id
-            ORDER BY {sort_by} {order}
+            {joins}
+            WHERE {condition}
+            ORDER BY sort_key {order}, w.id {order}
             LIMIT ? OFFSET ?
-        ''', (per_page, offset))
+        ''', (*params, per_page + 1, offset))
 
-        words = [{
-            "id": word["id"],
-            "spanish": word["spanish"],
-            "english": word["english"],
-            "correct_count": word["correct_count"],
-            "wrong_count": word["wrong_count"]
-        } for word in cursor.fetchall()]
+        words = WORD_ROW.only(names).rows(rows[:per_page])
+        if "groups" in includes:
+            await attach_groups(db, ref, words)
+
+        return FastJSONResponse(WORDS_PAGE(
+            words=words,
+            total_pages=page_count(total_words, per_page),
+            current_page=page,
+            total_words=total_words,
+            next_cursor=next_cursor(rows, per_page, sort_by, order, "sort_key")
+        ))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# bm25 column weights (spanish, romaji, english): matches on the word itself
+# rank above its romaji and English
+BM25_WEIGHTS = "10.0, 5.0, 2.0"
+
+def match_expression(q: str, prefix: bool):
+    # Quote every term so user input is never parsed as FTS5 syntax;
+    # prefix matching turns each term into "term"*
+    terms = ['"%s"' % term.replace('"', '""') for term in re.split(r'\s+', q.strip()) if term]
+    return ' '.join(term + '*' if prefix else term for term in terms)
+
+@router.get("/search", response_model=WordSearchResponse)
+async def search_words(
+    q: str = Query(..., min_length=1, max_length=100, description="Search text"),
+    group_id: Optional[int] = Query(None, description="Only words in this group"),
+    prefix: bool = Query(True, description="Match terms as prefixes (typeahead)"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Database = Depends(get_catalog_db)
+):
+    expression = match_expression(q, prefix)
+    if not expression:
+        return {"query": q, "results": []}
+
+    try:
+        # Groups imported together have neighbouring ids, so bounding the
+        # rowid range to the group lets FTS5 skip most matches outside it
+        if group_id:
+            lower = "(SELECT MIN(word_id) FROM word_groups WHERE group_id = :group_id)"
+            upper = "(SELECT MAX(word_id) FROM word_groups WHERE group_id = :group_id)"
+            member = "AND EXISTS (SELECT 1 FROM word_groups wg WHERE wg.group_id = :group_id AND wg.word_id = {})"
+        else:
+            lower, upper, member = "0", "9223372036854775807", ""
+
+        # Every match is ranked. ORDER BY rank is sorted by FTS5 itself,
+        # which scores the matches but builds no rows for them: snippets
+        # and the join to words are only made for the `limit` best
+        rows = await db.fetchall(f'''
+            SELECT f.rowid AS id, w.spanish, w.english, f.romaji,
+                   snippet(words_fts, -1, '<mark>', '</mark>', '…', 10) AS snippet,
+                   -f.rank AS score
+            FROM words_fts f
+            JOIN words w ON w.id = f.rowid
+            WHERE words_fts MATCH :match
+              AND f.rank MATCH 'bm25({BM25_WEIGHTS})'
+              AND f.rowid >= {lower} AND f.rowid <= {upper}
+              {member.format("f.rowid")}
+            ORDER BY f.rank
+            LIMIT :limit
+        ''', {"match": expression, "group_id": group_id, "limit": limit})
 
         return {
-            "words": words,
-            "total_pages": total_pages,
-            "current_page": page,
-            "total_words": total_words
+            "query": q,
+            "results": [dict(row) for row in rows]
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{word_id}", response_model=WordDetailResponse)
 async def get_word(word_id: int, db: Database = Depends(get_db)):
     try:
-        cursor = db.connection.cursor()
-        
-        cursor.execute('''
+        word = await db.fetchone('''
             SELECT w.id, w.spanish, w.english,
-                   COALESCE(SUM(wri.correct), 0) AS correct_count,
-                   COALESCE(SUM(NOT wri.correct), 0) AS wrong_count,
+                   COALESCE(wr.correct_count, 0) AS correct_count,
+                   COALESCE(wr.wrong_count, 0) AS wrong_count,
                    GROUP_CONCAT(g.id || '::' || g.name) as groups
             FROM words w
-            LEFT JOIN word_review_items wri ON w.id = wri.word_id
+            LEFT JOIN word_reviews wr ON w.id = wr.word_id
             LEFT JOIN word_groups wg ON w.id = wg.word_id
             LEFT JOIN groups g ON wg.group_id = g.id
             WHERE w.id = ?
             GROUP BY w.id
         ''', (word_id,))
         
-        word = cursor.fetchone()
-        
         if not word:
             raise HTTPException(status_code=404, detail="Word not found")
 
@@ -109,5 +200,7 @@ async def get_word(word_id: int, db: Database = Depends(get_db)):
             "groups": groups
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""Latency benchmark for concurrent light and heavy requests.
+
+Builds a throwaway database, serves the app with uvicorn and hammers one
+cheap endpoint and one aggregate-heavy endpoint at the same time. Run it
+twice to compare the async data-access layer against the old behaviour of
+running sqlite calls directly on the event loop:
+
+    python -m scripts.bench_async
+    python -m scripts.bench_async --blocking
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+LIGHT = '/api/study-activities/'
+HEAVY = '/api/groups/1/words?sort_by=correct_count&order=desc'
+
+
+def build_database(path, words, reviews):
+    from lib.db import Database
+    from scripts.migrate import apply_migrations
+    db = Database(path)
+    conn = db.connect()
+    apply_migrations(conn)
+    conn.execute("INSERT INTO groups (name, words_count) VALUES ('Bench', ?)", (words,))
+    conn.execute("INSERT INTO study_activities (name, url, preview_url) VALUES ('Typing Tutor', 'http://localhost:8080', '')")
+    conn.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)')
+    conn.executemany(
+        "INSERT INTO words (spanish, english, parts) VALUES (?, ?, '[]')",
+        ((f'word{i}', f'english{i}') for i in range(words))
+    )
+    conn.execute('INSERT INTO word_groups (word_id, group_id) SELECT id, 1 FROM words')
+    conn.executemany(
+        'INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (?, 1, ?)',
+        ((random.randint(1, words), random.random() < 0.7) for _ in range(reviews))
+    )
+    conn.commit()
+    db.close()
+
+
+def start_server(port, blocking):
+    import uvicorn
+    import main
+    from lib.db import Database
+
+    if blocking:
+        # Pre-change behaviour: run every query inline on the event loop
+        async def run_inline(self, fn, *args):
+            return fn(*args)
+        Database.run = run_inline
+
+    server = uvicorn.Server(uvicorn.Config(main.app, port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def worker(port, path, deadline, latencies):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        conn.request('GET', path)
+        conn.getresponse().read()
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--blocking', action='store_true', help='run queries on the event loop (pre-change)')
+    parser.add_argument('--words', type=int, default=20000)
+    parser.add_argument('--reviews', type=int, default=500000)
+    parser.add_argument('--light-clients', type=int, default=8)
+    parser.add_argument('--heavy-clients', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='lang-portal-bench-')
+    os.chdir(workdir)
+    build_database('words.db', args.words, args.reviews)
+    server = start_server(args.port, args.blocking)
+
+    results = {'mode': 'blocking' if args.blocking else 'executor'}
+    latencies = {LIGHT: [], HEAVY: []}
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(args.port, path, deadline, latencies[path]))
+        for path, clients in ((LIGHT, args.light_clients), (HEAVY, args.heavy_clients))
+        for _ in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.should_exit = True
+
+    for path, values in latencies.items():
+        results[path] = {
+            'requests': len(values),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Latency and payload size of list pages with and without sparse fieldsets.
+
+Serves main.py against a copy of a database (see scripts.generate_data) and
+requests each list page in turn with all fields and with only the fields a
+word picker needs (`fields=`), which leaves the review counter join out of
+the words queries, plus the cost of `include=groups`. Reports the median and
+p95 latency and the response size per variant as JSON:
+
+    python -m scripts.generate_data --database /tmp/load.db --reviews 10000000
+    python -m scripts.bench_fields --database /tmp/load.db
+"""
+import argparse
+import http.client
+import json
+import shutil
+import sqlite3
+import time
+from scripts.bench_async import percentile
+from scripts.load_test import start_server, wait_ready
+
+
+def cases(database, per_page):
+    conn = sqlite3.connect(database)
+    # The largest group: its word pages sort every word in it
+    group_id = conn.execute(
+        'SELECT group_id FROM word_groups GROUP BY group_id ORDER BY COUNT(*) DESC LIMIT 1'
+    ).fetchone()[0]
+    conn.close()
+    words = f'/api/words/?per_page={per_page}&sort_by=english'
+    group_words = f'/api/groups/{group_id}/words?per_page={per_page}'
+    sessions = f'/api/study-sessions/?per_page={per_page}'
+    return {
+        'words': {
+            'all': words,
+            'fields': words + '&fields=spanish,english',
+            'fields+groups': words + '&fields=spanish,english&include=groups',
+        },
+        'group_words': {
+            'all': group_words,
+            'fields': group_words + '&fields=spanish,english',
+            'fields+groups': group_words + '&fields=spanish,english&include=groups',
+        },
+        'study_sessions': {
+            'all': sessions,
+            'fields': sessions + '&fields=start_time,review_items_count',
+        },
+    }
+
+
+def measure(port, path, iterations):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        conn.request('GET', path)
+        response = conn.getresponse()
+        body = response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            raise SystemExit(f'{path}: {response.status} {body[:200]!r}')
+    conn.close()
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'bytes': len(body),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True, help='database to serve a copy of')
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--port', type=int, default=8768)
+    args = parser.parse_args()
+
+    process, workdir = start_server(args.database, args.port, in_place=False)
+    try:
+        wait_ready('127.0.0.1', args.port)
+        results = {}
+        for name, variants in cases(args.database, args.per_page).items():
+            results[name] = {}
+            for variant, path in variants.items():
+                measure(args.port, path, 5)  # warm up the page cache
+                results[name][variant] = measure(args.port, path, args.iterations)
+            full = results[name]['all']['p50_ms']
+            sparse = results[name]['fields']['p50_ms']
+            results[name]['fields_saved_pct'] = round((full - sparse) / full * 100, 1) if full else 0.0
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Throughput benchmark for review submission.
+
+Serves the app against a throwaway database and has many clients post
+single-word reviews at once. Compare group commits against one commit per
+review, the durability modes, and one shared database against one database
+per learner (multi-tenant mode, clients spread over --learners learners):
+
+    python -m scripts.bench_reviews
+    python -m scripts.bench_reviews --max-batch 1
+    REVIEW_DURABILITY=full python -m scripts.bench_reviews
+    REVIEW_DURABILITY=full python -m scripts.bench_reviews --learners 8
+"""
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from scripts.bench_async import build_database, start_server, percentile
+
+
+def worker(port, words, deadline, latencies, learner=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Content-Type': 'application/json'}
+    if learner:
+        headers['X-Learner-Id'] = learner
+    i = 0
+    while time.monotonic() < deadline:
+        i += 1
+        body = json.dumps({'correct': i % 3 != 0})
+        start = time.perf_counter()
+        conn.request('POST', f'/api/study-sessions/1/words/{i % words + 1}/review', body, headers)
+        conn.getresponse().read()
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-batch', type=int, default=1000, help='reviews per group commit')
+    parser.add_argument('--words', type=int, default=1000)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--learners', type=int, default=0, help='one database per learner (0: shared database)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='lang-portal-bench-')
+    os.chdir(workdir)
+    build_database('words.db', args.words, 0)
+    if args.learners:
+        os.environ['TENANTS_DIR'] = os.path.join(workdir, 'learners')
+        os.environ['MAX_OPEN_TENANTS'] = str(max(64, args.learners))
+
+    from lib.writer import writer
+    writer.max_batch = args.max_batch
+    server = start_server(args.port, blocking=False)
+
+    # Every learner gets the study session the clients review in
+    learners = [f'learner{i}' for i in range(args.learners)]
+    if learners:
+        from lib import tenants
+        for learner in learners:
+            tenant = tenants.registry.acquire(learner)
+            conn = tenant.pool.acquire()
+            conn.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)')
+            conn.commit()
+            tenant.pool.release(conn)
+            tenants.registry.release(tenant)
+
+    latencies = []
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(
+            args.port, args.words, deadline, latencies, learners[i % len(learners)] if learners else None
+        ))
+        for i in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = writer.stats()
+    if learners:
+        # Batches of all learner writers together
+        batches = reviews = 0
+        for learner in learners:
+            tenant = tenants.registry.acquire(learner)
+            batches += tenant.writer.stats()['batches']
+            reviews += tenant.writer.stats()['reviews']
+            tenants.registry.release(tenant)
+        stats['avg_batch_reviews'] = reviews / batches if batches else 0.0
+    server.should_exit = True
+
+    print(json.dumps({
+        'durability': stats['durability'],
+        'max_batch': args.max_batch,
+        'learners': args.learners,
+        'reviews_per_s': round(len(latencies) / args.duration, 1),
+        'avg_batch_reviews': round(stats['avg_batch_reviews'], 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""CPU cost of serializing list pages: FastAPI response_model vs lib.fastjson.
+
+Builds pages of sqlite3.Row objects the way the list routes fetch them and
+times, per page, the old path (a dict per row, validated into the response
+model and dumped by pydantic, as FastAPI does for returned dicts) against the
+fast path (Record + FastJSONResponse). Both must produce identical bytes.
+
+    python -m scripts.bench_serialization
+    python -m scripts.bench_serialization --rows 10 --iterations 5000
+"""
+import argparse
+import json
+import sqlite3
+import time
+from pydantic import TypeAdapter
+from lib.fastjson import Record, dumps, orjson
+from models.words import PaginatedWordsResponse, WordResponse
+from models.study_sessions import StudySessionListResponse, StudySessionListItem
+
+
+def fetch_rows(sql, n):
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    return conn.execute(f'''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {n})
+        {sql}
+    ''').fetchall()
+
+
+def words_page(n):
+    rows = fetch_rows('''
+        SELECT i AS id, 'palabra' || i AS spanish, 'word ' || i AS english,
+               i % 7 AS correct_count, i % 3 AS wrong_count
+        FROM n
+    ''', n)
+
+    def old():
+        return {
+            "words": [{
+                "id": word["id"],
+                "spanish": word["spanish"],
+                "english": word["english"],
+                "correct_count": word["correct_count"],
+                "wrong_count": word["wrong_count"]
+            } for word in rows],
+            "total_pages": 100,
+            "current_page": 1,
+            "total_words": 100 * n,
+            "next_cursor": "WyJzcGFuaXNoIiwiYXNjIiwicGFsYWJyYTk5Iiw5OV0"
+        }
+
+    page, row = Record(PaginatedWordsResponse), Record(WordResponse)
+
+    def fast():
+        return page(
+            words=row.rows(rows), total_pages=100, current_page=1, total_words=100 * n,
+            next_cursor="WyJzcGFuaXNoIiwiYXNjIiwicGFsYWJyYTk5Iiw5OV0"
+        )
+
+    return PaginatedWordsResponse, old, fast
+
+
+def sessions_page(n):
+    rows = fetch_rows('''
+        SELECT i AS id, i % 40 AS group_id, 'Core Verbs ' || (i % 40) AS group_name,
+               1 AS activity_id, 'Typing Tutor' AS activity_name,
+               datetime('2025-01-01', '+' || i || ' hours') AS start_time,
+               datetime('2025-01-01', '+' || i || ' hours', '+20 minutes') AS end_time,
+               i % 50 AS review_items_count
+        FROM n
+    ''', n)
+
+    def old():
+        return {
+            "items": [{
+                "id": session["id"],
+                "group_id": session["group_id"],
+                "group_name": session["group_name"],
+                "activity_id": session["activity_id"],
+                "activity_name": session["activity_name"],
+                "start_time": session["start_time"],
+                "end_time": session["end_time"],
+                "review_items_count": session["review_items_count"]
+            } for session in rows],
+            "total": 100 * n, "page": 1, "per_page": n, "total_pages": 100, "next_cursor": None
+        }
+
+    page, row = Record(StudySessionListResponse), Record(StudySessionListItem)
+
+    def fast():
+        return page(items=row.rows(rows), total=100 * n, page=1, per_page=n, total_pages=100)
+
+    return StudySessionListResponse, old, fast
+
+
+def cpu_per_call(fn, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100, help='rows per page')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {'encoder': 'orjson' if orjson else 'json', 'rows': args.rows}
+    for name, build in (('words', words_page), ('study_sessions', sessions_page)):
+        model, old, fast = build(args.rows)
+        adapter = TypeAdapter(model)
+
+        # What FastAPI does with a returned dict: validate, then dump to JSON
+        def old_path():
+            return adapter.dump_json(adapter.validate_python(old()))
+
+        def fast_path():
+            return dumps(fast())
+
+        if old_path() != fast_path():
+            raise SystemExit(f'{name}: fast path output differs')
+        old_us = cpu_per_call(old_path, args.iterations) * 1e6
+        fast_us = cpu_per_call(fast_path, args.iterations) * 1e6
+        results[name] = {
+            'response_model_us': round(old_us, 1),
+            'fastjson_us': round(fast_us, 1),
+            'saved_us': round(old_us - fast_us, 1),
+            'speedup': round(old_us / fast_us, 2),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""Synthetic database generator for benchmarks and load tests.
+
+Builds a fully migrated lang-portal database with realistic shapes:
+groups of very different sizes, words shared between groups, sessions
+spread over a period of days with popular groups studied more often, and
+review items concentrated on a minority of frequently seen words. The same
+--seed always produces the same data.
+
+    python -m scripts.generate_data --database /tmp/load.db
+    python -m scripts.generate_data --database /tmp/big.db --words 200000 --sessions 500000 --reviews 20000000
+
+Triggers and secondary indexes are dropped while rows are inserted; the
+indexes are rebuilt and all counters, rollups and the review schedule are
+recomputed from the generated history at the end.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from lib.db import Database
+from scripts.migrate import apply_migrations
+
+SEED_DIR = Path(__file__).parent.parent / 'seed'
+
+# Words are built from syllables; parts follow the seed files
+# ([{"kanji": ..., "romaji": [...]}]) so search has romaji to index
+SYLLABLES = [
+    'ba', 'be', 'bi', 'bo', 'bu', 'ca', 'ce', 'ci', 'co', 'cu', 'da', 'de', 'di', 'do',
+    'du', 'fa', 'fe', 'fi', 'fo', 'ga', 'go', 'gu', 'la', 'le', 'li', 'lo', 'lu', 'ma',
+    'me', 'mi', 'mo', 'mu', 'na', 'ne', 'ni', 'no', 'ña', 'pa', 'pe', 'pi', 'po', 'que',
+    'qui', 'ra', 're', 'ri', 'ro', 'ru', 'sa', 'se', 'si', 'so', 'ta', 'te', 'ti', 'to',
+    'tu', 'va', 've', 'vi', 'za', 'ción', 'rá', 'dó', 'lla', 'cha', 'che', 'gua', 'tra',
+]
+ENGLISH = [
+    'house', 'walk', 'green', 'water', 'bread', 'write', 'small', 'city', 'night', 'friend',
+    'speak', 'cold', 'book', 'door', 'eat', 'open', 'fast', 'road', 'light', 'sing',
+    'river', 'stone', 'learn', 'tree', 'sleep', 'warm', 'buy', 'sell', 'old', 'new',
+]
+TOPICS = [
+    'Core Verbs', 'Core Adjectives', 'Greetings', 'Food', 'Travel', 'Family', 'Numbers',
+    'Weather', 'Work', 'Home', 'Health', 'Shopping', 'Time', 'Nature', 'Emotions',
+]
+ACTIVITIES = ['Flashcards', 'Listening Quiz', 'Sentence Builder', 'Speed Match']
+
+# Popularity skew (Zipf exponent) of groups and of words within a group
+GROUP_SKEW = 1.0
+WORD_SKEW = 0.9
+SHARED_WORDS = 0.2   # share of words that also belong to a second group
+SESSION_HOURS = (7, 22)
+
+# Tables written in bulk, whose secondary indexes are rebuilt at the end
+BULK_TABLES = ('words', 'word_groups', 'study_sessions', 'word_review_items')
+
+
+def zipf_cum_weights(n, skew):
+    return list(itertools.accumulate(1.0 / (rank + 1) ** skew for rank in range(n)))
+
+
+def make_word(rng):
+    syllables = rng.choices(SYLLABLES, k=rng.choice((2, 2, 3, 3, 3, 4)))
+    spanish = ''.join(syllables)
+    english = ' '.join(rng.sample(ENGLISH, rng.choice((1, 1, 1, 2))))
+    parts = json.dumps([{'kanji': s, 'romaji': [s]} for s in syllables], ensure_ascii=False)
+    return spanish, english, parts
+
+
+def split_total(rng, total, parts):
+    """Split `total` into `parts` exponentially distributed, non-negative counts"""
+    weights = [rng.expovariate(1.0) for _ in range(parts)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for i in rng.sample(range(parts), total - sum(counts)):
+        counts[i] += 1
+    return counts
+
+
+def drop_bulk_schema(conn):
+    """Drop all triggers and the secondary indexes of BULK_TABLES; returns their SQL"""
+    schema = conn.execute(f'''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type = 'trigger'
+           OR (type = 'index' AND sql IS NOT NULL AND tbl_name IN ({', '.join('?' * len(BULK_TABLES))}))
+    ''', BULK_TABLES).fetchall()
+    for kind, name, _ in schema:
+        conn.execute(f'DROP {kind.upper()} IF EXISTS {name}')
+    return [sql for _, _, sql in schema]
+
+
+def generate(path, words, groups, sessions, reviews, days, seed, chunk_size=100000, log=print):
+    rng = random.Random(seed)
+    db = Database(path)
+    conn = db.connect()
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')
+    apply_migrations(conn)
+    timings = {}
+
+    def step(name, started):
+        timings[name] = round(time.perf_counter() - started, 2)
+        log(f'{name}: {timings[name]}s')
+        return time.perf_counter()
+
+    started = time.perf_counter()
+    deferred = drop_bulk_schema(conn)
+
+    with conn:
+        activities = json.loads((SEED_DIR / 'study_activities.json').read_text())
+        activities += [{'name': name, 'url': 'http://localhost:8080', 'preview_url': ''} for name in ACTIVITIES]
+        conn.executemany(
+            'INSERT INTO study_activities (name, url, preview_url) VALUES (?, ?, ?)',
+            [(a['name'], a['url'], a['preview_url']) for a in activities]
+        )
+        activity_ids = [row[0] for row in conn.execute('SELECT id FROM study_activities')]
+        conn.executemany(
+            'INSERT INTO groups (name) VALUES (?)',
+            [(f'{TOPICS[i % len(TOPICS)]} {i // len(TOPICS) + 1}',) for i in range(groups)]
+        )
+        group_ids = [row[0] for row in conn.execute('SELECT id FROM groups ORDER BY id')]
+
+    # Words: each has a primary group picked by group popularity, some a second one
+    group_weights = zipf_cum_weights(groups, GROUP_SKEW)
+    members = {group_id: [] for group_id in group_ids}
+    first_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM words').fetchone()[0] + 1
+    for start in range(0, words, chunk_size):
+        batch = [make_word(rng) for _ in range(min(chunk_size, words - start))]
+        links = []
+        for offset in range(len(batch)):
+            word_id = first_id + start + offset
+            primary = rng.choices(group_ids, cum_weights=group_weights)[0]
+            linked = {primary}
+            if groups > 1 and rng.random() < SHARED_WORDS:
+                linked.add(rng.choice(group_ids))
+            for group_id in linked:
+                members[group_id].append(word_id)
+                links.append((word_id, group_id))
+        with conn:
+            conn.executemany('INSERT INTO words (id, spanish, english, parts) VALUES (?, ?, ?, ?)',
+                             ((first_id + start + i, *word) for i, word in enumerate(batch)))
+            conn.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', links)
+    # Groups without words are never studied
+    studied = [group_id for group_id in group_ids if members[group_id]]
+    studied_weights = zipf_cum_weights(len(studied), GROUP_SKEW)
+    word_weights = {}
+    accuracy = {}
+    started = step('words', started)
+
+    # Sessions in time order over the last `days` days, with their reviews
+    today = date.today()
+    per_session = split_total(rng, reviews, sessions) if sessions else []
+    session_times = sorted(
+        (rng.randrange(days), rng.randrange(SESSION_HOURS[0] * 3600, SESSION_HOURS[1] * 3600))
+        for _ in range(sessions)
+    )
+    session_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM study_sessions').fetchone()[0]
+    session_rows, review_rows, written = [], [], 0
+
+    def flush():
+        with conn:
+            conn.executemany(
+                'INSERT INTO study_sessions (id, group_id, study_activity_id, created_at) VALUES (?, ?, ?, ?)',
+                session_rows
+            )
+            conn.executemany(
+                'INSERT INTO word_review_items (word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?)',
+                review_rows
+            )
+        session_rows.clear()
+        review_rows.clear()
+
+    for (day_offset, second), count in zip(session_times, per_session):
+        session_id += 1
+        day = (today - timedelta(days=days - 1 - day_offset)).isoformat()
+        group_id = rng.choices(studied, cum_weights=studied_weights)[0]
+        session_rows.append((session_id, group_id, rng.choice(activity_ids), f'{day} {second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}'))
+
+        if count:
+            group_words = members[group_id]
+            if group_id not in word_weights:
+                # Word popularity within the group follows a random ranking
+                ranked = group_words[:]
+                rng.shuffle(ranked)
+                members[group_id] = group_words = ranked
+                word_weights[group_id] = zipf_cum_weights(len(ranked), WORD_SKEW)
+            # Reviews every few seconds, never running past midnight
+            spacing = min(12, (86399 - second) // count)
+            for word_id in rng.choices(group_words, cum_weights=word_weights[group_id], k=count):
+                if word_id not in accuracy:
+                    accuracy[word_id] = rng.uniform(0.45, 0.95)
+                second = min(86399, second + rng.randint(1, max(1, spacing)))
+                review_rows.append((
+                    word_id, session_id, rng.random() < accuracy[word_id],
+                    f'{day} {second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}'
+                ))
+        if len(review_rows) >= chunk_size:
+            written += len(review_rows)
+            flush()
+            log(f'  {written:,} reviews')
+    flush()
+    started = step('sessions_and_reviews', started)
+
+    with conn:
+        for sql in deferred:
+            conn.execute(sql)
+        conn.execute('DELETE FROM words_fts')
+        conn.execute('''
+            INSERT INTO words_fts (rowid, spanish, romaji, english)
+            SELECT id, spanish, romaji, english FROM words_search_text
+        ''')
+        conn.execute('''
+            UPDATE groups
+            SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id)
+        ''')
+    started = step('indexes_and_search', started)
+
+    db.rebuild_word_reviews()
+    db.rebuild_session_counters()
+    db.rebuild_rollups()
+    started = step('counters_and_rollups', started)
+    db.rebuild_schedule()
+    started = step('schedule', started)
+    conn.execute('ANALYZE')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    step('analyze', started)
+
+    counts = {
+        table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        for table in ('words', 'groups', 'word_groups', 'study_sessions', 'word_review_items')
+    }
+    db.close()
+    return {'database': str(path), 'seed': seed, 'counts': counts, 'seconds': timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default='generated.db', help='output file (default: generated.db)')
+    parser.add_argument('--words', type=int, default=20000)
+    parser.add_argument('--groups', type=int, default=40)
+    parser.add_argument('--sessions', type=int, default=20000)
+    parser.add_argument('--reviews', type=int, default=1000000, help='total review items')
+    parser.add_argument('--days', type=int, default=365, help='days of history, ending today')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help='overwrite an existing database')
+    args = parser.parse_args()
+
+    if args.groups < 1 or args.days < 1 or min(args.words, args.sessions, args.reviews) < 0:
+        parser.error('counts must not be negative and --groups/--days at least 1')
+    if args.reviews and not (args.words and args.sessions):
+        parser.error('reviews need at least one word and one session')
+    if os.path.exists(args.database):
+        if not args.force:
+            parser.error(f'{args.database} exists (use --force to overwrite)')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+
+    summary = generate(args.database, args.words, args.groups, args.sessions, args.reviews, args.days, args.seed)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
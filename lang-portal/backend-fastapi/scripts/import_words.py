@@ -0,0 +1,54 @@
+"""Bulk import a vocabulary file into a group.
+
+    python -m scripts.import_words seed/data_verbs.json "Core Verbs"
+    python -m scripts.import_words words.ndjson "Imported" --map spanish=word --map english=meaning
+"""
+import argparse
+import sys
+from lib.db import Database
+from lib.importer import SCHEMAS, import_words
+
+
+def parse_schema(preset, mappings):
+    if not preset and not mappings:
+        return None  # detected from the first record
+    schema = dict(SCHEMAS[preset or 'spanish'])
+    for mapping in mappings:
+        column, _, field = mapping.partition('=')
+        if column not in schema or not field:
+            sys.exit(f'Invalid mapping {mapping!r}, expected one of {", ".join(schema)}=<field>')
+        schema[column] = field
+    return schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('group')
+    parser.add_argument('--database', default='words.db')
+    parser.add_argument('--format', choices=['json', 'ndjson', 'csv'], help='default: from the file extension')
+    parser.add_argument('--schema', choices=list(SCHEMAS), help='field names preset')
+    parser.add_argument('--map', action='append', default=[], metavar='COLUMN=FIELD',
+                        help='read a words column from another field')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--keep-indexes', action='store_true', help='do not defer index maintenance')
+    args = parser.parse_args()
+
+    db = Database(args.database)
+    try:
+        result = import_words(
+            db.connect(), args.path, args.group,
+            schema=parse_schema(args.schema, args.map),
+            fmt=args.format,
+            chunk_size=args.chunk_size,
+            defer_indexes=not args.keep_indexes,
+            progress=lambda rows: print(f'{rows} rows', end='\r', flush=True)
+        )
+    finally:
+        db.close()
+    print(f"\nImported {result['rows']} words into '{args.group}' in {result['seconds']}s "
+          f"({result['rows_per_s']} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
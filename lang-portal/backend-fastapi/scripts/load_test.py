@@ -0,0 +1,305 @@
+"""End-to-end load test replaying a weighted mix of every API route.
+
+Serves main.py with uvicorn in a separate process against a copy of a
+database (see scripts.generate_data), drives it with concurrent keep-alive
+clients for a fixed time and reports throughput and p50/p95/p99 latency per
+endpoint as JSON. Runs can be compared with --compare:
+
+    python -m scripts.generate_data --database /tmp/load.db
+    python -m scripts.load_test --database /tmp/load.db --output before.json
+    python -m scripts.load_test --database /tmp/load.db --output after.json --compare before.json
+
+POST /api/study-sessions/reset is never sent. Pass --read-only to leave out
+the other writes (reviews and closing sessions) as well.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import quote
+from scripts.bench_async import percentile
+
+APP_DIR = Path(__file__).parent.parent
+
+Endpoint = namedtuple('Endpoint', 'name weight method build')
+
+WORD_SORTS = ('spanish', 'english', 'correct_count', 'wrong_count')
+GROUP_SORTS = ('name', 'words_count')
+SESSION_SORTS = ('created_at', 'last_activity_time', 'activity_name', 'group_name', 'review_count')
+
+
+def page_query(rng, sorts=None):
+    query = f'page={rng.choice((1, 1, 1, 2, 3, 10))}&per_page={rng.choice((10, 25, 100))}'
+    if sorts:
+        query += f'&sort_by={rng.choice(sorts)}&order={rng.choice(("asc", "desc"))}'
+    return query
+
+
+# Relative weights approximate a learner browsing the portal: dashboard and
+# list pages dominate, search is typed one keystroke at a time, and every
+# study session sends a stream of reviews. Each build returns (path, body).
+ENDPOINTS = [
+    Endpoint('dashboard.recent_session', 6, 'GET', lambda t, r: ('/api/dashboard/recent-session', None)),
+    Endpoint('dashboard.study_progress', 6, 'GET', lambda t, r: ('/api/dashboard/study_progress', None)),
+    Endpoint('dashboard.quick_stats', 6, 'GET', lambda t, r: ('/api/dashboard/quick_stats', None)),
+    Endpoint('study_activities.list', 3, 'GET', lambda t, r: ('/api/study-activities/', None)),
+    Endpoint('study_activities.get', 2, 'GET', lambda t, r: (f'/api/study-activities/{r.choice(t.activities)}', None)),
+    Endpoint('study_activities.sessions', 2, 'GET', lambda t, r: (
+        f'/api/study-activities/{r.choice(t.activities)}/sessions?{page_query(r)}', None)),
+    Endpoint('study_activities.launch', 1, 'GET', lambda t, r: (
+        f'/api/study-activities/{r.choice(t.activities)}/launch', None)),
+    Endpoint('words.list', 8, 'GET', lambda t, r: (f'/api/words/?{page_query(r, WORD_SORTS)}', None)),
+    Endpoint('words.search', 10, 'GET', lambda t, r: (
+        f'/api/words/search?q={quote(r.choice(t.prefixes)[:r.randint(1, 4)])}&limit=10', None)),
+    Endpoint('words.get', 8, 'GET', lambda t, r: (f'/api/words/{r.randint(1, t.max_word)}', None)),
+    Endpoint('groups.list', 5, 'GET', lambda t, r: (f'/api/groups/?{page_query(r, GROUP_SORTS)}', None)),
+    Endpoint('groups.get', 4, 'GET', lambda t, r: (f'/api/groups/{r.choice(t.groups)}', None)),
+    Endpoint('groups.words', 6, 'GET', lambda t, r: (
+        f'/api/groups/{r.choice(t.groups)}/words?{page_query(r, WORD_SORTS)}', None)),
+    Endpoint('groups.study_sessions', 3, 'GET', lambda t, r: (
+        f'/api/groups/{r.choice(t.groups)}/study_sessions?{page_query(r, SESSION_SORTS)}', None)),
+    Endpoint('groups.next_words', 5, 'GET', lambda t, r: (f'/api/groups/{r.choice(t.groups)}/next-words', None)),
+    Endpoint('study_sessions.list', 4, 'GET', lambda t, r: (f'/api/study-sessions/?{page_query(r)}', None)),
+    Endpoint('study_sessions.get', 4, 'GET', lambda t, r: (f'/api/study-sessions/{r.randint(1, t.max_session)}', None)),
+    Endpoint('study_sessions.close', 1, 'POST', lambda t, r: (
+        f'/api/study-sessions/{r.randint(1, t.max_session)}/close', None)),
+    Endpoint('review.word', 12, 'POST', lambda t, r: (
+        f'/api/study-sessions/{r.randint(1, t.max_session)}/words/{r.randint(1, t.max_word)}/review',
+        {'correct': r.random() < 0.7})),
+    Endpoint('review.batch', 3, 'POST', lambda t, r: (
+        f'/api/study-sessions/{r.randint(1, t.max_session)}/review',
+        {'reviews': [{'word_id': r.randint(1, t.max_word), 'is_correct': r.random() < 0.7}
+                     for _ in range(r.randint(5, 20))]})),
+    Endpoint('pool.stats', 1, 'GET', lambda t, r: ('/api/pool', None)),
+    Endpoint('writer.stats', 1, 'GET', lambda t, r: ('/api/writer', None)),
+]
+
+Targets = namedtuple('Targets', 'max_word max_session groups activities prefixes')
+
+
+def load_targets(path):
+    """Ids and search prefixes to build requests from"""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        max_word = conn.execute('SELECT COALESCE(MAX(id), 0) FROM words').fetchone()[0]
+        max_session = conn.execute('SELECT COALESCE(MAX(id), 0) FROM study_sessions').fetchone()[0]
+        groups = [row[0] for row in conn.execute('SELECT id FROM groups')]
+        activities = [row[0] for row in conn.execute('SELECT id FROM study_activities')]
+        prefixes = [row[0] for row in conn.execute('SELECT spanish FROM words ORDER BY random() LIMIT 1000')]
+    finally:
+        conn.close()
+    if not (max_word and max_session and groups and activities):
+        raise SystemExit(f'{path} needs words, groups, study activities and sessions (see scripts.generate_data)')
+    prefixes = [p for p in prefixes if p.isalpha()] or ['a']
+    return Targets(max_word, max_session, groups, activities, prefixes)
+
+
+def start_server(database, port, in_place):
+    """Serve main:app from a working directory whose words.db is `database`"""
+    workdir = tempfile.mkdtemp(prefix='lang-portal-load-')
+    target = os.path.join(workdir, 'words.db')
+    if in_place:
+        os.symlink(os.path.abspath(database), target)
+    else:
+        # Checkpoint first so the copy holds every committed page
+        conn = sqlite3.connect(database)
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.close()
+        shutil.copyfile(database, target)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', str(APP_DIR),
+         '--port', str(port), '--log-level', 'warning', '--no-access-log'],
+        cwd=workdir,
+    )
+    return process, workdir
+
+
+def wait_ready(host, port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request('GET', '/api/pool')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f'Server on {host}:{port} did not come up within {timeout}s')
+
+
+def client(host, port, endpoints, targets, seed, warmup_until, deadline, samples):
+    rng = random.Random(seed)
+    weights = [e.weight for e in endpoints]
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        endpoint = rng.choices(endpoints, weights=weights)[0]
+        path, body = endpoint.build(targets, rng)
+        headers = {}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            conn.request(endpoint.method, path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=60)
+            status = 0
+        elapsed = time.perf_counter() - start
+        if now >= warmup_until:
+            samples.append((endpoint.name, elapsed, status))
+    conn.close()
+
+
+def summarize(samples, seconds):
+    def stats(latencies, errors):
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': round(len(latencies) / seconds, 1),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(max(latencies, default=0.0) * 1000, 2),
+        }
+
+    by_endpoint = {}
+    for name, elapsed, status in samples:
+        entry = by_endpoint.setdefault(name, ([], [0]))
+        entry[0].append(elapsed)
+        # 304s from conditional GETs are successes
+        entry[1][0] += not (200 <= status < 400)
+    endpoints = {
+        name: stats(latencies, errors[0]) for name, (latencies, errors) in sorted(by_endpoint.items())
+    }
+    total = stats([elapsed for _, elapsed, _ in samples], sum(e['errors'] for e in endpoints.values()))
+    return total, endpoints
+
+
+def compare(current, baseline):
+    """Text table of throughput and p95 changes per endpoint"""
+    def change(new, old):
+        return f'{(new - old) / old * 100:+.1f}%' if old else 'n/a'
+
+    rows = [('endpoint', 'rps', 'vs base', 'p95_ms', 'vs base', 'p99_ms', 'vs base')]
+    entries = [('TOTAL', current['total'], baseline.get('total'))]
+    entries += [(name, stats, baseline['endpoints'].get(name)) for name, stats in current['endpoints'].items()]
+    for name, new, old in entries:
+        old = old or {}
+        rows.append((
+            name,
+            f"{new['rps']:.1f}", change(new['rps'], old.get('rps', 0)),
+            f"{new['p95_ms']:.2f}", change(new['p95_ms'], old.get('p95_ms', 0)),
+            f"{new['p99_ms']:.2f}", change(new['p99_ms'], old.get('p99_ms', 0)),
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return '\n'.join(
+        '  '.join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths)))
+        for row in rows
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', required=True,
+                        help='database to serve (a copy unless --in-place); with --url, to pick ids from')
+    parser.add_argument('--url', help='load an already running server at http://host:port instead')
+    parser.add_argument('--in-place', action='store_true', help='serve --database itself; writes will modify it')
+    parser.add_argument('--read-only', action='store_true', help='leave out all POST endpoints')
+    parser.add_argument('--only', help='comma-separated endpoint names to run')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3.0, help='seconds before measuring starts')
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--compare', help='results file of an earlier run to compare against')
+    args = parser.parse_args()
+
+    endpoints = [e for e in ENDPOINTS if not (args.read_only and e.method != 'GET')]
+    if args.only:
+        wanted = set(args.only.split(','))
+        unknown = wanted - {e.name for e in ENDPOINTS}
+        if unknown:
+            parser.error(f'unknown endpoints: {", ".join(sorted(unknown))}')
+        endpoints = [e for e in endpoints if e.name in wanted]
+    if not endpoints:
+        parser.error('no endpoints left to run')
+
+    targets = load_targets(args.database)
+    process = workdir = None
+    if args.url:
+        host, _, port = args.url.split('://')[-1].rstrip('/').partition(':')
+        port = int(port or 80)
+    else:
+        host, port = '127.0.0.1', args.port
+        process, workdir = start_server(args.database, port, args.in_place)
+    try:
+        wait_ready(host, port)
+        started_at = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        warmup_until = time.monotonic() + args.warmup
+        deadline = warmup_until + args.duration
+        samples = [[] for _ in range(args.clients)]
+        threads = [
+            threading.Thread(target=client, args=(
+                host, port, endpoints, targets, args.seed * 1000 + i, warmup_until, deadline, samples[i]
+            ))
+            for i in range(args.clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    total, by_endpoint = summarize([s for client_samples in samples for s in client_samples], args.duration)
+    results = {
+        'config': {
+            'database': os.path.abspath(args.database),
+            'clients': args.clients,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'seed': args.seed,
+            'read_only': args.read_only,
+            'endpoints': [e.name for e in endpoints],
+            'targets': {'words': targets.max_word, 'sessions': targets.max_session, 'groups': len(targets.groups)},
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'started_at': started_at,
+        },
+        'total': total,
+        'endpoints': by_endpoint,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + '\n')
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print(compare(results, baseline), file=sys.stderr if not args.output else sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,77 @@
-from lib.db import db
+import re
+import sys
+from lib.db import db, SQL_DIR, SETUP_FILES
+
+# Migrations are numbered forward-only SQL scripts. Version 1 is the base
+# schema in sql/setup; later versions live in sql/migrations as
+# NNNN_description.sql. The applied version is kept in PRAGMA user_version.
+MIGRATIONS_DIR = SQL_DIR / 'migrations'
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+
+def load_migrations():
+    """Return [(version, name, sql)] in version order"""
+    base = '\n'.join((SQL_DIR / 'setup' / f).read_text() for f in SETUP_FILES)
+    migrations = [(1, 'initial_schema', base)]
+    for path in sorted(MIGRATIONS_DIR.glob('*.sql')):
+        match = MIGRATION_FILE.match(path.name)
+        if not match:
+            raise ValueError(f'Bad migration file name: {path.name}')
+        version = int(match.group(1))
+        if version <= migrations[-1][0]:
+            raise ValueError(f'Duplicate or out of order migration: {path.name}')
+        migrations.append((version, match.group(2), path.read_text()))
+    return migrations
+
+
+def current_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def apply_migrations(conn, verbose=False):
+    """Apply pending migrations, each in its own transaction. Returns the new version."""
+    version = current_version(conn)
+    for number, name, sql in load_migrations():
+        if number <= version:
+            continue
+        if verbose:
+            print(f'Applying migration {number:04d}_{name}...')
+        try:
+            conn.executescript(f'BEGIN;\n{sql}\n;PRAGMA user_version = {number};\nCOMMIT;')
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        version = number
+    return version
+
 
 def run_migrations():
     print("Running database migrations...")
     try:
-        db.setup_tables()
-        print("Schema created successfully!")
+        conn = db.connect()
+        before = current_version(conn)
+        after = apply_migrations(conn, verbose=True)
+        if after == before:
+            print(f"Schema already up to date (version {after})")
+        else:
+            print(f"Schema migrated from version {before} to {after}!")
     finally:
         db.close()
 
+
+def show_status():
+    try:
+        version = current_version(db.connect())
+        for number, name, _ in load_migrations():
+            state = 'applied' if number <= version else 'pending'
+            print(f"{number:04d}_{name}: {state}")
+    finally:
+        db.close()
+
+
 if __name__ == "__main__":
-    run_migrations()
\ No newline at end of file
+    if sys.argv[1:] == ['status']:
+        show_status()
+    else:
+        run_migrations()
@@ -0,0 +1,18 @@
+from lib.db import db
+
+def rebuild_counters():
+    print("Rebuilding review counters from history...")
+    try:
+        words = db.rebuild_word_reviews()
+        print(f"Rebuilt counters for {words} words!")
+        sessions = db.rebuild_session_counters()
+        print(f"Rebuilt counters for {sessions} sessions!")
+        scheduled = db.rebuild_schedule()
+        print(f"Replayed review schedule for {scheduled} words!")
+        days = db.rebuild_rollups()
+        print(f"Rebuilt daily rollups for {days} days!")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_counters()
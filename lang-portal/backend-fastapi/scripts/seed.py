@@ -1,20 +1,40 @@
+import json
+from contextlib import nullcontext
+from pathlib import Path
 from lib.db import db
+from lib.importer import import_words
+
+SEED_DIR = Path(__file__).parent.parent / 'seed'
+
+# Initial vocabulary: group name and word list
+SEED_GROUPS = [
+    ('Core Verbs', SEED_DIR / 'data_verbs.json'),
+    ('Core Adjectives', SEED_DIR / 'data_adjectives.json'),
+]
+SEED_ACTIVITIES = SEED_DIR / 'study_activities.json'
+
+def seed_catalog(conn, write_lock=None):
+    """Insert the seed groups, words and study activities on `conn`.
+    Returns the number of words added per group."""
+    added = {}
+    for group_name, data_path in SEED_GROUPS:
+        added[group_name] = import_words(conn, data_path, group_name, write_lock=write_lock)['rows']
+    activities = json.loads(SEED_ACTIVITIES.read_text())
+    with write_lock or nullcontext(), conn:
+        conn.executemany('''
+            INSERT INTO study_activities (name, url, preview_url)
+            VALUES (?, ?, ?)
+        ''', [(activity['name'], activity['url'], activity['preview_url']) for activity in activities])
+    return added
 
 def seed_data():
     print("Seeding initial data...")
     try:
-        db.import_words(
-            group_name='Core Verbs',
-            data_path='seed/data_verbs.json'
-        )
-        db.import_words(
-            group_name='Core Adjectives',
-            data_path='seed/data_adjectives.json'
-        )
-        db.import_study_activities('seed/study_activities.json')
+        for group_name, rows in seed_catalog(db.connect()).items():
+            print(f"Added {rows} words to '{group_name}' group")
         print("Data seeded successfully!")
     finally:
         db.close()
 
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    seed_data()
@@ -0,0 +1,35 @@
+-- Indexes for every join and sort key used by the routes
+
+-- Review counters per word (words, group words, word detail)
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word
+  ON word_review_items (word_id, correct);
+
+-- Per-session word stats and review counts
+CREATE INDEX IF NOT EXISTS idx_word_review_items_session_word
+  ON word_review_items (study_session_id, word_id, correct);
+
+-- Last activity time per session
+CREATE INDEX IF NOT EXISTS idx_word_review_items_session_created
+  ON word_review_items (study_session_id, created_at);
+
+-- Group -> words and word -> groups
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_word
+  ON word_groups (group_id, word_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_word_group
+  ON word_groups (word_id, group_id);
+
+-- Session listings (global, per group, per activity), newest first
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created
+  ON study_sessions (created_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_created
+  ON study_sessions (group_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_activity_created
+  ON study_sessions (study_activity_id, created_at);
+
+-- Sortable list columns
+CREATE INDEX IF NOT EXISTS idx_words_spanish ON words (spanish);
+CREATE INDEX IF NOT EXISTS idx_words_english ON words (english);
+CREATE INDEX IF NOT EXISTS idx_groups_name ON groups (name);
+CREATE INDEX IF NOT EXISTS idx_groups_words_count ON groups (words_count);
+
+ANALYZE;
@@ -0,0 +1,50 @@
+-- Keep word_reviews (one row per reviewed word) in sync with word_review_items
+
+-- Nothing wrote to word_reviews before, rebuild it from history
+DELETE FROM word_reviews;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_word_reviews_word ON word_reviews (word_id);
+
+INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+SELECT word_id, SUM(correct != 0), SUM(correct = 0), MAX(created_at)
+FROM word_review_items
+GROUP BY word_id;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_insert
+AFTER INSERT ON word_review_items
+BEGIN
+  INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+  VALUES (NEW.word_id, NEW.correct != 0, NEW.correct = 0, NEW.created_at)
+  ON CONFLICT (word_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count,
+    last_reviewed = MAX(last_reviewed, excluded.last_reviewed);
+END;
+
+-- last_reviewed is left as is on delete; rebuild the counters to recompute it
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_delete
+AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE word_reviews
+  SET correct_count = correct_count - (OLD.correct != 0),
+      wrong_count = wrong_count - (OLD.correct = 0)
+  WHERE word_id = OLD.word_id;
+  DELETE FROM word_reviews
+  WHERE word_id = OLD.word_id AND correct_count <= 0 AND wrong_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_update
+AFTER UPDATE OF word_id, correct ON word_review_items
+BEGIN
+  UPDATE word_reviews
+  SET correct_count = correct_count - (OLD.correct != 0),
+      wrong_count = wrong_count - (OLD.correct = 0)
+  WHERE word_id = OLD.word_id;
+  DELETE FROM word_reviews
+  WHERE word_id = OLD.word_id AND correct_count <= 0 AND wrong_count <= 0;
+  INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+  VALUES (NEW.word_id, NEW.correct != 0, NEW.correct = 0, NEW.created_at)
+  ON CONFLICT (word_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count,
+    last_reviewed = MAX(last_reviewed, excluded.last_reviewed);
+END;
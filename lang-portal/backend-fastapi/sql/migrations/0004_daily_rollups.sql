@@ -0,0 +1,220 @@
+-- Daily aggregates and running totals behind the dashboard, maintained on write
+
+-- One row per calendar day with any activity. streak is the number of
+-- consecutive session days ending on this day, fixed when the day's first
+-- session arrives (sessions are written in time order).
+CREATE TABLE IF NOT EXISTS daily_stats (
+  day TEXT PRIMARY KEY,
+  reviews INTEGER NOT NULL DEFAULT 0,
+  corrects INTEGER NOT NULL DEFAULT 0,
+  words INTEGER NOT NULL DEFAULT 0,     -- distinct words reviewed that day
+  sessions INTEGER NOT NULL DEFAULT 0,
+  groups INTEGER NOT NULL DEFAULT 0,    -- distinct groups studied that day
+  streak INTEGER NOT NULL DEFAULT 0
+);
+
+-- Backing sets for the distinct counts above
+CREATE TABLE IF NOT EXISTS daily_words (
+  day TEXT NOT NULL,
+  word_id INTEGER NOT NULL,
+  reviews INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, word_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_groups (
+  day TEXT NOT NULL,
+  group_id INTEGER NOT NULL,
+  sessions INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, group_id)
+) WITHOUT ROWID;
+
+-- Single row of all-time totals
+CREATE TABLE IF NOT EXISTS study_totals (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  words INTEGER NOT NULL DEFAULT 0,           -- vocabulary size
+  words_studied INTEGER NOT NULL DEFAULT 0,   -- words with at least one review
+  mastered_words INTEGER NOT NULL DEFAULT 0,  -- >= 5 attempts and >= 80% correct
+  reviews INTEGER NOT NULL DEFAULT 0,
+  corrects INTEGER NOT NULL DEFAULT 0,
+  sessions INTEGER NOT NULL DEFAULT 0
+);
+
+-- Backfill from existing history
+DELETE FROM daily_stats;
+DELETE FROM daily_words;
+DELETE FROM daily_groups;
+DELETE FROM study_totals;
+
+INSERT INTO daily_words (day, word_id, reviews)
+SELECT date(created_at), word_id, COUNT(*)
+FROM word_review_items
+GROUP BY date(created_at), word_id;
+
+INSERT INTO daily_groups (day, group_id, sessions)
+SELECT date(created_at), group_id, COUNT(*)
+FROM study_sessions
+GROUP BY date(created_at), group_id;
+
+INSERT INTO daily_stats (day, reviews, corrects, words)
+SELECT date(created_at), COUNT(*), SUM(correct != 0), COUNT(DISTINCT word_id)
+FROM word_review_items
+GROUP BY date(created_at);
+
+INSERT INTO daily_stats (day, sessions, groups)
+SELECT date(created_at), COUNT(*), COUNT(DISTINCT group_id)
+FROM study_sessions
+GROUP BY date(created_at)
+ON CONFLICT (day) DO UPDATE SET
+  sessions = excluded.sessions,
+  groups = excluded.groups;
+
+-- Streaks: consecutive session days share the same (julianday - row number)
+UPDATE daily_stats
+SET streak = (
+  SELECT streak FROM (
+    SELECT day, ROW_NUMBER() OVER (PARTITION BY island ORDER BY day) AS streak
+    FROM (
+      SELECT day, julianday(day) - ROW_NUMBER() OVER (ORDER BY day) AS island
+      FROM daily_stats
+      WHERE sessions > 0
+    )
+  ) AS islands
+  WHERE islands.day = daily_stats.day
+)
+WHERE sessions > 0;
+
+INSERT INTO study_totals (id, words, words_studied, mastered_words, reviews, corrects, sessions)
+SELECT 1,
+  (SELECT COUNT(*) FROM words),
+  (SELECT COUNT(*) FROM word_reviews),
+  (SELECT COUNT(*) FROM word_reviews
+   WHERE correct_count + wrong_count >= 5
+     AND correct_count >= 0.8 * (correct_count + wrong_count)),
+  (SELECT COUNT(*) FROM word_review_items),
+  (SELECT COALESCE(SUM(correct != 0), 0) FROM word_review_items),
+  (SELECT COUNT(*) FROM study_sessions);
+
+-- Reviews
+CREATE TRIGGER IF NOT EXISTS trg_daily_reviews_insert
+AFTER INSERT ON word_review_items
+BEGIN
+  INSERT INTO daily_stats (day, reviews, corrects, words)
+  VALUES (
+    date(NEW.created_at), 1, NEW.correct != 0,
+    NOT EXISTS (SELECT 1 FROM daily_words WHERE day = date(NEW.created_at) AND word_id = NEW.word_id)
+  )
+  ON CONFLICT (day) DO UPDATE SET
+    reviews = reviews + 1,
+    corrects = corrects + excluded.corrects,
+    words = words + excluded.words;
+  INSERT INTO daily_words (day, word_id, reviews)
+  VALUES (date(NEW.created_at), NEW.word_id, 1)
+  ON CONFLICT (day, word_id) DO UPDATE SET reviews = reviews + 1;
+  UPDATE study_totals SET reviews = reviews + 1, corrects = corrects + (NEW.correct != 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_reviews_delete
+AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE daily_words SET reviews = reviews - 1
+  WHERE day = date(OLD.created_at) AND word_id = OLD.word_id;
+  UPDATE daily_stats
+  SET reviews = reviews - 1,
+      corrects = corrects - (OLD.correct != 0),
+      words = words - EXISTS (
+        SELECT 1 FROM daily_words
+        WHERE day = date(OLD.created_at) AND word_id = OLD.word_id AND reviews <= 0
+      )
+  WHERE day = date(OLD.created_at);
+  DELETE FROM daily_words
+  WHERE day = date(OLD.created_at) AND word_id = OLD.word_id AND reviews <= 0;
+  UPDATE study_totals SET reviews = reviews - 1, corrects = corrects - (OLD.correct != 0);
+END;
+
+-- Sessions
+CREATE TRIGGER IF NOT EXISTS trg_daily_sessions_insert
+AFTER INSERT ON study_sessions
+BEGIN
+  INSERT INTO daily_stats (day, sessions, groups, streak)
+  VALUES (
+    date(NEW.created_at), 1,
+    NOT EXISTS (SELECT 1 FROM daily_groups WHERE day = date(NEW.created_at) AND group_id = NEW.group_id),
+    COALESCE((
+      SELECT streak FROM daily_stats
+      WHERE day = date(NEW.created_at, '-1 day') AND sessions > 0
+    ), 0) + 1
+  )
+  ON CONFLICT (day) DO UPDATE SET
+    sessions = sessions + 1,
+    groups = groups + excluded.groups,
+    streak = CASE WHEN sessions = 0 THEN excluded.streak ELSE streak END;
+  INSERT INTO daily_groups (day, group_id, sessions)
+  VALUES (date(NEW.created_at), NEW.group_id, 1)
+  ON CONFLICT (day, group_id) DO UPDATE SET sessions = sessions + 1;
+  UPDATE study_totals SET sessions = sessions + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_sessions_delete
+AFTER DELETE ON study_sessions
+BEGIN
+  UPDATE daily_groups SET sessions = sessions - 1
+  WHERE day = date(OLD.created_at) AND group_id = OLD.group_id;
+  UPDATE daily_stats
+  SET sessions = sessions - 1,
+      groups = groups - EXISTS (
+        SELECT 1 FROM daily_groups
+        WHERE day = date(OLD.created_at) AND group_id = OLD.group_id AND sessions <= 0
+      ),
+      streak = CASE WHEN sessions - 1 <= 0 THEN 0 ELSE streak END
+  WHERE day = date(OLD.created_at);
+  DELETE FROM daily_groups
+  WHERE day = date(OLD.created_at) AND group_id = OLD.group_id AND sessions <= 0;
+  UPDATE study_totals SET sessions = sessions - 1;
+END;
+
+-- Vocabulary size
+CREATE TRIGGER IF NOT EXISTS trg_study_totals_words_insert
+AFTER INSERT ON words
+BEGIN
+  UPDATE study_totals SET words = words + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_study_totals_words_delete
+AFTER DELETE ON words
+BEGIN
+  UPDATE study_totals SET words = words - 1;
+END;
+
+-- Words studied / mastered follow the per-word counters in word_reviews
+CREATE TRIGGER IF NOT EXISTS trg_study_totals_word_reviews_insert
+AFTER INSERT ON word_reviews
+BEGIN
+  UPDATE study_totals
+  SET words_studied = words_studied + 1,
+      mastered_words = mastered_words + (
+        NEW.correct_count + NEW.wrong_count >= 5
+        AND NEW.correct_count >= 0.8 * (NEW.correct_count + NEW.wrong_count)
+      );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_study_totals_word_reviews_update
+AFTER UPDATE OF correct_count, wrong_count ON word_reviews
+BEGIN
+  UPDATE study_totals
+  SET mastered_words = mastered_words
+    + (NEW.correct_count + NEW.wrong_count >= 5
+       AND NEW.correct_count >= 0.8 * (NEW.correct_count + NEW.wrong_count))
+    - (OLD.correct_count + OLD.wrong_count >= 5
+       AND OLD.correct_count >= 0.8 * (OLD.correct_count + OLD.wrong_count));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_study_totals_word_reviews_delete
+AFTER DELETE ON word_reviews
+BEGIN
+  UPDATE study_totals
+  SET words_studied = words_studied - 1,
+      mastered_words = mastered_words - (
+        OLD.correct_count + OLD.wrong_count >= 5
+        AND OLD.correct_count >= 0.8 * (OLD.correct_count + OLD.wrong_count)
+      );
+END;
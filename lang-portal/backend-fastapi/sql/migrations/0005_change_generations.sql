@@ -0,0 +1,123 @@
+-- Per-table change generations for conditional GETs (ETag / 304).
+-- Every write to a table bumps its generation, whoever the writer is.
+
+CREATE TABLE IF NOT EXISTS change_generations (
+  table_name TEXT PRIMARY KEY,
+  generation INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO change_generations (table_name) VALUES
+  ('words'),
+  ('groups'),
+  ('word_groups'),
+  ('study_activities'),
+  ('study_sessions'),
+  ('word_review_items');
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_words_insert
+AFTER INSERT ON words
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'words';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_words_update
+AFTER UPDATE ON words
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'words';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_words_delete
+AFTER DELETE ON words
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'words';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_groups_insert
+AFTER INSERT ON groups
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_groups_update
+AFTER UPDATE ON groups
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_groups_delete
+AFTER DELETE ON groups
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_word_groups_insert
+AFTER INSERT ON word_groups
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'word_groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_word_groups_update
+AFTER UPDATE ON word_groups
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'word_groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_word_groups_delete
+AFTER DELETE ON word_groups
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'word_groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_study_activities_insert
+AFTER INSERT ON study_activities
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'study_activities';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_study_activities_update
+AFTER UPDATE ON study_activities
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'study_activities';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_study_activities_delete
+AFTER DELETE ON study_activities
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'study_activities';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_study_sessions_insert
+AFTER INSERT ON study_sessions
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'study_sessions';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_study_sessions_update
+AFTER UPDATE ON study_sessions
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'study_sessions';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_study_sessions_delete
+AFTER DELETE ON study_sessions
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'study_sessions';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_word_review_items_insert
+AFTER INSERT ON word_review_items
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'word_review_items';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_word_review_items_update
+AFTER UPDATE ON word_review_items
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'word_review_items';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_word_review_items_delete
+AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE change_generations SET generation = generation + 1 WHERE table_name = 'word_review_items';
+END;
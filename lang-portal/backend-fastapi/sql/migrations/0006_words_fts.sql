@@ -0,0 +1,53 @@
+-- Full-text search over the vocabulary (FTS5), kept in sync by triggers.
+-- The rowid of words_fts is words.id.
+
+-- Searchable text per word. There is no romanization column, so it is
+-- assembled from the romaji of each part, e.g. [{"kanji": "払", "romaji": ["ha", "ra"]}, ...]
+CREATE VIEW IF NOT EXISTS words_search_text AS
+SELECT
+  w.id,
+  w.spanish,
+  (SELECT group_concat(r.value, '')
+   FROM json_each(CASE WHEN json_valid(w.parts) THEN w.parts ELSE '[]' END) AS p,
+        json_each(CASE WHEN p.type = 'object' THEN p.value ELSE '{}' END, '$.romaji') AS r
+  ) AS romaji,
+  w.english
+FROM words w;
+
+-- Prefix indexes keep typeahead queries on short prefixes cheap;
+-- remove_diacritics lets "cancion" match "canción"
+CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+  spanish,
+  romaji,
+  english,
+  tokenize = 'unicode61 remove_diacritics 2',
+  prefix = '1 2 3'
+);
+
+-- Backfill
+DELETE FROM words_fts;
+INSERT INTO words_fts (rowid, spanish, romaji, english)
+SELECT id, spanish, romaji, english FROM words_search_text;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_fts_insert
+AFTER INSERT ON words
+BEGIN
+  INSERT INTO words_fts (rowid, spanish, romaji, english)
+  SELECT id, spanish, romaji, english FROM words_search_text WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_fts_update
+AFTER UPDATE OF spanish, english, parts ON words
+BEGIN
+  DELETE FROM words_fts WHERE rowid = OLD.id;
+  INSERT INTO words_fts (rowid, spanish, romaji, english)
+  SELECT id, spanish, romaji, english FROM words_search_text WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_fts_delete
+AFTER DELETE ON words
+BEGIN
+  DELETE FROM words_fts WHERE rowid = OLD.id;
+END;
+
+INSERT INTO words_fts (words_fts) VALUES ('optimize');
@@ -0,0 +1,60 @@
+-- Session end times and review counts, kept on the session row.
+--
+-- ended_at is the end of the session so far: its start, then the time of
+-- its latest review, or the time it was closed. A session that gets no
+-- reviews for a while has simply timed out at its last activity, so no
+-- background job is needed to end it.
+
+ALTER TABLE study_sessions ADD COLUMN ended_at DATETIME;
+ALTER TABLE study_sessions ADD COLUMN review_count INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill
+UPDATE study_sessions
+SET review_count = (
+      SELECT COUNT(*) FROM word_review_items WHERE study_session_id = study_sessions.id
+    ),
+    ended_at = MAX(created_at, COALESCE((
+      SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = study_sessions.id
+    ), created_at));
+
+-- Listings per group sorted by last activity or review count
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_ended
+  ON study_sessions (group_id, ended_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_reviews
+  ON study_sessions (group_id, review_count);
+
+-- ALTER TABLE cannot default to another column
+CREATE TRIGGER IF NOT EXISTS trg_study_sessions_ended_at
+AFTER INSERT ON study_sessions
+WHEN NEW.ended_at IS NULL
+BEGIN
+  UPDATE study_sessions SET ended_at = NEW.created_at WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_session_reviews_insert
+AFTER INSERT ON word_review_items
+BEGIN
+  UPDATE study_sessions
+  SET review_count = review_count + 1,
+      ended_at = MAX(COALESCE(ended_at, NEW.created_at), NEW.created_at)
+  WHERE id = NEW.study_session_id;
+END;
+
+-- ended_at is left as is on delete; rebuild the counters to recompute it
+CREATE TRIGGER IF NOT EXISTS trg_session_reviews_delete
+AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE study_sessions SET review_count = review_count - 1
+  WHERE id = OLD.study_session_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_session_reviews_update
+AFTER UPDATE OF study_session_id ON word_review_items
+BEGIN
+  UPDATE study_sessions SET review_count = review_count - 1
+  WHERE id = OLD.study_session_id;
+  UPDATE study_sessions
+  SET review_count = review_count + 1,
+      ended_at = MAX(COALESCE(ended_at, NEW.created_at), NEW.created_at)
+  WHERE id = NEW.study_session_id;
+END;
@@ -0,0 +1,23 @@
+-- Spaced repetition (SM-2) state per word and a per-group due queue.
+-- Both are written by lib/scheduler.py as reviews are recorded and can be
+-- replayed from word_review_items with scripts.rebuild_counters.
+
+CREATE TABLE IF NOT EXISTS word_schedule (
+  word_id INTEGER PRIMARY KEY,
+  repetitions INTEGER NOT NULL DEFAULT 0,  -- correct reviews in a row
+  interval REAL NOT NULL DEFAULT 0,        -- days until the next review
+  ease REAL NOT NULL DEFAULT 2.5,
+  due_at DATETIME NOT NULL,
+  last_reviewed DATETIME NOT NULL,
+  FOREIGN KEY (word_id) REFERENCES words(id)
+);
+
+-- One row per (group, reviewed word), in due order
+CREATE TABLE IF NOT EXISTS review_queue (
+  group_id INTEGER NOT NULL,
+  due_at DATETIME NOT NULL,
+  word_id INTEGER NOT NULL,
+  PRIMARY KEY (group_id, due_at, word_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_review_queue_word ON review_queue (word_id);
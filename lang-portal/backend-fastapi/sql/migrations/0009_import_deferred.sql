@@ -0,0 +1,14 @@
+-- Schema a large import dropped for its duration (lib/importer.py).
+--
+-- Rows are added in the transaction that drops the indexes and trigger, and
+-- deleted in the one that puts them back, so an import that never finished
+-- leaves them here and the next start of the API restores them. first_id is
+-- the last word id before the import: the deferred triggers catch up the
+-- words after it.
+
+CREATE TABLE IF NOT EXISTS import_deferred (
+  name TEXT PRIMARY KEY,
+  type TEXT NOT NULL,
+  sql TEXT NOT NULL,
+  first_id INTEGER NOT NULL
+);
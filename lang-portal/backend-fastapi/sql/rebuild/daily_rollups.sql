@@ -0,0 +1,56 @@
+-- Recompute daily rollups and study totals from raw history
+-- (same as the backfill in migration 0004)
+
+DELETE FROM daily_stats;
+DELETE FROM daily_words;
+DELETE FROM daily_groups;
+DELETE FROM study_totals;
+
+INSERT INTO daily_words (day, word_id, reviews)
+SELECT date(created_at), word_id, COUNT(*)
+FROM word_review_items
+GROUP BY date(created_at), word_id;
+
+INSERT INTO daily_groups (day, group_id, sessions)
+SELECT date(created_at), group_id, COUNT(*)
+FROM study_sessions
+GROUP BY date(created_at), group_id;
+
+INSERT INTO daily_stats (day, reviews, corrects, words)
+SELECT date(created_at), COUNT(*), SUM(correct != 0), COUNT(DISTINCT word_id)
+FROM word_review_items
+GROUP BY date(created_at);
+
+INSERT INTO daily_stats (day, sessions, groups)
+SELECT date(created_at), COUNT(*), COUNT(DISTINCT group_id)
+FROM study_sessions
+GROUP BY date(created_at)
+ON CONFLICT (day) DO UPDATE SET
+  sessions = excluded.sessions,
+  groups = excluded.groups;
+
+-- Streaks: consecutive session days share the same (julianday - row number)
+UPDATE daily_stats
+SET streak = (
+  SELECT streak FROM (
+    SELECT day, ROW_NUMBER() OVER (PARTITION BY island ORDER BY day) AS streak
+    FROM (
+      SELECT day, julianday(day) - ROW_NUMBER() OVER (ORDER BY day) AS island
+      FROM daily_stats
+      WHERE sessions > 0
+    )
+  ) AS islands
+  WHERE islands.day = daily_stats.day
+)
+WHERE sessions > 0;
+
+INSERT INTO study_totals (id, words, words_studied, mastered_words, reviews, corrects, sessions)
+SELECT 1,
+  (SELECT COUNT(*) FROM words),
+  (SELECT COUNT(*) FROM word_reviews),
+  (SELECT COUNT(*) FROM word_reviews
+   WHERE correct_count + wrong_count >= 5
+     AND correct_count >= 0.8 * (correct_count + wrong_count)),
+  (SELECT COUNT(*) FROM word_review_items),
+  (SELECT COALESCE(SUM(correct != 0), 0) FROM word_review_items),
+  (SELECT COUNT(*) FROM study_sessions);
@@ -0,0 +1,40 @@
+import sqlite3
+import sys
+from pathlib import Path
+import pytest
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from scripts.migrate import apply_migrations
+from scripts.seed import seed_catalog
+
+
+def create_database(path):
+    """A words.db at `path` with the current schema and the seed data"""
+    conn = sqlite3.connect(path)
+    try:
+        apply_migrations(conn)
+        seed_catalog(conn)
+    finally:
+        conn.close()
+    return path
+
+
+@pytest.fixture
+def database(tmp_path):
+    return create_database(tmp_path / 'words.db')
+
+
+@pytest.fixture(scope='session')
+def client(tmp_path_factory):
+    """The API on a seeded words.db of its own; the pool opens words.db in
+    the working directory, so the session runs in a temporary one"""
+    from fastapi.testclient import TestClient
+    directory = tmp_path_factory.mktemp('api')
+    create_database(directory / 'words.db')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(directory)
+        import main
+        with TestClient(main.app) as client:
+            yield client
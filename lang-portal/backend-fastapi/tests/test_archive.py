@@ -0,0 +1,68 @@
+import sqlite3
+from datetime import datetime, timezone
+from lib import archive
+from lib.db import ConnectionPool
+
+
+def test_archives_of_the_same_second_are_kept(database, tmp_path, monkeypatch):
+    # A clock stuck on one instant: every archive gets the same time stamp
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    monkeypatch.setattr(archive, 'datetime', FrozenDatetime)
+    conn = sqlite3.connect(database, isolation_level=None)
+    directory = tmp_path / 'archive'
+    paths = []
+    for session_id in (1, 2):
+        conn.execute('INSERT INTO study_sessions (id, group_id, study_activity_id) VALUES (?, 1, 1)', (session_id,))
+        archive.swap_tables(conn, archive.HISTORY_TABLES)
+        paths.append(archive.write_archive(conn, archive.HISTORY_TABLES, directory, 'words'))
+        for table in archive.HISTORY_TABLES:
+            conn.execute(f'DROP TABLE "{archive.ARCHIVE}{table}"')
+    conn.close()
+
+    assert paths[0] != paths[1]
+    assert sorted(directory.iterdir()) == sorted(paths)
+    for session_id, path in zip((1, 2), paths):
+        archived = sqlite3.connect(path)
+        assert archived.execute('SELECT id FROM study_sessions').fetchall() == [(session_id,)]
+        archived.close()
+
+
+def test_archive_names_differ_within_a_second(database, tmp_path):
+    conn = sqlite3.connect(database, isolation_level=None)
+    archive.swap_tables(conn, archive.HISTORY_TABLES)
+    first = archive.write_archive(conn, archive.HISTORY_TABLES, tmp_path, 'words')
+    second = archive.write_archive(conn, archive.HISTORY_TABLES, tmp_path, 'words')
+    conn.close()
+    assert first != second and first.exists() and second.exists()
+
+
+class Job:
+    def progress(self, rows):
+        pass
+
+
+def indexed_columns(conn, table):
+    return sorted(
+        tuple(column[2] for column in conn.execute(f'PRAGMA index_info("{index[1]}")'))
+        for index in conn.execute(f'PRAGMA index_list("{table}")')
+    )
+
+
+def test_new_tables_are_indexed_until_the_purge(database, tmp_path):
+    conn = sqlite3.connect(database, isolation_level=None)
+    # Table names in the recreated statements may come back quoted
+    schema = lambda: sorted((kind, name, table, (sql or '').replace('"', '')) for kind, name, table, sql
+                            in conn.execute("SELECT type, name, tbl_name, sql FROM sqlite_master"))
+    before = schema()
+    columns = {table: indexed_columns(conn, table) for table in archive.HISTORY_TABLES + ('words', 'word_groups')}
+    archive.swap_tables(conn, archive.HISTORY_TABLES + ('words', 'word_groups'))
+    for table, indexed in columns.items():
+        assert indexed_columns(conn, table) == indexed
+
+    archive.run_archive(Job(), ConnectionPool(str(database)), tmp_path / 'archive')
+    assert schema() == before
+    conn.close()
@@ -0,0 +1,46 @@
+import pytest
+
+# As the frontend writes them: no trailing slash on the list routes
+FRONTEND_PATHS = [
+    '/api/groups?page=1&sort_by=name&order=asc',
+    '/api/words?page=1&sort_by=spanish&order=asc',
+    '/api/study-activities',
+    '/api/study-sessions?page=1&per_page=10',
+    '/api/groups/1',
+    '/api/groups/1/words?page=1&sort_by=spanish&order=asc',
+    '/api/groups/1/study_sessions?page=1&sort_by=created_at&order=desc',
+    '/api/words/1',
+    '/api/study-activities/1',
+]
+
+
+@pytest.mark.parametrize('path', FRONTEND_PATHS)
+def test_frontend_paths_match_their_own_responses(client, path):
+    direct = client.get(path)
+    assert direct.status_code == 200
+    response = client.post('/api/batch', json={'requests': [{'path': path}]})
+    assert response.status_code == 200
+    assert response.json()['responses'] == [{'status': 200, 'body': direct.json()}]
+
+
+def test_batch_of_frontend_paths(client):
+    response = client.post('/api/batch', json={'requests': [{'path': path} for path in FRONTEND_PATHS]})
+    assert response.status_code == 200
+    assert [item['status'] for item in response.json()['responses']] == [200] * len(FRONTEND_PATHS)
+
+
+def test_trailing_slash_added_or_removed(client):
+    response = client.post('/api/batch', json={'requests': [
+        {'path': '/api/groups', 'params': {'page': 1}},
+        {'path': '/api/groups/'},
+        {'path': '/api/words/1/'},
+    ]})
+    responses = response.json()['responses']
+    assert [item['status'] for item in responses] == [200, 200, 200]
+    assert responses[0]['body'] == responses[1]['body']
+    assert responses[2]['body']['id'] == 1
+
+
+def test_unknown_path_is_a_404(client):
+    response = client.post('/api/batch', json={'requests': [{'path': '/api/nowhere'}]})
+    assert response.json()['responses'][0]['status'] == 404
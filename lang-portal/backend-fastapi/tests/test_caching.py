@@ -0,0 +1,19 @@
+import sqlite3
+import time
+from fastapi import Request, Response
+from lib.caching import conditional, tracker
+
+
+def test_daily_etag_follows_the_utc_date(client, monkeypatch):
+    # One of the two zones is on another date than UTC at any time of day
+    try:
+        for zone in ('Etc/GMT-14', 'Etc/GMT+12'):
+            monkeypatch.setenv('TZ', zone)
+            time.tzset()
+            response = Response()
+            conditional('study_sessions', daily=True)(Request({'type': 'http', 'headers': []}), response)
+            today = sqlite3.connect(':memory:').execute("SELECT date('now')").fetchone()[0]
+            assert response.headers['etag'] == tracker.etag(('study_sessions',), (today,))
+    finally:
+        monkeypatch.undo()
+        time.tzset()
@@ -0,0 +1,28 @@
+import sqlite3
+
+RECOUNT = '''
+    SELECT word_id, SUM(correct != 0), SUM(correct = 0)
+    FROM word_review_items
+    GROUP BY word_id
+    ORDER BY word_id
+'''
+COUNTERS = 'SELECT word_id, correct_count, wrong_count FROM word_reviews ORDER BY word_id'
+
+
+def test_word_review_counters_match_a_recount(database):
+    conn = sqlite3.connect(database)
+    with conn:
+        session_id = conn.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)').lastrowid
+        conn.executemany('INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (?, ?, ?)',
+                         [(word_id, session_id, (word_id + n) % 3 != 0) for n in range(4) for word_id in range(1, 8)])
+    assert conn.execute(COUNTERS).fetchall() == conn.execute(RECOUNT).fetchall()
+    assert len(conn.execute(COUNTERS).fetchall()) == 7
+
+    with conn:
+        conn.execute('DELETE FROM word_review_items WHERE word_id = 2 AND correct = 0')
+        conn.execute('DELETE FROM word_review_items WHERE word_id = 3')
+        conn.execute('UPDATE word_review_items SET correct = NOT correct WHERE word_id = 4')
+        conn.execute('UPDATE word_review_items SET word_id = 8 WHERE word_id = 5')
+    assert conn.execute(COUNTERS).fetchall() == conn.execute(RECOUNT).fetchall()
+    assert 3 not in [row[0] for row in conn.execute(COUNTERS)]
+    conn.close()
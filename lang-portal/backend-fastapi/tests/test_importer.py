@@ -0,0 +1,42 @@
+import json
+import sqlite3
+from lib import importer
+
+
+def schema(conn):
+    return sorted(conn.execute("SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL").fetchall())
+
+
+def write_words(path, count):
+    path.write_text(''.join(json.dumps({'spanish': f'palabra{i}', 'english': f'word{i}'}) + '\n' for i in range(count)))
+    return path
+
+
+def test_large_import_restores_what_it_deferred(database, tmp_path):
+    conn = sqlite3.connect(database)
+    before = schema(conn)
+    result = importer.import_words(conn, write_words(tmp_path / 'words.ndjson', 25), 'Imported', chunk_size=10)
+    assert result['rows'] == 25
+    assert schema(conn) == before
+    assert conn.execute('SELECT COUNT(*) FROM import_deferred').fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM words_fts WHERE words_fts MATCH 'palabra*'").fetchone()[0] == 25
+    assert conn.execute("SELECT words_count FROM groups WHERE name = 'Imported'").fetchone()[0] == 25
+    conn.close()
+
+
+def test_import_stopped_halfway_is_restored(database, tmp_path, monkeypatch):
+    conn = sqlite3.connect(database)
+    before = schema(conn)
+    # The process dies before the import puts its schema back
+    monkeypatch.setattr(importer, '_restore', lambda conn: [])
+    importer.import_words(conn, write_words(tmp_path / 'words.ndjson', 25), 'Imported', chunk_size=10)
+    monkeypatch.undo()
+    dropped = {name for _, name, _ in before} - {name for _, name, _ in schema(conn)}
+    assert 'trg_words_fts_insert' in dropped
+    assert {row[0] for row in conn.execute('SELECT name FROM import_deferred')} == dropped
+
+    assert set(importer.restore_deferred(conn)) == dropped
+    assert schema(conn) == before
+    assert conn.execute("SELECT COUNT(*) FROM words_fts WHERE words_fts MATCH 'palabra*'").fetchone()[0] == 25
+    assert importer.restore_deferred(conn) == []
+    conn.close()
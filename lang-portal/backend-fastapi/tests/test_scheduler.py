@@ -0,0 +1,32 @@
+import pytest
+from lib.scheduler import MAX_INTERVAL, MIN_EASE, NEW_WORD, Schedule, due_date, next_schedule
+
+
+def review(schedule, *answers):
+    for correct in answers:
+        schedule = next_schedule(schedule, correct)
+    return schedule
+
+
+def test_correct_answers_grow_the_interval():
+    assert review(NEW_WORD, True) == Schedule(1, 1.0, 2.5)
+    assert review(NEW_WORD, True, True) == Schedule(2, 6.0, 2.5)
+    assert review(NEW_WORD, True, True, True) == Schedule(3, 15, 2.5)
+    assert review(NEW_WORD, True, True, True, True) == Schedule(4, 38, 2.5)
+
+
+def test_wrong_answer_resets_repetitions_and_lowers_ease():
+    schedule = review(NEW_WORD, True, True, True, False)
+    assert (schedule.repetitions, schedule.interval) == (0, 1.0)
+    assert schedule.ease == pytest.approx(1.96)
+    # Relearned from the start, at the lower ease
+    assert review(schedule, True, True, True) == Schedule(3, round(6.0 * 1.96), pytest.approx(1.96))
+
+
+def test_ease_and_interval_are_bounded():
+    assert review(NEW_WORD, *[False] * 10).ease == MIN_EASE
+    assert next_schedule(Schedule(50, MAX_INTERVAL, 2.5), True).interval == MAX_INTERVAL
+
+
+def test_due_date():
+    assert due_date('2024-01-31 10:00:00', 6.0) == '2024-02-06 10:00:00'
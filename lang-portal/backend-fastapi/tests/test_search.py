@@ -0,0 +1,24 @@
+import sqlite3
+
+
+def test_search_ranks_every_match(client):
+    # The best match comes after a thousand weaker ones (English only)
+    conn = sqlite3.connect('words.db')
+    with conn:
+        conn.executemany('INSERT INTO words (spanish, english, parts) VALUES (?, ?, ?)',
+                         [(f'relleno{i}', 'zebra stripe', '[]') for i in range(1200)])
+        best = conn.execute("INSERT INTO words (spanish, english, parts) VALUES ('cebra', 'zebra', '[]')").lastrowid
+        conn.execute("INSERT INTO words (spanish, english, parts) VALUES ('zebra', 'zebra', '[]')")
+    try:
+        response = client.get('/api/words/search', params={'q': 'zebra', 'limit': 3})
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert results[0]['spanish'] == 'zebra'
+        assert [result['score'] for result in results] == sorted((result['score'] for result in results), reverse=True)
+
+        response = client.get('/api/words/search', params={'q': 'cebra', 'limit': 3})
+        assert [result['id'] for result in response.json()['results']] == [best]
+    finally:
+        with conn:
+            conn.execute("DELETE FROM words WHERE spanish LIKE 'relleno%' OR english = 'zebra'")
+        conn.close()
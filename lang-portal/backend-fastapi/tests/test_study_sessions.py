@@ -0,0 +1,38 @@
+import sqlite3
+import threading
+from lib.db import pool
+
+
+def new_session():
+    conn = sqlite3.connect('words.db')
+    with conn:
+        session_id = conn.execute('''
+            INSERT INTO study_sessions (group_id, study_activity_id, ended_at)
+            VALUES (1, 1, CURRENT_TIMESTAMP)
+        ''').lastrowid
+    conn.close()
+    return session_id
+
+
+def test_close_answers_like_the_session_detail(client):
+    session_id = new_session()
+    response = client.post(f'/api/study-sessions/{session_id}/close')
+    assert response.status_code == 200
+    assert response.json() == client.get(f'/api/study-sessions/{session_id}').json()['session']
+    assert response.json()['group_name'] == 'Core Verbs'
+
+
+def test_close_unknown_session(client):
+    assert client.post('/api/study-sessions/999999/close').status_code == 404
+
+
+def test_close_waits_for_the_write_lock(client):
+    session_id = new_session()
+    responses = []
+    with pool.write_lock:
+        closing = threading.Thread(target=lambda: responses.append(client.post(f'/api/study-sessions/{session_id}/close')))
+        closing.start()
+        closing.join(0.5)
+        assert not responses
+    closing.join(10)
+    assert responses[0].status_code == 200
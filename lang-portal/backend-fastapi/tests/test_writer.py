@@ -0,0 +1,35 @@
+import sqlite3
+import pytest
+from lib.db import ConnectionPool
+from lib.writer import ReviewRejected, ReviewWriter, _Request
+
+
+def test_failed_review_rolls_back_alone(database):
+    conn = sqlite3.connect(database)
+    with conn:
+        session_id = conn.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)').lastrowid
+    pool = ConnectionPool(str(database))
+    writer = ReviewWriter(pool)
+    batch = [
+        _Request(session_id, [(1, True), (2, False)]),
+        # Word 3 is inserted before word 999999 is found missing
+        _Request(session_id, [(3, True), (999999, True)]),
+        _Request(session_id, [(4, True)]),
+    ]
+    writer_conn = pool.open_connection()
+    writer_conn.isolation_level = None
+    writer._commit(writer_conn, batch)
+    writer_conn.close()
+
+    assert len(batch[0].future.result()) == 2
+    with pytest.raises(ReviewRejected):
+        batch[1].future.result()
+    assert len(batch[2].future.result()) == 1
+    # Nothing of the failed request is left, in the reviews or what they maintain
+    assert conn.execute('SELECT word_id FROM word_review_items ORDER BY word_id').fetchall() == [(1,), (2,), (4,)]
+    assert conn.execute('SELECT word_id FROM word_reviews ORDER BY word_id').fetchall() == [(1,), (2,), (4,)]
+    assert conn.execute('SELECT word_id FROM word_schedule ORDER BY word_id').fetchall() == [(1,), (2,), (4,)]
+    assert conn.execute('SELECT review_count FROM study_sessions WHERE id = ?', (session_id,)).fetchone() == (3,)
+    assert writer.stats()['reviews'] == 3
+    conn.close()
+    pool.close()
@@ -1,18 +1,160 @@
-from comps import MicroService, ServiceOrchestrator
+from comps import MicroService, ServiceOrchestrator, ServiceRoleType
 from comps.cores.mega.constants import ServiceType
+from comps.cores.proto.api_protocol import (
+    ChatCompletionRequest,
+    ChatCompletionResponse,
+    ChatCompletionResponseChoice,
+    ChatMessage,
+    UsageInfo,
+)
+from comps.cores.proto.docarray import LLMParams
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from embedding_batcher import EmbeddingBatcher
+from semantic_cache import SemanticCache, context_id
+import atexit
+import json
 import os
+import threading
 
+MEGA_SERVICE_PORT = int(os.getenv("MEGA_SERVICE_PORT", 8000))
 EMBEDDING_SERVICE_HOST_IP = os.getenv("EMBEDDING_SERVICE_HOST_IP", "0.0.0.0")
 EMBEDDING_SERVICE_PORT = os.getenv("EMBEDDING_SERVICE_PORT", 6000)
 LLM_SERVICE_HOST_IP = os.getenv("LLM_SERVICE_HOST_IP", "0.0.0.0")
 LLM_SERVICE_PORT = os.getenv("LLM_SERVICE_PORT", 9000)
+LLM_MODEL_ID = os.getenv("LLM_MODEL_ID", "llama3.2:1b")
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", LLM_MODEL_ID)
+
+# Semantic cache of answers (see semantic_cache.py); SEMANTIC_CACHE=off disables it
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "on") != "off"
+CACHE_PATH = os.getenv("CACHE_PATH", "cache/semantic_cache.npz")
+CACHE_THRESHOLD = float(os.getenv("CACHE_THRESHOLD", 0.95))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+# Concurrent embeddings go out together (see embedding_batcher.py);
+# EMBEDDING_MAX_BATCH=1 sends each one on its own
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", 5))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", 32))
+
+# Returned by _pull once the LLM stream is over (or was closed)
+_END = object()
+
+
+def chat_messages(messages):
+    """OpenAI chat messages from a request's `messages` (a prompt or a list)"""
+    if isinstance(messages, str):
+        return [{"role": "user", "content": messages}]
+    return [dict(message) for message in messages]
+
+
+def last_user_text(messages):
+    for message in reversed(messages):
+        if message.get("role") == "user" and isinstance(message.get("content"), str):
+            return message["content"]
+    return ""
+
+
+def align_inputs(self, inputs, cur_node, runtime_graph, llm_parameters_dict, **kwargs):
+    # Both remote services speak the OpenAI API (Ollama's /v1 endpoints)
+    service_type = self.services[cur_node].service_type
+    if service_type == ServiceType.EMBEDDING:
+        return {"model": EMBEDDING_MODEL_ID, "input": inputs["text"]}
+    if service_type == ServiceType.LLM:
+        # The conversation comes from schedule(messages=...), not the embedding
+        return {
+            "model": LLM_MODEL_ID,
+            "messages": kwargs["messages"],
+            "stream": llm_parameters_dict["stream"],
+            "max_tokens": llm_parameters_dict.get("max_tokens"),
+            "temperature": llm_parameters_dict.get("temperature"),
+            "top_p": llm_parameters_dict.get("top_p"),
+        }
+    return inputs
+
+
+def sse_event(content):
+    return f"data: {json.dumps({'content': content}, ensure_ascii=False)}\n\n"
+
+
+def sse_tokens(events):
+    """Token texts in OpenAI chat completion chunk events"""
+    for event in events:
+        for line in event.splitlines():
+            if not line.startswith(b"data:"):
+                continue
+            data = line[len(b"data:"):].strip()
+            if data == b"[DONE]":
+                continue
+            try:
+                choices = json.loads(data)["choices"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            token = choices[0].get("delta", {}).get("content") if choices else None
+            if token:
+                yield token
+
+
+def _close(gen):
+    try:
+        gen.close()
+    except ValueError:
+        # Running on the worker thread, which closes it after its chunk
+        pass
+
+
+def _pull(gen, closing):
+    chunk = next(gen, _END)
+    if closing.is_set():
+        _close(gen)
+        return _END
+    return chunk
+
+
+async def align_generator(self, gen, on_answer=None, **kwargs):
+    # The orchestrator reads the LLM's stream with a blocking generator; its
+    # chunks are pulled on a worker thread and re-framed as one SSE event per
+    # token ({"content": ...}), ending with [DONE]. When the client goes away
+    # the response cancels this generator, which closes the upstream one, so
+    # the LLM request is dropped instead of generating to the end. A complete
+    # answer is passed to on_answer.
+    closing = threading.Event()
+    buffer = b""
+    tokens = []
+    try:
+        while (chunk := await run_in_threadpool(_pull, gen, closing)) is not _END:
+            buffer += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            *events, buffer = buffer.replace(b"\r\n", b"\n").split(b"\n\n")
+            for token in sse_tokens(events):
+                tokens.append(token)
+                yield sse_event(token)
+        for token in sse_tokens([buffer]):
+            tokens.append(token)
+            yield sse_event(token)
+        if on_answer is not None and tokens:
+            on_answer("".join(tokens))
+        yield "data: [DONE]\n\n"
+    finally:
+        closing.set()
+        _close(gen)
 
 
 class ExampleService:
     def __init__(self, host="0.0.0.0", port=8000):
         self.host = host
         self.port = port
+        self.endpoint = "/v1/example-service"
+        ServiceOrchestrator.align_inputs = align_inputs
+        ServiceOrchestrator.align_generator = align_generator
+        # The cache stage sits between the two: a hit skips the LLM
+        self.embedder = ServiceOrchestrator()
+        self.batcher = EmbeddingBatcher(self.send_embeddings, EMBEDDING_BATCH_WINDOW_MS / 1000, EMBEDDING_MAX_BATCH)
         self.megaservice = ServiceOrchestrator()
+        self.cache = None
+        if SEMANTIC_CACHE:
+            self.cache = SemanticCache(CACHE_PATH, CACHE_THRESHOLD, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+            atexit.register(self.cache.save)
 
     def add_remote_service(self):
         embedding = MicroService(
@@ -31,5 +173,110 @@ class ExampleService:
             use_remote_service=True,
             service_type=ServiceType.LLM,
         )
-        self.megaservice.add(embedding).add(llm)
-        self.megaservice.flow_to(embedding, llm)
\ No newline at end of file
+        self.embedder.add(embedding)
+        self.megaservice.add(llm)
+
+    async def send_embeddings(self, texts):
+        """One /v1/embeddings request for `texts`; their vectors, in order"""
+        result_dict, runtime_graph = await self.embedder.schedule(initial_inputs={"text": texts})
+        data = result_dict[runtime_graph.all_leaves()[-1]]["data"]
+        return [item["embedding"] for item in sorted(data, key=lambda item: item["index"])]
+
+    async def embed(self, text):
+        return await self.batcher.embed(text)
+
+    async def cached_answer(self, messages, parameters):
+        """(answer or None, store(answer) for a miss)"""
+        # Everything but the learner's sentence picks the answer too
+        text = last_user_text(messages)
+        context = context_id(
+            messages[:-1], LLM_MODEL_ID, parameters.max_tokens, parameters.top_p, parameters.temperature
+        )
+        answer = self.cache.get(context, text)
+        if answer is not None:
+            return answer, None
+        vector = await self.embed(text)
+        answer = self.cache.search(context, vector)
+        return answer, lambda answer: self.cache.put(context, text, vector, answer)
+
+    async def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else {"enabled": False}
+
+    async def embedding_stats(self):
+        return self.batcher.stats()
+
+    async def handle_request(self, request: Request):
+        data = await request.json()
+        stream = data.get("stream", True)
+        chat_request = ChatCompletionRequest.model_validate(data)
+        messages = chat_messages(chat_request.messages)
+        if not messages:
+            raise HTTPException(status_code=400, detail="No messages")
+        parameters = LLMParams(
+            max_tokens=chat_request.max_tokens if chat_request.max_tokens else 1024,
+            top_k=chat_request.top_k if chat_request.top_k else 10,
+            top_p=chat_request.top_p if chat_request.top_p else 0.95,
+            temperature=chat_request.temperature if chat_request.temperature else 0.01,
+            stream=stream,
+        )
+        store = None
+        if self.cache is not None and messages[-1].get("role") == "user":
+            answer, store = await self.cached_answer(messages, parameters)
+            if answer is not None:
+                return self.answer_response(answer, stream)
+        result_dict, runtime_graph = await self.megaservice.schedule(
+            initial_inputs={"text": last_user_text(messages)},
+            llm_parameters=parameters,
+            messages=messages,
+            on_answer=store,
+        )
+        for node, response in result_dict.items():
+            # The LLM stage streams: its tokens go out as they are generated
+            if isinstance(response, StreamingResponse):
+                return self.stream_headers(response)
+        last_node = runtime_graph.all_leaves()[-1]
+        completion = result_dict[last_node]
+        answer = completion["choices"][0]["message"]["content"]
+        if store is not None:
+            store(answer)
+        return self.answer_response(answer, False, completion["choices"][0].get("finish_reason", "stop"))
+
+    def stream_headers(self, response):
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+    def answer_response(self, answer, stream, finish_reason="stop"):
+        if stream:
+            # A cached answer is streamed in one event
+            events = iter([sse_event(answer), "data: [DONE]\n\n"])
+            return self.stream_headers(StreamingResponse(events, media_type="text/event-stream"))
+        choices = [
+            ChatCompletionResponseChoice(
+                index=0,
+                message=ChatMessage(role="assistant", content=answer),
+                finish_reason=finish_reason,
+            )
+        ]
+        return ChatCompletionResponse(model=LLM_MODEL_ID, choices=choices, usage=UsageInfo())
+
+    def start(self):
+        self.service = MicroService(
+            self.__class__.__name__,
+            service_role=ServiceRoleType.MEGASERVICE,
+            host=self.host,
+            port=self.port,
+            endpoint=self.endpoint,
+            input_datatype=ChatCompletionRequest,
+            output_datatype=ChatCompletionResponse,
+        )
+        self.service.add_route(self.endpoint, self.handle_request, methods=["POST"])
+        self.service.add_route(self.endpoint + "/cache", self.cache_stats, methods=["GET"])
+        self.service.add_route(self.endpoint + "/embeddings", self.embedding_stats, methods=["GET"])
+        self.service.start()
+
+
+if __name__ == "__main__":
+    example = ExampleService(port=MEGA_SERVICE_PORT)
+    example.add_remote_service()
+    example.start()
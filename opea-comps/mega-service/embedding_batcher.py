@@ -0,0 +1,91 @@
+from prometheus_client import Histogram
+import asyncio
+import time
+
+# Micro-batching of embedding requests.
+#
+# Embedding servers cost much less per input on a batch than on single
+# inputs. Concurrent embed() calls are queued; the first one starts a
+# `window` second timer, and when it fires (or `max_batch` texts are
+# waiting) the queued texts go out as one request, with duplicates sent once.
+# Each caller gets its own vector back, or the error of the batch. Batches
+# are sent as they fill: a slow one does not hold up the next.
+
+BATCH_SIZE = Histogram(
+    "embedding_batch_size", "Texts per batched embedding request",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+QUEUE_DELAY = Histogram(
+    "embedding_queue_delay_seconds", "Time an embedding request waits for its batch to be sent",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1),
+)
+
+
+class EmbeddingBatcher:
+    def __init__(self, send, window=0.005, max_batch=32):
+        self.send = send  # async send(texts) -> their vectors, in order
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+        self.queue_delay = 0.0
+        self._pending = []  # (text, future, queued at)
+        self._timer = None
+        self._tasks = set()
+
+    async def embed(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        sent_at = time.perf_counter()
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        for _, _, queued_at in batch:
+            QUEUE_DELAY.observe(sent_at - queued_at)
+            self.queue_delay += sent_at - queued_at
+        BATCH_SIZE.observe(len(texts))
+        self.batches += 1
+        self.requests += len(batch)
+        self.texts += len(texts)
+        try:
+            vectors = await self.send(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Embedding service returned {len(vectors)} vectors for {len(texts)} texts")
+            vectors = dict(zip(texts, vectors))
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, future, _ in batch:
+            # Callers that gave up have a cancelled future
+            if not future.done():
+                future.set_result(vectors[text])
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts_sent": self.texts,
+            "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "mean_queue_delay_ms": round(self.queue_delay / self.requests * 1000, 3) if self.requests else 0.0,
+        }
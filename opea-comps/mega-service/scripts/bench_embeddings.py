@@ -0,0 +1,91 @@
+"""Embedding throughput through the mega-service, batched or not.
+
+Starts scripts.ollama_stub as the embedding service and, for each
+concurrency level, has that many workers call ExampleService.embed() back to
+back for --seconds, once with every call sent on its own (max batch 1) and
+once micro-batched. Reports embeddings per second, median and p95 latency,
+and how many /v1/embeddings requests the stub received:
+
+    python -m scripts.bench_embeddings
+    python -m scripts.bench_embeddings --concurrency 1 8 64 --window-ms 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from scripts.bench_stream import percentile, stub_stats, wait_port
+
+APP_DIR = Path(__file__).parent.parent
+
+
+async def run(service, concurrency, seconds):
+    """(embeddings done, their latencies)"""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def worker(n):
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await service.embed(f"worker {n} sentence {i}")
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return len(latencies), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--seconds", type=float, default=3.0, help="per concurrency level and mode")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--stub-port", type=int, default=8012)
+    args = parser.parse_args()
+
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "scripts.ollama_stub", "--port", str(args.stub_port)],
+        cwd=APP_DIR,
+    )
+    os.environ.update(
+        SEMANTIC_CACHE="off",
+        EMBEDDING_SERVICE_HOST_IP="127.0.0.1", EMBEDDING_SERVICE_PORT=str(args.stub_port),
+    )
+    sys.path.insert(0, str(APP_DIR))
+    from app import ExampleService
+    from embedding_batcher import EmbeddingBatcher
+
+    service = ExampleService()
+    service.add_remote_service()
+    results = {"window_ms": args.window_ms, "max_batch": args.max_batch}
+    try:
+        wait_port(args.stub_port)
+        for concurrency in args.concurrency:
+            level = results[f"concurrency_{concurrency}"] = {}
+            for name, max_batch in (("unbatched", 1), ("batched", args.max_batch)):
+                service.batcher = EmbeddingBatcher(service.send_embeddings, args.window_ms / 1000, max_batch)
+                asyncio.run(service.embed("warm up"))
+                before = stub_stats(args.stub_port)
+                done, latencies = asyncio.run(run(service, concurrency, args.seconds))
+                after = stub_stats(args.stub_port)
+                level[name] = {
+                    "embeddings_per_s": round(done / args.seconds, 1),
+                    "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                    "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                    "upstream_requests": after["embedding_requests"] - before["embedding_requests"],
+                    "mean_batch_size": service.batcher.stats()["mean_batch_size"],
+                }
+    finally:
+        stub.terminate()
+        stub.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
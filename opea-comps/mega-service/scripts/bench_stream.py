@@ -0,0 +1,137 @@
+"""Time to first token through the mega-service gateway, streamed or not.
+
+Starts scripts.ollama_stub as the embedding and LLM services and app.py as
+the gateway, then sends chat requests one after another with "stream": true
+and false. Reports median and p95 time to the first token (for a buffered
+answer, the whole response) and to the end, and checks that a client
+dropping a stream after its first token stops the generation upstream:
+
+    python -m scripts.bench_stream
+    python -m scripts.bench_stream --tokens 200 --token-delay 0.03
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent.parent
+PROMPT = "Translate into Spanish: the black cat eats fish in the kitchen."
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def wait_port(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"Nothing listening on port {port} after {timeout}s")
+
+
+def stub_stats(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", "/stats")
+    stats = json.loads(conn.getresponse().read())
+    conn.close()
+    return stats
+
+
+def chat(port, stream, tokens, cancel_after_first=False):
+    """(seconds to the first token, seconds to the end, tokens received)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    body = json.dumps({"messages": PROMPT, "stream": stream, "max_tokens": tokens})
+    start = time.perf_counter()
+    conn.request("POST", "/v1/example-service", body, {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    if response.status != 200:
+        raise SystemExit(f"Gateway answered {response.status}: {response.read()[:200]!r}")
+    if not stream:
+        json.loads(response.read())
+        elapsed = time.perf_counter() - start
+        conn.close()
+        return elapsed, elapsed, tokens
+    first, received = None, 0
+    while line := response.readline():
+        if line.startswith(b"data: {"):
+            received += 1
+            if first is None:
+                first = time.perf_counter() - start
+                if cancel_after_first:
+                    break
+        elif line.startswith(b"data: [DONE]"):
+            break
+    total = time.perf_counter() - start
+    conn.close()
+    return first, total, received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20, help="requests per mode")
+    parser.add_argument("--tokens", type=int, default=64, help="tokens per answer")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="stub seconds per token")
+    parser.add_argument("--port", type=int, default=8010, help="gateway port")
+    parser.add_argument("--stub-port", type=int, default=8011)
+    args = parser.parse_args()
+
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "scripts.ollama_stub", "--port", str(args.stub_port),
+         "--tokens", str(args.tokens), "--token-delay", str(args.token_delay)],
+        cwd=APP_DIR,
+    )
+    env = dict(
+        os.environ,
+        MEGA_SERVICE_PORT=str(args.port),
+        EMBEDDING_SERVICE_HOST_IP="127.0.0.1", EMBEDDING_SERVICE_PORT=str(args.stub_port),
+        LLM_SERVICE_HOST_IP="127.0.0.1", LLM_SERVICE_PORT=str(args.stub_port),
+    )
+    gateway = subprocess.Popen([sys.executable, "app.py"], cwd=APP_DIR, env=env)
+    try:
+        wait_port(args.stub_port)
+        wait_port(args.port)
+        chat(args.port, True, args.tokens)  # warm up
+
+        results = {"tokens": args.tokens, "token_delay_s": args.token_delay}
+        for name, stream in (("stream", True), ("buffered", False)):
+            firsts, totals = [], []
+            for _ in range(args.requests):
+                first, total, _ = chat(args.port, stream, args.tokens)
+                firsts.append(first)
+                totals.append(total)
+            results[name] = {
+                "ttft_p50_ms": round(percentile(firsts, 50) * 1000, 1),
+                "ttft_p95_ms": round(percentile(firsts, 95) * 1000, 1),
+                "total_p50_ms": round(percentile(totals, 50) * 1000, 1),
+            }
+
+        # Drop a stream after its first token: the stub should see the
+        # request go away long before the answer is complete
+        before = stub_stats(args.stub_port)
+        chat(args.port, True, args.tokens, cancel_after_first=True)
+        time.sleep(args.token_delay * 10 + 1.0)
+        after = stub_stats(args.stub_port)
+        results["cancelled_stream"] = {
+            "upstream_cancelled": after["chat_cancelled"] - before["chat_cancelled"],
+            "tokens_generated": after["tokens_sent"] - before["tokens_sent"],
+            "tokens_requested": args.tokens,
+        }
+    finally:
+        for process in (gateway, stub):
+            process.terminate()
+            process.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Local stand-in for the Ollama server's OpenAI endpoints, for benchmarks.
+
+Serves /v1/chat/completions, streamed (SSE chunks, one token every
+--token-delay seconds) or not, and /v1/embeddings, which takes a string or
+a list of them and answers after --embed-latency seconds plus
+--embed-item-latency per input (the cost of a batch grows slower than its
+size, as on a real embedding server). GET /stats counts requests, inputs
+and tokens sent, and chat streams the client dropped before the end.
+
+    python -m scripts.ollama_stub --port 8008
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = ("El", " gato", " negro", " come", " pescado", " en", " la", " cocina", ".")
+
+stats = {
+    "chat_requests": 0, "chat_completed": 0, "chat_cancelled": 0, "tokens_sent": 0,
+    "embedding_requests": 0, "embedding_inputs": 0,
+}
+
+
+def embed(text, dimensions):
+    # Deterministic unit vector per text
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    values = [(digest[i % len(digest)] + i) % 251 - 125 for i in range(dimensions)]
+    norm = sum(value * value for value in values) ** 0.5 or 1.0
+    return [value / norm for value in values]
+
+
+def create_app(token_delay=0.02, tokens=64, embed_latency=0.02, embed_item_latency=0.002, dimensions=384):
+    app = FastAPI()
+
+    def chunk(model, content=None, finish_reason=None):
+        delta = {"role": "assistant", "content": content} if content is not None else {}
+        return {
+            "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        count = min(tokens, body.get("max_tokens") or tokens)
+        stats["chat_requests"] += 1
+        if not body.get("stream"):
+            await asyncio.sleep(token_delay * count)
+            stats["tokens_sent"] += count
+            stats["chat_completed"] += 1
+            text = "".join(WORDS[i % len(WORDS)] for i in range(count))
+            return JSONResponse({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": count, "total_tokens": count},
+            })
+
+        async def generate():
+            sent = 0
+            try:
+                for i in range(count):
+                    await asyncio.sleep(token_delay)
+                    yield f"data: {json.dumps(chunk(model, WORDS[i % len(WORDS)]))}\n\n"
+                    sent += 1
+                    stats["tokens_sent"] += 1
+                yield f"data: {json.dumps(chunk(model, finish_reason='stop'))}\n\n"
+                yield "data: [DONE]\n\n"
+                stats["chat_completed"] += 1
+            finally:
+                if sent < count:
+                    stats["chat_cancelled"] += 1
+
+        return StreamingResponse(generate(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        stats["embedding_requests"] += 1
+        stats["embedding_inputs"] += len(inputs)
+        await asyncio.sleep(embed_latency + embed_item_latency * len(inputs))
+        return JSONResponse({
+            "object": "list", "model": body.get("model", "stub"),
+            "data": [{"object": "embedding", "index": i, "embedding": embed(text, dimensions)}
+                     for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument("--tokens", type=int, default=64, help="tokens per completion (at most max_tokens)")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="seconds per embedding request")
+    parser.add_argument("--embed-item-latency", type=float, default=0.002, help="extra seconds per input")
+    parser.add_argument("--dimensions", type=int, default=384)
+    args = parser.parse_args()
+    app = create_app(args.token_delay, args.tokens, args.embed_latency, args.embed_item_latency, args.dimensions)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
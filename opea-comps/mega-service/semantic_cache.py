@@ -0,0 +1,196 @@
+from prometheus_client import Counter, Gauge
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+
+# Semantic cache of LLM answers.
+#
+# Learners submit near-identical sentences to the same prompt all day. An
+# answer is cached under its context (everything but the learner's sentence:
+# earlier messages, model and generation parameters) and the sentence. A
+# lookup first tries the normalized sentence (case, spacing and end
+# punctuation ignored), then the embedding of the sentence: the cosine
+# similarity to every cached sentence of the same context is one matrix
+# product over unit vectors, and the best match at or above `threshold`
+# answers. Entries expire `ttl` seconds after they were added; when the cache
+# is full the least recently used one goes. Changes are saved to `path` (an
+# .npz file) by a timer thread within `save_interval` seconds, so they
+# survive however the process ends after that, and loaded from it at start.
+
+LOOKUPS = Counter("semantic_cache_lookups", "Semantic cache lookups by result", ["result"])
+ENTRIES = Gauge("semantic_cache_entries", "Answers in the semantic cache")
+EVICTIONS = Counter("semantic_cache_evictions", "Semantic cache entries dropped", ["reason"])
+
+RESULTS = ("exact", "semantic", "miss")
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text).strip().strip(".!?¡¿ ").casefold()
+
+
+def context_id(*parts):
+    """64-bit id of everything an answer depends on besides the sentence"""
+    digest = hashlib.blake2b(json.dumps(parts, sort_keys=True).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class SemanticCache:
+    def __init__(self, path=None, threshold=0.95, max_entries=1000, ttl=86400.0, save_interval=5.0):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.save_interval = save_interval
+        self.lookups = dict.fromkeys(RESULTS, 0)
+        self._lock = threading.Lock()  # entries, against the saving thread
+        self._save_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        self._clear()
+        if path and os.path.exists(path):
+            self.load()
+
+    def _clear(self, dimensions=0):
+        # One row per entry; `used` marks the rows holding one
+        self.vectors = np.zeros((self.max_entries, dimensions), dtype=np.float32)
+        self.contexts = np.zeros(self.max_entries, dtype=np.int64)
+        self.created = np.zeros(self.max_entries)
+        self.last_used = np.zeros(self.max_entries)
+        self.used = np.zeros(self.max_entries, dtype=bool)
+        self.keys = [None] * self.max_entries
+        self.answers = [None] * self.max_entries
+        self.rows = {}  # (context, normalized sentence) -> row
+        ENTRIES.set(0)
+
+    def _hit(self, row, result):
+        self.last_used[row] = time.time()
+        self.lookups[result] += 1
+        LOOKUPS.labels(result).inc()
+        return self.answers[row]
+
+    def _drop(self, rows, reason):
+        for row in rows:
+            del self.rows[(int(self.contexts[row]), self.keys[row])]
+            self.keys[row] = self.answers[row] = None
+            EVICTIONS.labels(reason).inc()
+        self.used[rows] = False
+        ENTRIES.set(len(self.rows))
+        self._changed()
+
+    def _changed(self):
+        self._dirty = True
+        if self.path and self._timer is None:
+            self._timer = threading.Timer(self.save_interval, self.save)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _expire(self):
+        expired = np.flatnonzero(self.used & (self.created < time.time() - self.ttl))
+        if len(expired):
+            self._drop(expired, "ttl")
+
+    def get(self, context, text):
+        """Answer cached for exactly this sentence (normalized), or None"""
+        with self._lock:
+            row = self.rows.get((context, normalize(text)))
+            if row is not None and self.created[row] >= time.time() - self.ttl:
+                return self._hit(row, "exact")
+            return None
+
+    def search(self, context, vector):
+        """Answer of the most similar cached sentence of `context`, if similar
+        enough, or None. Counts the lookup as a miss otherwise."""
+        query = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._expire()
+            candidates = self.used & (self.contexts == context)
+            if query.shape[0] == self.vectors.shape[1] and candidates.any():
+                scores = self.vectors @ (query / (np.linalg.norm(query) or 1.0))
+                scores[~candidates] = -np.inf
+                row = int(np.argmax(scores))
+                if scores[row] >= self.threshold:
+                    return self._hit(row, "semantic")
+            self.lookups["miss"] += 1
+            LOOKUPS.labels("miss").inc()
+            return None
+
+    def put(self, context, text, vector, answer):
+        query = np.asarray(vector, dtype=np.float32)
+        key = (context, normalize(text))
+        with self._lock:
+            if query.shape[0] != self.vectors.shape[1]:
+                # First entry, or the embedding model changed
+                self._clear(query.shape[0])
+            row = self.rows.get(key)
+            if row is None:
+                self._expire()
+                free = np.flatnonzero(~self.used)
+                if len(free):
+                    row = int(free[0])
+                else:
+                    row = int(np.argmin(self.last_used))
+                    self._drop([row], "lru")
+            self.vectors[row] = query / (np.linalg.norm(query) or 1.0)
+            self.contexts[row] = context
+            self.created[row] = self.last_used[row] = time.time()
+            self.used[row] = True
+            self.keys[row], self.answers[row] = key[1], answer
+            self.rows[key] = row
+            ENTRIES.set(len(self.rows))
+            self._changed()
+
+    def stats(self):
+        # One snapshot: lookups on other threads change both
+        with self._lock:
+            lookups = dict(self.lookups)
+            entries = len(self.rows)
+        total = sum(lookups.values())
+        hits = lookups["exact"] + lookups["semantic"]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "lookups": lookups,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                self._timer = None
+                if not self.path or not self._dirty:
+                    return
+                # Copies of the entries; written out without holding up lookups
+                rows = np.flatnonzero(self.used)
+                arrays = {
+                    "vectors": self.vectors[rows], "contexts": self.contexts[rows],
+                    "created": self.created[rows], "last_used": self.last_used[rows],
+                }
+                text = json.dumps([[self.keys[row], self.answers[row]] for row in rows])
+                self._dirty = False
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            partial = self.path + ".partial"
+            with open(partial, "wb") as f:
+                np.savez(f, entries=np.frombuffer(text.encode("utf-8"), dtype=np.uint8), **arrays)
+            os.replace(partial, self.path)
+
+    def load(self):
+        with self._lock, np.load(self.path) as data:
+            entries = json.loads(data["entries"].tobytes().decode("utf-8"))
+            # Most recently used last, so the newest survive a smaller max_entries
+            order = np.argsort(data["last_used"])[-self.max_entries:]
+            self._clear(data["vectors"].shape[1])
+            for row, i in enumerate(order):
+                self.vectors[row] = data["vectors"][i]
+                self.contexts[row] = data["contexts"][i]
+                self.created[row] = data["created"][i]
+                self.last_used[row] = data["last_used"][i]
+                self.used[row] = True
+                self.keys[row], self.answers[row] = entries[i]
+                self.rows[(int(self.contexts[row]), self.keys[row])] = row
+            ENTRIES.set(len(self.rows))
+            self._expire()